@@ -1,9 +1,14 @@
 import streamlit as st
-import pandas as pd
-import joblib
-import base64
-from auth_sqlite import init_database, register_user, login_user, save_prediction, get_user_predictions
+from auth_sqlite import (init_database, register_user, login_user, queue_prediction, flush_predictions,
+                         get_user_predictions_page, history_version, get_user_by_id, revoke_session, session_revoked)
 import time
+from inference import model_service
+from metrics import stage, start_exporter
+from passwords import calibrate_in_background
+from page_chrome import (PRIMARY_COLOR, GLOBAL_CSS, LOGIN_HEADER_HTML, REGISTER_HEADER_HTML,
+                         LOGIN_FOOTER_HTML, DASHBOARD_FOOTER_HTML, background_css, dashboard_header_html)
+from sessions import issue_token, read_token, revoke_token, store_token, verify_token
+import logging
 
 # Page configuration
 st.set_page_config(
@@ -12,160 +17,32 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Colors - Professional Hospital Palette
-PRIMARY_COLOR = "#0077b6"  # Medical Blue
-SECONDARY_COLOR = "#023e8a" # Deep Blue
-ACCENT_COLOR = "#00b4d8"    # Light Blue
-BACKGROUND_COLOR = "#ffffff" # Clean White
-TEXT_COLOR = "#333333"       # Dark Gray
-LIGHT_GRAY = "#f8f9fa"       # Very Light Gray for backgrounds
-
-# Custom CSS
-st.markdown(f"""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;500;600;700&family=Inter:wght@300;400;500;600&display=swap');
-
-    /* Global Typography */
-    html, body, [class*="css"] {{
-        font-family: 'Inter', sans-serif;
-        color: {TEXT_COLOR};
-    }}
-    
-    h1, h2, h3, h4, h5, h6 {{
-        font-family: 'Poppins', sans-serif;
-        color: {SECONDARY_COLOR};
-        font-weight: 600;
-        margin-bottom: 0.5rem;
-    }}
-
-    /* =========================================
-       1. PROFESSIONAL MEDICAL BACKGROUND (IMAGE)
-       ========================================= */
-       /* Handled via Python injection below to use local file */
-
-    /* =========================================
-       2. LAYOUT & SCROLLING FIXES
-       ========================================= */
-    /* Aggressive padding removal to prevent scrolling */
-    .block-container {{
-        padding-top: 1rem !important;
-        padding-bottom: 0rem !important;
-        max-width: 100%;
-    }}
-    
-    /* Header Navigation Simulation */
-    .header-nav {{
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        padding: 0.8rem 2rem;
-        background-color: white;
-        border-bottom: 1px solid #e0e0e0;
-        margin-bottom: 0.5rem; /* Reduced margin */
-        box-shadow: 0 2px 5px rgba(0,0,0,0.05);
-    }}
-    .logo-text {{
-        font-family: 'Poppins', sans-serif;
-        font-weight: 700;
-        font-size: 1.4rem;
-        color: {PRIMARY_COLOR};
-    }}
-    .nav-link {{
-        color: {TEXT_COLOR};
-        text-decoration: none;
-        margin-left: 20px;
-        font-weight: 500;
-        font-size: 0.9rem;
-    }}
-
-    /* Login Card - Centered with Shadow */
-    .login-container-wrapper {{
-        display: flex;
-        justify-content: center;
-        align-items: center;
-        height: 100vh; /* Full viewport height */
-    }}
-    
-    /* Input Fields styling */
-    .stTextInput input {{
-        border: 1px solid #ced4da;
-        border-radius: 4px;
-        padding: 0.75rem;
-        font-size: 0.95rem;
-        background-color: white;
-    }}
-    .stTextInput input:focus {{
-        border-color: {PRIMARY_COLOR};
-        box-shadow: 0 0 0 2px rgba(0, 119, 182, 0.2);
-    }}
-    
-    /* Buttons */
-    .stButton button {{
-        background-color: {PRIMARY_COLOR};
-        color: white;
-        font-weight: 500;
-        border-radius: 4px;
-        padding: 0.5rem 1rem;
-        border: none;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        transition: all 0.2s ease;
-    }}
-    .stButton button:hover {{
-        background-color: {SECONDARY_COLOR};
-        box-shadow: 0 4px 6px rgba(0,0,0,0.15);
-    }}
-    
-    /* Custom Footer - Fixed at bottom */
-    .footer {{
-        position: fixed;
-        bottom: 0;
-        left: 0;
-        width: 100%;
-        padding: 1rem;
-        text-align: center;
-        color: rgba(255,255,255,0.8); /* Light text for contrast */
-        font-size: 0.8rem;
-        background: transparent; /* Or subtle gradient if needed */
-        z-index: 100;
-    }}
-    
-    /* Sidebar */
-    [data-testid="stSidebar"] {{
-        background-color: white;
-        border-right: 1px solid #eee;
-    }}
-    
-    /* Removing default Streamlit elements */
-    #MainMenu {{visibility: hidden;}}
-    footer {{visibility: hidden;}}
-    header {{visibility: hidden;}}
-    
-    /* Login Card Specifics for Contrast */
-    [data-testid="stForm"] {{
-        background-color: white !important;
-        border: 2px solid {PRIMARY_COLOR};
-        border-radius: 10px;
-        padding: 20px;
-        box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-    }}
-    
-    </style>
-    """, unsafe_allow_html=True)
+# Assessments shown per page in My Health Records
+HISTORY_PAGE_SIZE = 20
+
+# Custom CSS (built once per process, see page_chrome.py)
+st.markdown(GLOBAL_CSS, unsafe_allow_html=True)
 
 # Helper function for card container
 def card_container():
     return st.container(border=True)
 
 # Initialize Resources
-@st.cache_resource
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+# Load and warm up the model in the background as soon as the process starts,
+# so the first assessment does not pay for it
+model_service.start()
+
+# Pick the bcrypt cost for this hardware before the first registration (see passwords.py)
+calibrate_in_background()
+
+# Prometheus metrics endpoint/file, when METRICS_PORT or METRICS_FILE is set (see metrics.py)
+start_exporter()
+
 def load_resources():
-    try:
-        model = joblib.load('stacked_ensemble_rf_model.pkl')
-        scaler = joblib.load('scaler.joblib')
-        return model, scaler
-    except Exception as e:
-        st.error(f"Error loading model: {e}")
-        return None, None
+    """Warmed-up model predictor, or None while the model is unavailable"""
+    return model_service.get()
 
 @st.cache_resource
 def init_db():
@@ -181,44 +58,36 @@ if 'user_info' not in st.session_state:
 if 'register_mode' not in st.session_state:
     st.session_state.register_mode = False
 
+@st.cache_data(ttl=300, show_spinner=False)
+def cached_user(user_id):
+    """Profile for a restored session, without a database query on every refresh"""
+    return get_user_by_id(user_id)
+
+# A refreshed or reconnected browser brings its signed session token in the URL
+# (see sessions.py): restore the login from it instead of asking for the password
+if not st.session_state.user_logged_in:
+    token = read_token()
+    if token:
+        token_user_id = verify_token(token, session_revoked)
+        user_info = cached_user(token_user_id) if token_user_id is not None else None
+        if user_info:
+            st.session_state.user_logged_in = True
+            st.session_state.user_info = user_info
+        else:
+            store_token(None)
+
 # Function to add background image (Diabetes Specific)
 def add_bg_image(image_name='diabetes_bg_v3.png'):
-    import os
-    if os.path.exists(image_name):
-        with open(image_name, "rb") as image_file:
-            encoded_string = base64.b64encode(image_file.read()).decode()
-        st.markdown(
-            f"""
-            <style>
-            .stApp {{
-                background-image: url(data:image/png;base64,{encoded_string});
-                background-size: cover;
-                background-position: center;
-                background-repeat: no-repeat;
-                background-attachment: fixed;
-            }}
-            /* Ensure main container is transparent */
-            .main .block-container {{
-                background: transparent;
-            }}
-            </style>
-            """,
-            unsafe_allow_html=True
-        )
+    css = background_css(image_name)
+    if css:
+        st.markdown(css, unsafe_allow_html=True)
 
 # ==================== LOGIN PAGE ====================
 def login_page():
     add_bg_image() # Inject specific background
     
     # Header
-    st.markdown(f"""
-        <div class="header-nav">
-            <div class="logo-text">Diabetes Care Portal</div>
-            <div>
-                <span class="nav-link" style="color:#666">Patient Access</span>
-            </div>
-        </div>
-    """, unsafe_allow_html=True)
+    st.markdown(LOGIN_HEADER_HTML, unsafe_allow_html=True)
     
     # Main Content - Centered Login using Columns for spacing
     # Using 'cols' to push content to center
@@ -248,6 +117,7 @@ def login_page():
                         if success:
                             st.session_state.user_logged_in = True
                             st.session_state.user_info = user_info
+                            store_token(issue_token(user_info['id']))
                             st.rerun()
                         else:
                             st.error(message)
@@ -261,23 +131,12 @@ def login_page():
             st.markdown("</div>", unsafe_allow_html=True)
             
     # Footer
-    st.markdown("""
-        <div class="footer">
-            <p>&copy; 2024 Diabetes Care Portal. Empowering Health.</p>
-        </div>
-    """, unsafe_allow_html=True)
+    st.markdown(LOGIN_FOOTER_HTML, unsafe_allow_html=True)
 
 # ==================== REGISTER PAGE ====================
 def register_page():
     # Header
-    st.markdown(f"""
-        <div class="header-nav">
-            <div class="logo-text">Diabetes Care Portal</div>
-            <div>
-                <span class="nav-link">Patient Registration</span>
-            </div>
-        </div>
-    """, unsafe_allow_html=True)
+    st.markdown(REGISTER_HEADER_HTML, unsafe_allow_html=True)
     
     col1, col2, col3 = st.columns([1, 1, 1])
     
@@ -323,110 +182,168 @@ def register_page():
              st.markdown("</div>", unsafe_allow_html=True)
 
 # ==================== MAIN APP ====================
+def assessment_panel():
+    """New Assessment: the metrics form and its result"""
+    with st.container(border=True):
+        st.markdown(f"<h4 style='color: {PRIMARY_COLOR}; margin-bottom: 20px;'>Health Metrics</h4>", unsafe_allow_html=True)
+
+        with st.form("assessment_form"):
+            col1, col2 = st.columns(2)
+            with col1:
+                pregnancies = st.number_input('Pregnancies', 0, 20, 0)
+                glucose = st.number_input('Glucose (mg/dL)', 0, 500, 100)
+                blood_pressure = st.number_input('Blood Pressure (mmHg)', 0, 200, 70)
+                skin_thickness = st.number_input('Skin Thickness (mm)', 0, 100, 20)
+
+            with col2:
+                insulin = st.number_input('Insulin (µU/ml)', 0, 1000, 80)
+                bmi = st.number_input('BMI', 0.0, 100.0, 25.0)
+                dpf = st.number_input('Diabetes Pedigree Function', 0.0, 3.0, 0.5)
+                age = st.number_input('Age (years)', 0, 120, 30)
+
+            st.markdown("<br>", unsafe_allow_html=True)
+            submitted = st.form_submit_button("Check My Risk", type="primary")
+
+            if submitted:
+                with stage('model_wait'):
+                    predictor = load_resources()
+                if predictor:
+                    try:
+                        # Metrics in training column order (see inference.FEATURE_COLUMNS);
+                        # scaling and model time are recorded inside predict_row
+                        with stage('assessment'):
+                            pred = predictor.predict_row([
+                                pregnancies, glucose, blood_pressure, skin_thickness,
+                                insulin, bmi, dpf, age
+                            ])
+
+                        # Save prediction to DB in the background (write-behind)
+                        with stage('save_prediction'):
+                            queue_prediction(st.session_state.user_info['id'], 
+                                             pregnancies, glucose, blood_pressure, skin_thickness,
+                                             insulin, bmi, dpf, age, int(pred))
+
+                        st.write("---") # Visual separator
+                        if pred == 0:
+                            st.success("Assessment Result: Low Risk (Negative)")
+                            st.markdown("**Good news:** Your metrics indicate a low risk for diabetes. Keep maintaining a healthy lifestyle.")
+                        else:
+                            st.error("Assessment Result: High Risk (Positive)")
+                            st.markdown("**Action Required:** Your metrics indicate a potential risk for diabetes. We strongly recommend consulting with a healthcare provider for a comprehensive evaluation.")
+                    except Exception as e:
+                        st.error(f"Error during prediction: {e}")
+                else:
+                    # The model service retries the load with backoff on its own
+                    st.error("Model resources failed to load. Please try again shortly or contact support.")
+
+def load_history_page(cursor):
+    """
+    One page of history as (DataFrame or None, next_cursor), kept in the session
+    by cursor for as long as the user's history cache version stays the same
+    """
+    user_id = st.session_state.user_info['id']
+    with stage('history_query'):
+        # Include this user's assessments still in the write-behind queue (no wait
+        # when there are none); the rows come from the process-wide history cache,
+        # which saving keeps current (see history_cache.py)
+        flush_predictions(user_id=user_id)
+        version = history_version(user_id)
+        kept_version, pages = st.session_state.get('history_pages', (None, {}))
+        if version is not None and version == kept_version and cursor in pages:
+            return pages[cursor]
+        history, next_cursor = get_user_predictions_page(user_id, HISTORY_PAGE_SIZE, cursor)
+    df = None
+    if history:
+        with stage('history_dataframe'):
+            import pandas as pd  # imported on first use, keeps it off the login page
+            df = pd.DataFrame(history, columns=['ID', 'Pregnancies', 'Glucose', 'BP', 'Skin', 'Insulin', 'BMI', 'DPF', 'Age', 'Prediction', 'Date'])
+            df['Status'] = df['Prediction'].apply(lambda x: 'Low Risk' if x == 0 else 'High Risk')
+    # Kept only if the rows did not change while loading: a miss that loaded the
+    # cache has no version to check against and is kept from the next render on
+    if version is not None and history_version(user_id) == version:
+        if version != kept_version:
+            pages = {}
+        pages[cursor] = (df, next_cursor)
+        st.session_state.history_pages = (version, pages)
+    return df, next_cursor
+
+def history_panel():
+    """My Health Records: the paginated assessment history"""
+    with st.container(border=True):
+        st.markdown(f"<h4 style='color: {PRIMARY_COLOR}; margin-bottom: 20px;'>My Past Assessments</h4>", unsafe_allow_html=True)
+
+        # Keyset pagination: history_cursors holds the cursor that starts each page
+        # visited so far, the last one being the page on screen
+        cursors = st.session_state.setdefault('history_cursors', [None])
+        df, next_cursor = load_history_page(cursors[-1])
+        if df is not None:
+            # Styling the dataframe
+            st.dataframe(
+                df[['Date', 'Glucose', 'BMI', 'Age', 'Status']], 
+                use_container_width=True,
+                hide_index=True
+            )
+
+            col_newer, col_page, col_older = st.columns([1, 2, 1])
+            with col_newer:
+                st.button("← Newer", key="history_newer", disabled=len(cursors) == 1,
+                          on_click=cursors.pop)
+            with col_page:
+                st.markdown(f"<p style='text-align:center; color:#666;'>Page {len(cursors)}</p>",
+                            unsafe_allow_html=True)
+            with col_older:
+                st.button("Older →", key="history_older", disabled=next_cursor is None,
+                          on_click=cursors.append, args=(next_cursor,))
+        elif len(cursors) > 1:
+            # The page on screen no longer has rows; start over from the newest
+            st.session_state.history_cursors = [None]
+            st.rerun()
+        else:
+            st.info("You haven't completed any assessments yet.")
+
 def main_app():
     # Simple Navbar
-    st.markdown(f"""
-        <div class="header-nav">
-            <div class="logo-text">Diabetes Care Portal</div>
-            <div style="display: flex; align-items: center;">
-                <span style="margin-right: 15px; font-weight: 500;">Welcome, {st.session_state.user_info['full_name']}</span>
-            </div>
-        </div>
-    """, unsafe_allow_html=True)
+    st.markdown(dashboard_header_html(st.session_state.user_info['full_name']), unsafe_allow_html=True)
 
     # Sidebar
     with st.sidebar:
         st.markdown(f"<h3 style='color:{PRIMARY_COLOR};'>My Health Dashboard</h3>", unsafe_allow_html=True)
         st.markdown("---")
         st.info(f"Member ID: {st.session_state.user_info['username']}")
+
+        # Model readiness
+        status = model_service.status()
+        if status['state'] == 'ready':
+            st.caption(f"Risk model ready (loaded in {status['load_ms'] + status['warmup_ms']:.0f} ms)")
+        elif status['state'] == 'failed':
+            st.caption(f"Risk model unavailable, retrying in {status['retry_in_s']:.0f}s")
+        else:
+            st.caption("Risk model loading...")
         
         st.markdown("<br><br><br>", unsafe_allow_html=True)
         if st.button("Sign Out"):
+            revoke_token(read_token(), revoke_session)
+            store_token(None)
             st.session_state.user_logged_in = False
+            st.session_state.pop('history_cursors', None)
+            st.session_state.pop('history_pages', None)
             st.rerun()
 
     # Main Content
     st.markdown(f"<h2>Diabetes Risk Assessment</h2>", unsafe_allow_html=True)
     st.markdown("<p style='color:#666; margin-bottom: 30px;'>Enter your health metrics below to assess your diabetes risk.</p>", unsafe_allow_html=True)
     
-    # Custom Tabs
-    tab1, tab2 = st.tabs(["New Assessment", "My Health Records"])
-    
-    with tab1:
-        with st.container(border=True):
-            st.markdown(f"<h4 style='color: {PRIMARY_COLOR}; margin-bottom: 20px;'>Health Metrics</h4>", unsafe_allow_html=True)
-            
-            with st.form("assessment_form"):
-                col1, col2 = st.columns(2)
-                with col1:
-                    pregnancies = st.number_input('Pregnancies', 0, 20, 0)
-                    glucose = st.number_input('Glucose (mg/dL)', 0, 500, 100)
-                    blood_pressure = st.number_input('Blood Pressure (mmHg)', 0, 200, 70)
-                    skin_thickness = st.number_input('Skin Thickness (mm)', 0, 100, 20)
-                
-                with col2:
-                    insulin = st.number_input('Insulin (µU/ml)', 0, 1000, 80)
-                    bmi = st.number_input('BMI', 0.0, 100.0, 25.0)
-                    dpf = st.number_input('Diabetes Pedigree Function', 0.0, 3.0, 0.5)
-                    age = st.number_input('Age (years)', 0, 120, 30)
-                    
-                st.markdown("<br>", unsafe_allow_html=True)
-                submitted = st.form_submit_button("Check My Risk", type="primary")
-                
-                if submitted:
-                    model, scaler = load_resources()
-                    if model:
-                        try:
-                            input_data = pd.DataFrame([{
-                                'Pregnancies': pregnancies, 'Glucose': glucose, 'BloodPressure': blood_pressure,
-                                'SkinThickness': skin_thickness, 'Insulin': insulin, 'BMI': bmi,
-                                'DiabetesPedigreeFunction': dpf, 'Age': age
-                            }])
-                            scaled = scaler.transform(input_data)
-                            pred = model.predict(scaled)[0]
-                            
-                            # Save prediction to DB
-                            save_prediction(st.session_state.user_info['id'], 
-                                          pregnancies, glucose, blood_pressure, skin_thickness,
-                                          insulin, bmi, dpf, age, int(pred))
-                            
-                            st.write("---") # Visual separator
-                            if pred == 0:
-                                st.success("Assessment Result: Low Risk (Negative)")
-                                st.markdown("**Good news:** Your metrics indicate a low risk for diabetes. Keep maintaining a healthy lifestyle.")
-                            else:
-                                st.error("Assessment Result: High Risk (Positive)")
-                                st.markdown("**Action Required:** Your metrics indicate a potential risk for diabetes. We strongly recommend consulting with a healthcare provider for a comprehensive evaluation.")
-                        except Exception as e:
-                            st.error(f"Error during prediction: {e}")
-                    else:
-                        st.error("Model resources failed to load. Please contact support.")
-                        st.cache_resource.clear() # Clear cache to retry next time
-
-    with tab2:
-        with st.container(border=True):
-            st.markdown(f"<h4 style='color: {PRIMARY_COLOR}; margin-bottom: 20px;'>My Past Assessments</h4>", unsafe_allow_html=True)
-            
-            history = get_user_predictions(st.session_state.user_info['id'])
-            if history:
-                df = pd.DataFrame(history, columns=['ID', 'Pregnancies', 'Glucose', 'BP', 'Skin', 'Insulin', 'BMI', 'DPF', 'Age', 'Prediction', 'Date'])
-                df['Status'] = df['Prediction'].apply(lambda x: 'Low Risk' if x == 0 else 'High Risk')
-                
-                # Styling the dataframe
-                st.dataframe(
-                    df[['Date', 'Glucose', 'BMI', 'Age', 'Status']], 
-                    use_container_width=True,
-                    hide_index=True
-                )
-            else:
-                st.info("You haven't completed any assessments yet.")
+    # Only the selected panel runs (st.tabs would run both): the history query
+    # and DataFrame build are skipped while the patient works on an assessment
+    panel = st.radio("Panel", ["New Assessment", "My Health Records"], horizontal=True,
+                     key="dashboard_panel", label_visibility="collapsed")
+    if panel == "New Assessment":
+        assessment_panel()
+    else:
+        history_panel()
 
     # Footer
-    st.markdown("""
-        <div class="footer">
-            <p>&copy; 2024 Diabetes Care Portal. All rights reserved.</p>
-        </div>
-    """, unsafe_allow_html=True)
+    st.markdown(DASHBOARD_FOOTER_HTML, unsafe_allow_html=True)
 
 # Router
 if st.session_state.user_logged_in:
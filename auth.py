@@ -1,97 +1,403 @@
-import mysql.connector
-import bcrypt
+import logging
+import os
+import random
+import threading
+import time
 import streamlit as st
-from datetime import datetime
+from datetime import datetime, timezone
 
-# Database configuration
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': 'akash2005',  # Change this to your MySQL password
-    'database': 'diabetes_app'
-}
+from config import get_db_config, get_pool_config
+from metrics import DB_ERRORS, DB_SECONDS, POOL_EXHAUSTED, POOL_RECONNECTS, POOL_STATS, POOL_WAITS, timed
+import passwords
+from history_cache import HistoryCache
+from write_behind import WriteBehindQueue
+
+logger = logging.getLogger('diabetes_portal.auth')
+
+# Database configuration: DB_HOST, DB_USER, DB_PASSWORD and DB_NAME from the
+# environment or the .env file written by setup_db.py (see config.py)
+DB_CONFIG = get_db_config()
+
+# Connection pool (see ConnectionPool); a size of 0 opens a new connection per call
+_pool_config = get_pool_config()
+POOL_SIZE = _pool_config['pool_size']
+POOL_TIMEOUT = _pool_config['timeout']                        # seconds to wait for a free connection
+POOL_HEALTH_CHECK = _pool_config['health_check']              # ping connections idle longer than this
+RECONNECT_ATTEMPTS = _pool_config['reconnect_attempts']       # tries to open a connection before giving up
+RECONNECT_DELAY = 0.2                                         # seconds, doubled per attempt
 
 def get_db_connection():
-    """Create and return a MySQL database connection"""
+    """Return a MySQL database connection from the pool; close() gives it back"""
     try:
-        connection = mysql.connector.connect(**DB_CONFIG)
-        return connection
-    except mysql.connector.Error as err:
+        return _connect()
+    except _mysql().Error as err:
+        _error('connect')
         st.error(f"Database connection error: {err}")
         return None
 
-def init_database():
-    """Initialize the database and create users table if it doesn't exist"""
-    try:
-        # Connect to MySQL server without selecting a database first
-        conn = mysql.connector.connect(
-            host=DB_CONFIG['host'],
-            user=DB_CONFIG['user'],
-            password=DB_CONFIG['password']
+def _mysql():
+    """mysql.connector, imported on first database access instead of at app start"""
+    import mysql.connector
+    return mysql.connector
+
+class PooledConnection:
+    """mysql.connector connection whose close() hands it back to its pool"""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.release(self._conn)
+
+    def discard(self):
+        """Close the connection instead of returning it to the pool"""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.release(self._conn, reusable=False)
+
+class ConnectionPool:
+    """
+    Thread-safe pool of open connections to one MySQL database, shared by all
+    Streamlit sessions in the process, so a call does not pay for a TCP
+    handshake and authentication. Idle connections are reused most recent first
+    and pinged before reuse once idle longer than health_check seconds; a
+    connection that fails the ping, or a connect that fails, is retried up to
+    reconnect_attempts times with backoff.
+    """
+
+    def __init__(self, config, size=POOL_SIZE, timeout=POOL_TIMEOUT,
+                 health_check=POOL_HEALTH_CHECK, reconnect_attempts=RECONNECT_ATTEMPTS):
+        self.config = dict(config)
+        self.size = size
+        self.timeout = timeout
+        self.health_check = health_check
+        self.reconnect_attempts = max(1, reconnect_attempts)
+        self.created = 0
+        self.reused = 0
+        self._idle = []
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _connect(self):
+        """A new connection, retrying connection failures (not bad credentials or database names)"""
+        mysql = _mysql()
+        delay = RECONNECT_DELAY
+        for attempt in range(1, self.reconnect_attempts + 1):
+            try:
+                conn = mysql.connect(**self.config)
+                self.created += 1
+                return conn
+            except (mysql.errors.InterfaceError, mysql.errors.OperationalError) as err:
+                if attempt >= self.reconnect_attempts:
+                    raise
+                POOL_RECONNECTS.inc(backend='mysql')
+                logger.warning("MySQL connect failed (attempt %d/%d), retrying: %s",
+                               attempt, self.reconnect_attempts, err)
+                time.sleep(delay * random.uniform(0.5, 1.5))
+                delay *= 2
+
+    def _healthy(self, conn, last_used):
+        if time.monotonic() - last_used < self.health_check:
+            return True
+        try:
+            conn.ping()
+            return True
+        except _mysql().Error:
+            return False
+
+    def acquire(self):
+        """An open connection; raises mysql.connector.errors.PoolError if none frees up within timeout"""
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            waited = False
+            while not self._idle and self._in_use >= self.size:
+                if not waited:
+                    POOL_WAITS.inc(backend='mysql')
+                    waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    if not self._idle and self._in_use >= self.size:
+                        POOL_EXHAUSTED.inc(backend='mysql')
+                        raise _mysql().errors.PoolError(
+                            f"connection pool exhausted ({self.size} connections in use)")
+            conn, last_used = self._idle.pop() if self._idle else (None, 0.0)
+            self._in_use += 1
+
+        try:
+            if conn is not None and not self._healthy(conn, last_used):
+                # Dropped by the server (wait_timeout, restart): replace it
+                POOL_RECONNECTS.inc(backend='mysql')
+                self._discard(conn)
+                conn = None
+            if conn is None:
+                conn = self._connect()
+            else:
+                self.reused += 1
+        except BaseException:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return PooledConnection(self, conn)
+
+    def release(self, conn, reusable=True):
+        """
+        Return a connection, ending its transaction so the next user sees fresh
+        data; with reusable=False (or if that fails) it is closed instead
+        """
+        if reusable:
+            try:
+                # Also ends the read snapshot a SELECT opens when autocommit is off
+                conn.rollback()
+            except _mysql().Error:
+                reusable = False
+        with self._cond:
+            self._in_use -= 1
+            if reusable and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._discard(conn)
+            self._cond.notify()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except _mysql().Error:
+            pass
+
+    def close(self):
+        """Close idle connections; connections in use are closed when released"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        with self._cond:
+            return {'idle': len(self._idle), 'in_use': self._in_use, 'size': self.size,
+                    'created': self.created, 'reused': self.reused}
+
+_pool = None
+_pool_settings = None          # what _pool was built from
+_pool_lock = threading.Lock()
+
+def _current_pool_settings():
+    return (dict(DB_CONFIG), POOL_SIZE, POOL_TIMEOUT, POOL_HEALTH_CHECK, RECONNECT_ATTEMPTS)
+
+def get_pool():
+    """The process-wide pool for the current DB_CONFIG and POOL_* settings (replaced if they change)"""
+    global _pool, _pool_settings
+    settings = _current_pool_settings()
+    pool = _pool
+    if pool is not None and _pool_settings == settings:
+        return pool
+    with _pool_lock:
+        if _pool is None or _pool_settings != settings:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(*settings)
+            _pool_settings = settings
+        return _pool
+
+def close_pool():
+    """Close all pooled connections, e.g. before the database is dropped"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+POOL_STATS['mysql'] = lambda: {state: (_pool.stats()[state] if _pool else 0) for state in ('idle', 'in_use')}
+
+def _connect():
+    """A pooled connection (a new one when pooling is off); raises mysql.connector.Error"""
+    if POOL_SIZE <= 0:
+        return _mysql().connect(**DB_CONFIG)
+    return get_pool().acquire()
+
+# Assessment results are saved through a write-behind queue (see write_behind.py
+# for its guarantees); WRITE_BEHIND=0 saves them synchronously instead
+WRITE_BEHIND = os.getenv('WRITE_BEHIND', '1') != '0'
+WRITE_BEHIND_QUEUE_SIZE = int(os.getenv('WRITE_BEHIND_QUEUE_SIZE', '10000'))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', '500'))
+
+def _timed(operation):
+    """Record the latency of a database function in metrics.DB_SECONDS"""
+    return timed(DB_SECONDS, DB_ERRORS, backend='mysql', operation=operation)
+
+def _error(operation):
+    """Count a database failure that was handled instead of raised"""
+    DB_ERRORS.inc(backend='mysql', operation=operation)
+
+def _create_tables(cursor):
+    """Create the users and predictions tables"""
+    # Create users table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(100) UNIQUE NOT NULL,
+            email VARCHAR(100) UNIQUE NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            full_name VARCHAR(100),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Create predictions table to store user prediction history
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS predictions (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            pregnancies INT,
+            glucose FLOAT,
+            blood_pressure FLOAT,
+            skin_thickness FLOAT,
+            insulin FLOAT,
+            bmi FLOAT,
+            diabetes_pedigree_function FLOAT,
+            age INT,
+            prediction INT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+        )
+    """)
+
+def _add_history_index(cursor):
+    """Index serving the History query: one user's predictions, newest first"""
+    # MySQL has no CREATE INDEX IF NOT EXISTS
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = 'predictions'
+          AND index_name = 'idx_predictions_user_created'
+    """)
+    if cursor.fetchone()[0] == 0:
+        cursor.execute("CREATE INDEX idx_predictions_user_created ON predictions (user_id, created_at)")
+
+def _create_revoked_sessions(cursor):
+    """Session tokens revoked by Sign Out, kept until they expire (see sessions.py)"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS revoked_sessions (
+            token_id VARCHAR(32) PRIMARY KEY,
+            expires_at BIGINT NOT NULL
+        )
+    """)
+
+# Schema migrations, applied in order by init_database() and recorded in the
+# schema_migrations table. Append new steps with the next version number. MySQL
+# commits each DDL statement implicitly, so steps must be idempotent: an
+# interrupted step is replayed, as are all steps on databases created before
+# this table existed (e.g. by setup_db.py).
+MIGRATIONS = [
+    (1, 'create users and predictions tables', _create_tables),
+    (2, 'index predictions by (user_id, created_at)', _add_history_index),
+    (3, 'revoked session tokens table', _create_revoked_sessions),
+]
+
+def migrate(conn):
+    """Apply pending MIGRATIONS; returns the versions applied"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            description VARCHAR(255),
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    applied = {row[0] for row in cursor.fetchall()}
+
+    newly_applied = []
+    for version, description, step in MIGRATIONS:
+        if version in applied:
+            continue
+        step(cursor)
+        cursor.execute("INSERT IGNORE INTO schema_migrations (version, description) VALUES (%s, %s)",
+                       (version, description))
+        conn.commit()
+        newly_applied.append(version)
+    cursor.close()
+    return newly_applied
+
+def schema_version():
+    """Highest applied migration version (0 for a database that was never migrated)"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
         cursor = conn.cursor()
-        
-        # Create database if not exists
-        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_CONFIG['database']}")
+        cursor.execute("SELECT MAX(version) FROM schema_migrations")
+        version = cursor.fetchone()[0]
         cursor.close()
+        return version or 0
+    except _mysql().Error:
+        return 0
+    finally:
         conn.close()
-        
-        # Now connect to the specific database
-        conn = get_db_connection()
-        if conn:
+
+def init_database():
+    """Initialize the database and bring the schema up to date"""
+    try:
+        try:
+            conn = _connect()
+        except _mysql().errors.ProgrammingError as err:
+            if err.errno != 1049:  # ER_BAD_DB_ERROR: the database does not exist yet
+                raise
+            # Create it over a one-off server connection, then use the pool
+            server = {k: v for k, v in DB_CONFIG.items() if k != 'database'}
+            conn = _mysql().connect(**server)
             cursor = conn.cursor()
-            
-            # Create users table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    username VARCHAR(100) UNIQUE NOT NULL,
-                    email VARCHAR(100) UNIQUE NOT NULL,
-                    password VARCHAR(255) NOT NULL,
-                    full_name VARCHAR(100),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Create predictions table to store user prediction history
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS predictions (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
-                    user_id INT NOT NULL,
-                    pregnancies INT,
-                    glucose FLOAT,
-                    blood_pressure FLOAT,
-                    skin_thickness FLOAT,
-                    insulin FLOAT,
-                    bmi FLOAT,
-                    diabetes_pedigree_function FLOAT,
-                    age INT,
-                    prediction INT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-                )
-            """)
-            
-            conn.commit()
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DB_CONFIG['database']}")
             cursor.close()
             conn.close()
-            return True
+            conn = _connect()
+        try:
+            migrate(conn)
+        finally:
+            conn.close()
+        return True
     except Exception as e:
+        _error('init_database')
         st.error(f"Database initialization error: {e}")
         return False
 
+@_timed('hash_password')
 def hash_password(password):
-    """Hash a password using bcrypt"""
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+    """Hash a password using bcrypt at the calibrated cost, in the hashing pool (see passwords.py)"""
+    return passwords.hash_password(password)
 
+@_timed('verify_password')
 def verify_password(password, hashed_password):
-    """Verify a password against its hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+    """Verify a password against its hash, in the hashing pool"""
+    return passwords.verify_password(password, hashed_password)
+
+@_timed('update_password_hash')
+def _update_password_hash(user_id, old_hash, new_hash):
+    """Store a rehashed password unless the hash changed meanwhile; raises on failure"""
+    conn = _connect()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("UPDATE users SET password = %s WHERE id = %s AND password = %s",
+                       (new_hash, user_id, old_hash))
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
 
+@_timed('register_user')
 def register_user(username, email, password, full_name):
     """Register a new user in the database"""
+    # Hash the password before taking a pooled connection: bcrypt is deliberately slow
+    hashed_password = hash_password(password)
+
     conn = get_db_connection()
     if not conn:
         return False, "Database connection failed"
@@ -99,16 +405,15 @@ def register_user(username, email, password, full_name):
     try:
         cursor = conn.cursor()
         
-        # Check if username or email already exists
-        cursor.execute("SELECT id FROM users WHERE username = %s OR email = %s", (username, email))
+        # Check if username or email already exists: one unique-index probe each
+        cursor.execute(
+            "SELECT id FROM users WHERE username = %s UNION ALL SELECT id FROM users WHERE email = %s LIMIT 1",
+            (username, email)
+        )
         if cursor.fetchone():
             cursor.close()
-            conn.close()
             return False, "Username or email already exists"
         
-        # Hash the password
-        hashed_password = hash_password(password)
-        
         # Insert new user
         cursor.execute(
             "INSERT INTO users (username, email, password, full_name) VALUES (%s, %s, %s, %s)",
@@ -116,11 +421,14 @@ def register_user(username, email, password, full_name):
         )
         conn.commit()
         cursor.close()
-        conn.close()
         return True, "Registration successful! You can now login."
-    except mysql.connector.Error as err:
+    except _mysql().Error as err:
+        _error('register_user')
         return False, f"Registration error: {err}"
+    finally:
+        conn.close()
 
+@_timed('login_user')
 def login_user(username, password):
     """Authenticate a user"""
     conn = get_db_connection()
@@ -137,15 +445,28 @@ def login_user(username, password):
         )
         user = cursor.fetchone()
         cursor.close()
+    except _mysql().Error as err:
+        _error('login_user')
+        return False, None, f"Login error: {err}"
+    finally:
+        # Back to the pool before the (slow) bcrypt check
         conn.close()
-        
+    
+    try:
         if user and verify_password(password, user[2]):
+            if passwords.needs_rehash(user[2]):
+                # Stored at an outdated cost: replace it without delaying the login
+                passwords.rehash_in_background(
+                    password, lambda new_hash: _update_password_hash(user[0], user[2], new_hash))
             return True, {'id': user[0], 'username': user[1], 'full_name': user[3]}, "Login successful"
         else:
             return False, None, "Invalid username or password"
-    except mysql.connector.Error as err:
+    except Exception as err:
+        # e.g. a malformed stored hash
+        _error('login_user')
         return False, None, f"Login error: {err}"
 
+@_timed('save_prediction')
 def save_prediction(user_id, pregnancies, glucose, blood_pressure, skin_thickness, 
                    insulin, bmi, dpf, age, prediction):
     """Save prediction to database"""
@@ -164,12 +485,115 @@ def save_prediction(user_id, pregnancies, glucose, blood_pressure, skin_thicknes
              bmi, dpf, age, prediction)
         )
         conn.commit()
+        row_id = cursor.lastrowid
         cursor.close()
-        conn.close()
+        _write_through(conn, row_id, [user_id])
         return True
-    except mysql.connector.Error as err:
+    except _mysql().Error as err:
+        _error('save_prediction')
         return False
+    finally:
+        conn.close()
+
+@_timed('save_predictions')
+def save_predictions(rows):
+    """
+    Insert prediction rows with executemany in a single transaction. Each row is
+    (user_id, pregnancies, glucose, blood_pressure, skin_thickness, insulin, bmi,
+    dpf, age, prediction, created_at) with created_at in UTC. Raises on failure
+    (used by prediction_writer).
+    """
+    conn = _connect()
+    reusable = True
+    try:
+        cursor = conn.cursor()
+        # created_at values are UTC; TIMESTAMP columns convert from the session time zone
+        cursor.execute("SET time_zone = '+00:00'")
+        try:
+            cursor.executemany(
+                """INSERT INTO predictions 
+                (user_id, pregnancies, glucose, blood_pressure, skin_thickness, insulin, bmi, 
+                 diabetes_pedigree_function, age, prediction, created_at) 
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+                rows
+            )
+            # executemany sends one multi-row INSERT: lastrowid is the id of its first row,
+            # and every row it inserted has an id at least that large
+            first_id = cursor.lastrowid
+            conn.commit()
+        finally:
+            # The connection goes back to the pool: restore the server's time zone for its
+            # next user. On a broken connection this fails too; the error that got here
+            # is the one raised, and the connection is closed instead of reused
+            try:
+                cursor.execute("SET time_zone = DEFAULT")
+            except _mysql().Error as err:
+                logger.warning("Could not restore the session time zone, closing the connection: %s", err)
+                reusable = False
+        cursor.close()
+        # Read back in the server's time zone, like the history queries
+        _write_through(conn, first_id, [row[0] for row in rows])
+    except _mysql().Error:
+        if reusable:
+            conn.rollback()
+        raise
+    finally:
+        if not reusable and isinstance(conn, PooledConnection):
+            conn.discard()
+        else:
+            conn.close()
+
+# Recent history per user, kept current by save_prediction / save_predictions (see history_cache.py)
+history_cache = HistoryCache('mysql')
+
+def _write_through(conn, first_id, user_ids):
+    """
+    Add the rows just committed (ids from first_id on) to history_cache for the
+    users it holds, read back by primary key in the history row layout. Never
+    raises: the rows are stored, so on failure those users are reloaded instead.
+    """
+    user_ids = [user_id for user_id in set(user_ids) if history_cache.cached(user_id)]
+    if not user_ids:
+        return
+    try:
+        cursor = conn.cursor()
+        for user_id in user_ids:
+            cursor.execute(
+                """SELECT id, pregnancies, glucose, blood_pressure, skin_thickness, insulin, 
+                         bmi, diabetes_pedigree_function, age, prediction, created_at 
+                  FROM predictions WHERE id >= %s AND user_id = %s""",
+                (first_id, user_id)
+            )
+            history_cache.add(user_id, cursor.fetchall())
+        cursor.close()
+    except _mysql().Error as err:
+        logger.warning("History cache write-through failed, reloading users %s: %s", user_ids, err)
+        for user_id in user_ids:
+            history_cache.invalidate(user_id)
 
+prediction_writer = WriteBehindQueue(save_predictions, name='mysql', maxsize=WRITE_BEHIND_QUEUE_SIZE,
+                                     batch_size=WRITE_BEHIND_BATCH_SIZE,
+                                     key=lambda row: row[0])  # by user id
+
+def queue_prediction(user_id, pregnancies, glucose, blood_pressure, skin_thickness,
+                     insulin, bmi, dpf, age, prediction):
+    """Save a prediction without waiting for the database (write-behind)"""
+    if not WRITE_BEHIND:
+        return save_prediction(user_id, pregnancies, glucose, blood_pressure, skin_thickness,
+                               insulin, bmi, dpf, age, prediction)
+    # Stamped now so the history order is the submission order
+    created_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    return prediction_writer.submit((user_id, pregnancies, glucose, blood_pressure, skin_thickness,
+                                     insulin, bmi, dpf, age, prediction, created_at))
+
+def flush_predictions(timeout=5.0, user_id=None):
+    """
+    Wait until queued predictions are written, all of them or only user_id's
+    (immediate when that user has none queued); returns False on timeout
+    """
+    return prediction_writer.flush(timeout, key=user_id)
+
+@_timed('get_user_predictions')
 def get_user_predictions(user_id):
     """Get all predictions for a user"""
     conn = get_db_connection()
@@ -186,11 +610,70 @@ def get_user_predictions(user_id):
         )
         predictions = cursor.fetchall()
         cursor.close()
-        conn.close()
         return predictions
-    except mysql.connector.Error as err:
+    except _mysql().Error as err:
+        _error('get_user_predictions')
         return []
+    finally:
+        conn.close()
+
+def get_user_predictions_page(user_id, page_size=20, cursor=None):
+    """
+    One page of a user's predictions, newest first, in the same row layout as
+    get_user_predictions. cursor is None for the first page, or the next_cursor
+    returned with the previous page. Returns (rows, next_cursor); next_cursor
+    is None on the last page.
+
+    Served from history_cache while the page is within the user's recent rows;
+    otherwise queried with _query_predictions_page.
+    """
+    try:
+        return history_cache.page(user_id, page_size, cursor,
+                                  lambda limit, after: _query_predictions_page(user_id, limit, after))
+    except _mysql().Error:
+        return [], None
 
+def history_version(user_id):
+    """Version of the user's cached history (see HistoryCache.version), or None if not cached"""
+    return history_cache.version(user_id)
+
+@_timed('get_user_predictions_page')
+def _query_predictions_page(user_id, page_size, cursor):
+    """
+    Query one page for get_user_predictions_page; raises mysql.connector.Error.
+
+    Keyset pagination on (created_at, id): each page is an index range scan
+    starting after the cursor, so its cost does not grow with history length.
+    """
+    conn = _connect()
+    try:
+        db_cursor = conn.cursor()
+        query = """SELECT id, pregnancies, glucose, blood_pressure, skin_thickness, insulin, 
+                     bmi, diabetes_pedigree_function, age, prediction, created_at 
+              FROM predictions WHERE user_id = %s"""
+        order = " ORDER BY created_at DESC, id DESC LIMIT %s"
+        if cursor is None:
+            db_cursor.execute(query + order, (user_id, page_size + 1))
+        else:
+            # Rows strictly after the cursor; the created_at <= bound keeps it an index range scan
+            created_at, last_id = cursor
+            db_cursor.execute(
+                query + " AND created_at <= %s AND (created_at < %s OR id < %s)" + order,
+                (user_id, created_at, created_at, last_id, page_size + 1)
+            )
+        rows = db_cursor.fetchall()
+        db_cursor.close()
+
+        # The extra row only tells whether another page follows
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            return rows, (last[10], last[0])
+        return rows, None
+    finally:
+        conn.close()
+
+@_timed('get_user_by_id')
 def get_user_by_id(user_id):
     """Get user information by ID"""
     conn = get_db_connection()
@@ -205,9 +688,59 @@ def get_user_by_id(user_id):
         )
         user = cursor.fetchone()
         cursor.close()
-        conn.close()
         if user:
             return {'id': user[0], 'username': user[1], 'email': user[2], 'full_name': user[3]}
         return None
-    except mysql.connector.Error as err:
+    except _mysql().Error as err:
+        _error('get_user_by_id')
         return None
+    finally:
+        conn.close()
+
+@_timed('revoke_session')
+def revoke_session(token_id, expires_at):
+    """
+    Record a revoked session token until expires_at (Unix time), for every
+    process sharing this database; expired entries are dropped. Returns True
+    on success.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("INSERT IGNORE INTO revoked_sessions (token_id, expires_at) VALUES (%s, %s)",
+                       (token_id, int(expires_at)))
+        cursor.execute("DELETE FROM revoked_sessions WHERE expires_at < %s", (int(time.time()),))
+        conn.commit()
+        cursor.close()
+        return True
+    except _mysql().Error as err:
+        _error('revoke_session')
+        logger.error("Could not record revoked session %s: %s", token_id, err)
+        return False
+    finally:
+        conn.close()
+
+@_timed('session_revoked')
+def session_revoked(token_id):
+    """
+    True if a session token was revoked. Also True when the check fails, so a
+    token that cannot be checked is not used to restore a login.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return True
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM revoked_sessions WHERE token_id = %s", (token_id,))
+        revoked = cursor.fetchone() is not None
+        cursor.close()
+        return revoked
+    except _mysql().Error as err:
+        _error('session_revoked')
+        return True
+    finally:
+        conn.close()
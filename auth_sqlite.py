@@ -5,83 +5,413 @@ This is suitable for development and testing
 For production, use MySQL version (auth.py)
 """
 
+import logging
+import os
+import random
 import sqlite3
-import bcrypt
+import threading
+import time
 import streamlit as st
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 
+from metrics import DB_ERRORS, DB_SECONDS, POOL_EXHAUSTED, POOL_STATS, POOL_WAITS, Counter, timed
+import passwords
+from history_cache import HistoryCache
+from write_behind import WriteBehindQueue
+
+logger = logging.getLogger('diabetes_portal.auth_sqlite')
+
 # Database file path
 DB_FILE = Path(__file__).parent / 'diabetes_app.db'
 
+# Connection pool (see ConnectionPool); a size of 0 opens a new connection per call
+POOL_SIZE = int(os.getenv('SQLITE_POOL_SIZE', '8'))
+POOL_TIMEOUT = float(os.getenv('SQLITE_POOL_TIMEOUT', '10'))             # seconds to wait for a free connection
+POOL_HEALTH_CHECK = float(os.getenv('SQLITE_POOL_HEALTH_CHECK', '30'))   # ping connections idle longer than this
+STATEMENT_CACHE_SIZE = int(os.getenv('SQLITE_STATEMENT_CACHE', '64'))    # prepared statements kept per connection
+
+# Journaling and per-connection tuning. WAL lets History reads proceed while a
+# prediction is being written; NORMAL sync is durable across application crashes
+# in WAL mode (an OS crash can lose the last commits, never corrupt the file).
+JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', '16384'))          # page cache per connection
+MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))   # bytes of the file read via mmap
+BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))       # SQLite's own wait for a lock
+
+# Writes that still fail with "database is locked" are retried with jittered exponential backoff
+LOCK_RETRY_ATTEMPTS = int(os.getenv('SQLITE_LOCK_RETRY_ATTEMPTS', '5'))
+LOCK_RETRY_BASE = float(os.getenv('SQLITE_LOCK_RETRY_BASE', '0.05'))     # seconds, doubled per attempt
+LOCK_RETRY_MAX = float(os.getenv('SQLITE_LOCK_RETRY_MAX', '1.0'))
+
+# Assessment results are saved through a write-behind queue (see write_behind.py
+# for its guarantees); WRITE_BEHIND=0 saves them synchronously instead
+WRITE_BEHIND = os.getenv('WRITE_BEHIND', '1') != '0'
+WRITE_BEHIND_QUEUE_SIZE = int(os.getenv('WRITE_BEHIND_QUEUE_SIZE', '10000'))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', '500'))
+
+LOCK_RETRIES = Counter('portal_db_lock_retries_total', 'Writes retried because the database was locked',
+                       ['backend'])
+
+def _timed(operation):
+    """Record the latency of a database function in metrics.DB_SECONDS"""
+    return timed(DB_SECONDS, DB_ERRORS, backend='sqlite', operation=operation)
+
+def _error(operation):
+    """Count a database failure that was handled instead of raised"""
+    DB_ERRORS.inc(backend='sqlite', operation=operation)
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to its pool"""
+
+    pool = None
+    last_used = 0.0
+
+    def close(self):
+        # Cleared on the first close, so closing twice cannot release it twice
+        pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.release(self)
+
+    def discard(self):
+        """Really close the connection"""
+        self.pool = None
+        super().close()
+
+class ConnectionPool:
+    """
+    Thread-safe pool of open connections to one database file, shared by all
+    Streamlit sessions in the process. Connections keep their prepared-statement
+    cache and page cache between calls. Idle connections are reused most recent
+    first and pinged before reuse once idle longer than health_check seconds.
+    """
+
+    def __init__(self, db_file, size=POOL_SIZE, timeout=POOL_TIMEOUT,
+                 health_check=POOL_HEALTH_CHECK, cached_statements=STATEMENT_CACHE_SIZE):
+        self.db_file = str(db_file)
+        self.size = size
+        self.timeout = timeout
+        self.health_check = health_check
+        self.cached_statements = cached_statements
+        self.created = 0
+        self.reused = 0
+        self._idle = []
+        self._in_use = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def _connect(self):
+        # Connections move between Streamlit script threads; the pool ensures one user at a time
+        conn = _open_connection(self.db_file, factory=PooledConnection, check_same_thread=False,
+                                cached_statements=self.cached_statements)
+        self.created += 1
+        return conn
+
+    def _healthy(self, conn):
+        if time.monotonic() - conn.last_used < self.health_check:
+            return True
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self):
+        """An open connection; raises sqlite3.OperationalError if none frees up within timeout"""
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            waited = False
+            while not self._idle and self._in_use >= self.size:
+                if not waited:
+                    POOL_WAITS.inc(backend='sqlite')
+                    waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    if not self._idle and self._in_use >= self.size:
+                        POOL_EXHAUSTED.inc(backend='sqlite')
+                        raise sqlite3.OperationalError(
+                            f"connection pool exhausted ({self.size} connections in use)")
+            conn = self._idle.pop() if self._idle else None
+            self._in_use += 1
+
+        try:
+            if conn is not None and not self._healthy(conn):
+                conn.discard()
+                conn = None
+            if conn is None:
+                conn = self._connect()
+            else:
+                self.reused += 1
+        except BaseException:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        conn.pool = self
+        return conn
+
+    def release(self, conn):
+        """Return a connection; an unfinished transaction is rolled back first"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            reusable = True
+        except sqlite3.Error:
+            reusable = False
+        with self._cond:
+            self._in_use -= 1
+            if reusable and not self._closed:
+                conn.last_used = time.monotonic()
+                self._idle.append(conn)
+            else:
+                conn.discard()
+            self._cond.notify()
+
+    def close(self):
+        """Close idle connections; connections in use are closed when released"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.discard()
+
+    def stats(self):
+        with self._cond:
+            return {'idle': len(self._idle), 'in_use': self._in_use, 'size': self.size,
+                    'created': self.created, 'reused': self.reused}
+
+_pool = None
+_pool_settings = None          # what _pool was built from
+_pool_lock = threading.Lock()
+
+def _current_pool_settings():
+    return (str(DB_FILE), POOL_SIZE, POOL_TIMEOUT, POOL_HEALTH_CHECK, STATEMENT_CACHE_SIZE)
+
+def get_pool():
+    """The process-wide pool for the current DB_FILE and POOL_* settings (replaced if they change)"""
+    global _pool, _pool_settings
+    settings = _current_pool_settings()
+    pool = _pool
+    if pool is not None and _pool_settings == settings:
+        return pool
+    with _pool_lock:
+        if _pool is None or _pool_settings != settings:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(*settings)
+            _pool_settings = settings
+        return _pool
+
+def close_pool():
+    """Close all pooled connections, e.g. before the database file is replaced"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+POOL_STATS['sqlite'] = lambda: {state: (_pool.stats()[state] if _pool else 0) for state in ('idle', 'in_use')}
+
+def _open_connection(db_file, **kwargs):
+    """Open a connection with the per-connection pragmas applied"""
+    conn = sqlite3.connect(str(db_file), timeout=BUSY_TIMEOUT_MS / 1000, **kwargs)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA synchronous = {SYNCHRONOUS}")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    return conn
+
+def _is_locked(err):
+    return isinstance(err, sqlite3.OperationalError) and (
+        'locked' in str(err) or 'busy' in str(err))
+
+def _retry_locked(conn, write):
+    """
+    Run write(cursor) and commit, returning write's result. While the database
+    is locked the transaction is rolled back and retried with jittered
+    exponential backoff; the last error is raised after LOCK_RETRY_ATTEMPTS.
+    """
+    delay = LOCK_RETRY_BASE
+    for attempt in range(1, LOCK_RETRY_ATTEMPTS + 1):
+        cursor = conn.cursor()
+        try:
+            result = write(cursor)
+            conn.commit()
+            return result
+        except sqlite3.Error as err:
+            conn.rollback()
+            if not _is_locked(err) or attempt >= LOCK_RETRY_ATTEMPTS:
+                raise
+            LOCK_RETRIES.inc(backend='sqlite')
+            logger.warning("Database locked (attempt %d/%d), retrying: %s", attempt, LOCK_RETRY_ATTEMPTS, err)
+            time.sleep(delay * random.uniform(0.5, 1.5))
+            delay = min(LOCK_RETRY_MAX, delay * 2)
+        finally:
+            cursor.close()
+
+def _connect():
+    """A pooled connection (a new one when pooling is off); raises sqlite3.Error"""
+    if POOL_SIZE <= 0:
+        return _open_connection(DB_FILE, cached_statements=STATEMENT_CACHE_SIZE)
+    return get_pool().acquire()
+
 def get_db_connection():
-    """Create and return SQLite database connection"""
+    """Return a SQLite database connection from the pool; close() gives it back"""
     try:
-        conn = sqlite3.connect(str(DB_FILE))
-        conn.row_factory = sqlite3.Row
-        return conn
+        return _connect()
     except sqlite3.Error as err:
+        _error('connect')
         st.error(f"Database connection error: {err}")
         return None
 
+def _create_tables(cursor):
+    """Create the users and predictions tables"""
+    # Create users table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            full_name TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    # Create predictions table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS predictions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            pregnancies INTEGER,
+            glucose REAL,
+            blood_pressure REAL,
+            skin_thickness REAL,
+            insulin REAL,
+            bmi REAL,
+            diabetes_pedigree_function REAL,
+            age INTEGER,
+            prediction INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    """)
+
+def _add_history_index(cursor):
+    """Index serving the History query: one user's predictions, newest first"""
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_predictions_user_created ON predictions (user_id, created_at)"
+    )
+
+def _create_revoked_sessions(cursor):
+    """Session tokens revoked by Sign Out, kept until they expire (see sessions.py)"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS revoked_sessions (
+            token_id TEXT PRIMARY KEY,
+            expires_at INTEGER NOT NULL
+        )
+    """)
+
+# Schema migrations, applied in order by init_database() and recorded in the
+# schema_migrations table. Append new steps with the next version number. Steps
+# must be idempotent: databases created before this table existed replay them.
+MIGRATIONS = [
+    (1, 'create users and predictions tables', _create_tables),
+    (2, 'index predictions by (user_id, created_at)', _add_history_index),
+    (3, 'revoked session tokens table', _create_revoked_sessions),
+]
+
+def migrate(conn):
+    """Apply pending MIGRATIONS, each in its own transaction; returns the versions applied"""
+    _retry_locked(conn, lambda cursor: cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """))
+    applied = {row[0] for row in conn.execute("SELECT version FROM schema_migrations")}
+
+    newly_applied = []
+    for version, description, step in MIGRATIONS:
+        if version in applied:
+            continue
+
+        def apply(cursor):
+            # SQLite DDL is transactional: the step and its version row commit together
+            cursor.execute("BEGIN IMMEDIATE")
+            step(cursor)
+            cursor.execute("INSERT OR IGNORE INTO schema_migrations (version, description) VALUES (?, ?)",
+                           (version, description))
+
+        _retry_locked(conn, apply)
+        logger.info("Applied schema migration %d: %s", version, description)
+        newly_applied.append(version)
+    return newly_applied
+
+def schema_version():
+    """Highest applied migration version (0 for a database that was never migrated)"""
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        return conn.execute("SELECT MAX(version) FROM schema_migrations").fetchone()[0] or 0
+    except sqlite3.OperationalError:
+        return 0
+    finally:
+        conn.close()
+
 def init_database():
-    """Initialize SQLite database and create tables"""
+    """Initialize SQLite database and bring the schema up to date"""
+    conn = None
     try:
         conn = get_db_connection()
         if conn:
-            cursor = conn.cursor()
-            
-            # Create users table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    username TEXT UNIQUE NOT NULL,
-                    email TEXT UNIQUE NOT NULL,
-                    password TEXT NOT NULL,
-                    full_name TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Create predictions table
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS predictions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    pregnancies INTEGER,
-                    glucose REAL,
-                    blood_pressure REAL,
-                    skin_thickness REAL,
-                    insulin REAL,
-                    bmi REAL,
-                    diabetes_pedigree_function REAL,
-                    age INTEGER,
-                    prediction INTEGER,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users(id)
-                )
-            """)
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
+            # The journal mode is stored in the database file, so every later connection uses it
+            mode = _retry_locked(conn, lambda cursor: cursor.execute(
+                f"PRAGMA journal_mode = {JOURNAL_MODE}").fetchone()[0])
+            if mode.lower() != JOURNAL_MODE.lower():
+                logger.warning("SQLite journal mode is %s, %s was requested", mode, JOURNAL_MODE)
+
+            migrate(conn)
             return True
     except Exception as e:
+        _error('init_database')
         st.error(f"Database initialization error: {e}")
         return False
+    finally:
+        if conn:
+            conn.close()
 
+@_timed('hash_password')
 def hash_password(password):
-    """Hash a password using bcrypt"""
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+    """Hash a password using bcrypt at the calibrated cost, in the hashing pool (see passwords.py)"""
+    return passwords.hash_password(password)
 
+@_timed('verify_password')
 def verify_password(password, hashed_password):
-    """Verify a password against its hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+    """Verify a password against its hash, in the hashing pool"""
+    return passwords.verify_password(password, hashed_password)
 
+@_timed('update_password_hash')
+def _update_password_hash(user_id, old_hash, new_hash):
+    """Store a rehashed password unless the hash changed meanwhile; raises on failure"""
+    conn = _connect()
+    try:
+        _retry_locked(conn, lambda cursor: cursor.execute(
+            "UPDATE users SET password = ? WHERE id = ? AND password = ?", (new_hash, user_id, old_hash)))
+    finally:
+        conn.close()
+
+@_timed('register_user')
 def register_user(username, email, password, full_name):
     """Register a new user"""
+    # Hash before taking a pooled connection so bcrypt does not hold it
+    hashed_password = hash_password(password)
+
     conn = get_db_connection()
     if not conn:
         return False, "Database connection failed"
@@ -89,28 +419,29 @@ def register_user(username, email, password, full_name):
     try:
         cursor = conn.cursor()
         
-        # Check if username or email already exists
-        cursor.execute("SELECT id FROM users WHERE username = ? OR email = ?", (username, email))
-        if cursor.fetchone():
-            cursor.close()
-            conn.close()
+        # Check if username or email already exists: one unique-index probe each
+        cursor.execute(
+            "SELECT id FROM users WHERE username = ? UNION ALL SELECT id FROM users WHERE email = ? LIMIT 1",
+            (username, email)
+        )
+        existing = cursor.fetchone()
+        cursor.close()
+        if existing:
             return False, "Username or email already exists"
         
-        # Hash the password
-        hashed_password = hash_password(password)
-        
         # Insert new user
-        cursor.execute(
+        _retry_locked(conn, lambda cursor: cursor.execute(
             "INSERT INTO users (username, email, password, full_name) VALUES (?, ?, ?, ?)",
             (username, email, hashed_password, full_name)
-        )
-        conn.commit()
-        cursor.close()
-        conn.close()
+        ))
         return True, "Registration successful! You can now login."
     except Exception as err:
+        _error('register_user')
         return False, f"Registration error: {err}"
+    finally:
+        conn.close()
 
+@_timed('login_user')
 def login_user(username, password):
     """Authenticate a user"""
     conn = get_db_connection()
@@ -127,15 +458,27 @@ def login_user(username, password):
         )
         user = cursor.fetchone()
         cursor.close()
+    except Exception as err:
+        _error('login_user')
+        return False, None, f"Login error: {err}"
+    finally:
+        # Released before bcrypt runs
         conn.close()
-        
+
+    try:
         if user and verify_password(password, user[2]):
+            if passwords.needs_rehash(user[2]):
+                # Stored at an outdated cost: replace it without delaying the login
+                passwords.rehash_in_background(
+                    password, lambda new_hash: _update_password_hash(user[0], user[2], new_hash))
             return True, {'id': user[0], 'username': user[1], 'full_name': user[3]}, "Login successful"
         else:
             return False, None, "Invalid username or password"
     except Exception as err:
+        _error('login_user')
         return False, None, f"Login error: {err}"
 
+@_timed('save_prediction')
 def save_prediction(user_id, pregnancies, glucose, blood_pressure, skin_thickness, 
                    insulin, bmi, dpf, age, prediction):
     """Save prediction to database"""
@@ -144,22 +487,99 @@ def save_prediction(user_id, pregnancies, glucose, blood_pressure, skin_thicknes
         return False
     
     try:
-        cursor = conn.cursor()
-        cursor.execute(
+        row_id = _retry_locked(conn, lambda cursor: cursor.execute(
             """INSERT INTO predictions 
             (user_id, pregnancies, glucose, blood_pressure, skin_thickness, insulin, bmi, 
              diabetes_pedigree_function, age, prediction) 
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
             (user_id, pregnancies, glucose, blood_pressure, skin_thickness, insulin, 
              bmi, dpf, age, prediction)
-        )
-        conn.commit()
-        cursor.close()
-        conn.close()
+        ).lastrowid)
+        _write_through(conn, row_id, [user_id])
         return True
     except Exception as err:
+        _error('save_prediction')
+        logger.error("Could not save prediction for user %s: %s", user_id, err)
         return False
+    finally:
+        conn.close()
 
+@_timed('save_predictions')
+def save_predictions(rows):
+    """
+    Insert prediction rows with executemany in a single transaction. Each row is
+    (user_id, pregnancies, glucose, blood_pressure, skin_thickness, insulin, bmi,
+    dpf, age, prediction, created_at). Raises on failure (used by prediction_writer).
+    """
+    def insert(cursor):
+        cursor.executemany(
+            """INSERT INTO predictions 
+            (user_id, pregnancies, glucose, blood_pressure, skin_thickness, insulin, bmi, 
+             diabetes_pedigree_function, age, prediction, created_at) 
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            rows
+        )
+        # The write lock is held for the whole transaction, so the new ids are consecutive
+        return cursor.execute("SELECT last_insert_rowid()").fetchone()[0] - len(rows) + 1
+
+    conn = _connect()
+    try:
+        first_id = _retry_locked(conn, insert)
+        _write_through(conn, first_id, [row[0] for row in rows])
+    finally:
+        conn.close()
+
+# Recent history per user, kept current by save_prediction / save_predictions (see history_cache.py)
+history_cache = HistoryCache('sqlite')
+
+def _write_through(conn, first_id, user_ids):
+    """
+    Add the rows just committed (ids from first_id on) to history_cache for the
+    users it holds, read back by primary key in the history row layout. Never
+    raises: the rows are stored, so on failure those users are reloaded instead.
+    """
+    user_ids = [user_id for user_id in set(user_ids) if history_cache.cached(user_id)]
+    if not user_ids:
+        return
+    try:
+        cursor = conn.cursor()
+        for user_id in user_ids:
+            cursor.execute(
+                """SELECT id, pregnancies, glucose, blood_pressure, skin_thickness, insulin, 
+                         bmi, diabetes_pedigree_function, age, prediction, created_at 
+                  FROM predictions WHERE id >= ? AND user_id = ?""",
+                (first_id, user_id)
+            )
+            history_cache.add(user_id, cursor.fetchall())
+        cursor.close()
+    except sqlite3.Error as err:
+        logger.warning("History cache write-through failed, reloading users %s: %s", user_ids, err)
+        for user_id in user_ids:
+            history_cache.invalidate(user_id)
+
+prediction_writer = WriteBehindQueue(save_predictions, name='sqlite', maxsize=WRITE_BEHIND_QUEUE_SIZE,
+                                     batch_size=WRITE_BEHIND_BATCH_SIZE,
+                                     key=lambda row: row[0])  # by user id
+
+def queue_prediction(user_id, pregnancies, glucose, blood_pressure, skin_thickness,
+                     insulin, bmi, dpf, age, prediction):
+    """Save a prediction without waiting for the database (write-behind)"""
+    if not WRITE_BEHIND:
+        return save_prediction(user_id, pregnancies, glucose, blood_pressure, skin_thickness,
+                               insulin, bmi, dpf, age, prediction)
+    # Stamped now, in UTC like CURRENT_TIMESTAMP, so the history order is the submission order
+    created_at = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+    return prediction_writer.submit((user_id, pregnancies, glucose, blood_pressure, skin_thickness,
+                                     insulin, bmi, dpf, age, prediction, created_at))
+
+def flush_predictions(timeout=5.0, user_id=None):
+    """
+    Wait until queued predictions are written, all of them or only user_id's
+    (immediate when that user has none queued); returns False on timeout
+    """
+    return prediction_writer.flush(timeout, key=user_id)
+
+@_timed('get_user_predictions')
 def get_user_predictions(user_id):
     """Get all predictions for a user"""
     conn = get_db_connection()
@@ -176,11 +596,70 @@ def get_user_predictions(user_id):
         )
         predictions = cursor.fetchall()
         cursor.close()
-        conn.close()
         return predictions
     except Exception as err:
+        _error('get_user_predictions')
         return []
+    finally:
+        conn.close()
 
+def get_user_predictions_page(user_id, page_size=20, cursor=None):
+    """
+    One page of a user's predictions, newest first, in the same row layout as
+    get_user_predictions. cursor is None for the first page, or the next_cursor
+    returned with the previous page. Returns (rows, next_cursor); next_cursor
+    is None on the last page.
+
+    Served from history_cache while the page is within the user's recent rows;
+    otherwise queried with _query_predictions_page.
+    """
+    try:
+        return history_cache.page(user_id, page_size, cursor,
+                                  lambda limit, after: _query_predictions_page(user_id, limit, after))
+    except sqlite3.Error:
+        return [], None
+
+def history_version(user_id):
+    """Version of the user's cached history (see HistoryCache.version), or None if not cached"""
+    return history_cache.version(user_id)
+
+@_timed('get_user_predictions_page')
+def _query_predictions_page(user_id, page_size, cursor):
+    """
+    Query one page for get_user_predictions_page; raises sqlite3.Error.
+
+    Keyset pagination on (created_at, id): each page is an index range scan
+    starting after the cursor, so its cost does not grow with history length.
+    """
+    conn = _connect()
+    try:
+        db_cursor = conn.cursor()
+        query = """SELECT id, pregnancies, glucose, blood_pressure, skin_thickness, insulin, 
+                     bmi, diabetes_pedigree_function, age, prediction, created_at 
+              FROM predictions WHERE user_id = ?"""
+        order = " ORDER BY created_at DESC, id DESC LIMIT ?"
+        if cursor is None:
+            db_cursor.execute(query + order, (user_id, page_size + 1))
+        else:
+            # Rows strictly after the cursor; the created_at <= bound keeps it an index range scan
+            created_at, last_id = cursor
+            db_cursor.execute(
+                query + " AND created_at <= ? AND (created_at < ? OR id < ?)" + order,
+                (user_id, created_at, created_at, last_id, page_size + 1)
+            )
+        rows = db_cursor.fetchall()
+        db_cursor.close()
+
+        # The extra row only tells whether another page follows
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            return rows, (last[10], last[0])
+        return rows, None
+    finally:
+        conn.close()
+
+@_timed('get_user_by_id')
 def get_user_by_id(user_id):
     """Get user information by ID"""
     conn = get_db_connection()
@@ -195,9 +674,59 @@ def get_user_by_id(user_id):
         )
         user = cursor.fetchone()
         cursor.close()
-        conn.close()
         if user:
             return {'id': user[0], 'username': user[1], 'email': user[2], 'full_name': user[3]}
         return None
     except Exception as err:
+        _error('get_user_by_id')
         return None
+    finally:
+        conn.close()
+
+@_timed('revoke_session')
+def revoke_session(token_id, expires_at):
+    """
+    Record a revoked session token until expires_at (Unix time), for every
+    process sharing this database; expired entries are dropped. Returns True
+    on success.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return False
+
+    try:
+        def write(cursor):
+            cursor.execute("INSERT OR IGNORE INTO revoked_sessions (token_id, expires_at) VALUES (?, ?)",
+                           (token_id, int(expires_at)))
+            cursor.execute("DELETE FROM revoked_sessions WHERE expires_at < ?", (int(time.time()),))
+
+        _retry_locked(conn, write)
+        return True
+    except Exception as err:
+        _error('revoke_session')
+        logger.error("Could not record revoked session %s: %s", token_id, err)
+        return False
+    finally:
+        conn.close()
+
+@_timed('session_revoked')
+def session_revoked(token_id):
+    """
+    True if a session token was revoked. Also True when the check fails, so a
+    token that cannot be checked is not used to restore a login.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return True
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1 FROM revoked_sessions WHERE token_id = ?", (token_id,))
+        revoked = cursor.fetchone() is not None
+        cursor.close()
+        return revoked
+    except Exception as err:
+        _error('session_revoked')
+        return True
+    finally:
+        conn.close()
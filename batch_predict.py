@@ -0,0 +1,130 @@
+"""
+Batch Scoring Tool
+Scores large patient CSV files (diabetes.csv column layout) with the trained model
+
+The input is streamed in fixed-size chunks, so memory stays flat regardless of
+file size. Each worker process loads the model and scaler once and then scores
+chunks as they arrive; results are written in input order as soon as they are ready.
+
+Usage:
+    python batch_predict.py patients.csv predictions.csv --chunk-size 50000 --workers 4
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+
+import pandas as pd
+
+from inference import FEATURE_COLUMNS, load_artifacts, published_artifacts
+
+# Per-process model state, populated by the pool initializer
+_model = None
+_scaler = None
+
+def _init_worker(model_file, scaler_file):
+    """Load the model and scaler once per worker process"""
+    global _model, _scaler
+    _model, _scaler = load_artifacts(model_file, scaler_file)
+
+def score_chunk(chunk):
+    """Return the chunk with a Prediction column appended"""
+    if chunk.empty:
+        # A header-only input: the scaler rejects zero rows, the output keeps the header
+        chunk['Prediction'] = pd.Series(dtype=int)
+        return chunk
+    scaled = _scaler.transform(chunk[FEATURE_COLUMNS])
+    chunk['Prediction'] = _model.predict(scaled).astype(int)
+    return chunk
+
+def _check_columns(chunk):
+    """Raise if a chunk does not have the training feature columns"""
+    missing = [col for col in FEATURE_COLUMNS if col not in chunk.columns]
+    if missing:
+        raise ValueError(f"Input is missing required columns: {', '.join(missing)}")
+
+def _scored_chunks(reader, workers, model_file, scaler_file):
+    """Yield scored chunks in input order"""
+    if workers == 1:
+        # Single process: no pickling overhead between reader and model
+        _init_worker(model_file, scaler_file)
+        for chunk in reader:
+            _check_columns(chunk)
+            yield score_chunk(chunk)
+        return
+
+    # Keep a bounded number of chunks in flight so memory does not grow with file size
+    max_pending = workers * 2
+    with Pool(workers, initializer=_init_worker, initargs=(model_file, scaler_file)) as pool:
+        pending = deque()
+        for chunk in reader:
+            _check_columns(chunk)
+            pending.append(pool.apply_async(score_chunk, (chunk,)))
+            if len(pending) >= max_pending:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+def run_batch(input_file, output_file, chunk_size=10000, workers=None,
+              model_file=None, scaler_file=None, progress=True):
+    """Score input_file in chunks and write results to output_file (default: the published model)"""
+    workers = workers or os.cpu_count() or 1
+    if model_file is None or scaler_file is None:
+        # Resolved once here, so every worker scores with the same published version
+        published_model, published_scaler = published_artifacts()
+        model_file = published_model if model_file is None else model_file
+        scaler_file = published_scaler if scaler_file is None else scaler_file
+    reader = pd.read_csv(input_file, chunksize=chunk_size)
+
+    total_rows = 0
+    start = time.perf_counter()
+    for n, scored in enumerate(_scored_chunks(reader, workers, model_file, scaler_file)):
+        first = n == 0
+        scored.to_csv(output_file, mode='w' if first else 'a', header=first, index=False)
+        total_rows += len(scored)
+        if progress:
+            _report(total_rows, start)
+
+    elapsed = time.perf_counter() - start
+    rate = total_rows / elapsed if elapsed > 0 else 0.0
+    return total_rows, elapsed, rate
+
+def _report(rows, start):
+    """Print running throughput to stderr"""
+    elapsed = time.perf_counter() - start
+    rate = rows / elapsed if elapsed > 0 else 0.0
+    print(f"\r  {rows:,} rows scored ({rate:,.0f} rows/sec)", end='', file=sys.stderr, flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a patient CSV file with the diabetes risk model")
+    parser.add_argument('input', help="CSV file in diabetes.csv column layout")
+    parser.add_argument('output', help="Destination CSV (input columns plus Prediction)")
+    parser.add_argument('--chunk-size', type=int, default=10000, help="Rows per chunk (default: 10000)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="Worker processes (default: all cores)")
+    parser.add_argument('--model', help="Model artifact path (default: the published model)")
+    parser.add_argument('--scaler', help="Scaler artifact path (default: the published scaler)")
+    parser.add_argument('--quiet', action='store_true', help="Do not print progress")
+    args = parser.parse_args()
+
+    if args.chunk_size < 1 or (args.workers is not None and args.workers < 1):
+        parser.error("--chunk-size and --workers must be positive")
+
+    try:
+        rows, elapsed, rate = run_batch(args.input, args.output, args.chunk_size, args.workers,
+                                        args.model, args.scaler, progress=not args.quiet)
+    except Exception as e:
+        print(f"\n✗ Batch scoring failed: {e}", file=sys.stderr)
+        return 1
+
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"✓ Scored {rows:,} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+    print(f"  Output: {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,4 @@
+"""
+Performance benchmarks for the Diabetes Care Portal
+Run from the project root, e.g. python -m benchmarks.tree_engine
+"""
@@ -0,0 +1,73 @@
+"""
+Shared helpers for the benchmark scripts
+"""
+
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from importlib import metadata
+
+import numpy as np
+import pandas as pd
+
+from inference import BASE_DIR, FEATURE_COLUMNS
+
+# Packages whose versions are recorded with benchmark results
+PACKAGES = ['numpy', 'pandas', 'scikit-learn', 'joblib', 'streamlit', 'bcrypt', 'mysql-connector-python']
+
+def load_features(repeat=1):
+    """Rows of diabetes.csv (optionally repeated) as a float64 array in training column order"""
+    data = pd.read_csv(BASE_DIR / 'diabetes.csv')
+    X = data[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    return np.tile(X, (repeat, 1)) if repeat > 1 else X
+
+def time_calls(fn, repeat, warmup=3):
+    """Call fn repeatedly and return per-call latencies in milliseconds"""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return np.asarray(samples)
+
+def summarize(samples):
+    """p50 / p99 / mean of a latency sample in milliseconds"""
+    return {
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p99_ms': float(np.percentile(samples, 99)),
+        'mean_ms': float(np.mean(samples)),
+    }
+
+def check(results, name, ok, detail=None):
+    """Record the outcome of a correctness check in results and print it"""
+    results.append(ok)
+    print(f"  {'✓' if ok else '✗'} {name}" + (f": {detail}" if detail is not None else ""))
+
+def environment():
+    """Metadata that makes benchmark runs comparable across commits and machines"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    versions = {}
+    for package in PACKAGES:
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+
+    return {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'packages': versions,
+    }
@@ -0,0 +1,192 @@
+"""
+Benchmark and checks: per-user history cache
+Runs a read-heavy mix of History page reads and saves from concurrent sessions on
+the SQLite backend, with the history cache disabled and enabled, and reports
+page read latency, the page queries that reached the database, the hit ratio and
+the memory the cache holds. Then checks the behaviour documented in
+history_cache.py:
+
+- a saved assessment (synchronous or write-behind) is on the next first-page
+  read, without a page query
+- pages cut from the cache match the database pages, across the cached rows
+- the estimated memory stays under max_bytes, evicting least recently used users
+- entries expire after the TTL
+- a load that races a write for the same user is not cached
+- the version of a user's entry changes only when its rows do
+
+Usage:
+    python -m benchmarks.history_cache [--sessions 8] [--reads 2000] [--write-ratio 0.05]
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+
+import auth_sqlite
+from benchmarks.common import check, summarize
+from benchmarks.suite import SEED_USERS, SqliteBackend, seed
+from history_cache import HistoryCache
+from metrics import DB_SECONDS
+
+def page_queries():
+    return DB_SECONDS.count(backend='sqlite', operation='get_user_predictions_page')
+
+def workload(sessions, reads, write_ratio, users):
+    """Concurrent sessions reading History pages and saving; returns page read latencies (ms)"""
+    samples = []
+    lock = threading.Lock()
+
+    def session(n):
+        rng = random.Random(n)
+        local = []
+        for _ in range(reads):
+            # Skewed towards a few active patients, like real traffic
+            user_id = min(int(rng.paretovariate(1.2)), users)
+            if rng.random() < write_ratio:
+                auth_sqlite.save_prediction(user_id, 1, 100, 70, 20, 80, 25.0, 0.5, 40, 0)
+                continue
+            start = time.perf_counter()
+            rows, next_cursor = auth_sqlite.get_user_predictions_page(user_id, 20)
+            if next_cursor is not None and rng.random() < 0.2:
+                auth_sqlite.get_user_predictions_page(user_id, 20, next_cursor)
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.asarray(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-user history cache benchmark and checks")
+    parser.add_argument('--sessions', type=int, default=8, help="Concurrent sessions")
+    parser.add_argument('--reads', type=int, default=2000, help="Operations per session")
+    parser.add_argument('--write-ratio', type=float, default=0.05, help="Share of operations that save")
+    parser.add_argument('--rows', type=int, default=100_000, help=f"Prediction rows to seed over {SEED_USERS} users")
+    args = parser.parse_args()
+
+    backend = SqliteBackend()
+    cache = auth_sqlite.history_cache
+    max_bytes = cache.max_bytes
+    results = []
+    try:
+        backend.reset()
+        seed(backend, args.rows)
+
+        print(f"{args.sessions} sessions x {args.reads} operations, {args.write_ratio:.0%} saves, "
+              f"{args.rows:,} rows over {SEED_USERS} users")
+        print(f"{'history cache':<14} | {'read p50':>9} | {'read p99':>9} | {'page queries':>12} | "
+              f"{'hit ratio':>9} | {'users':>5} | {'memory':>9}")
+        print("-" * 86)
+        for label, size in (('off', 0), ('on', max_bytes)):
+            cache.max_bytes = size
+            cache.clear()
+            cache.hits = cache.misses = 0
+            before = page_queries()
+            samples = workload(args.sessions, args.reads, args.write_ratio, SEED_USERS)
+            stats = summarize(samples)
+            cached = cache.stats()
+            print(f"{label:<14} | {stats['p50_ms']:>6.3f} ms | {stats['p99_ms']:>6.3f} ms | "
+                  f"{page_queries() - before:>12,} | {cached['hit_ratio']:>9.1%} | {cached['users']:>5} | "
+                  f"{cached['bytes'] / 1024:>6.0f} KB")
+        cache.max_bytes = max_bytes
+
+        print("\nChecks")
+        auth_sqlite.get_user_predictions_page(1, 20)
+        before = page_queries()
+        auth_sqlite.save_prediction(1, 3, 111, 70, 20, 80, 25.0, 0.5, 33, 1)
+        rows, _ = auth_sqlite.get_user_predictions_page(1, 20)
+        newest = auth_sqlite._query_predictions_page(1, 1, None)[0][0]
+        check(results, "saved assessment shown without a re-query",
+              rows[0] == newest and page_queries() - before == 1,
+              f"first row id {rows[0][0]} (newest {newest[0]}), {page_queries() - before - 1} page queries for the read")
+
+        before = page_queries()
+        auth_sqlite.queue_prediction(1, 4, 122, 70, 20, 80, 25.0, 0.5, 34, 0)
+        auth_sqlite.flush_predictions()
+        rows, _ = auth_sqlite.get_user_predictions_page(1, 20)
+        newest = auth_sqlite._query_predictions_page(1, 1, None)[0][0]
+        check(results, "queued assessment shown after flush without a re-query",
+              rows[0] == newest and page_queries() - before == 1,
+              f"first row id {rows[0][0]} (newest {newest[0]}), {page_queries() - before - 1} page queries for the read")
+
+        # A user with more rows than the cache keeps, some sharing a timestamp
+        stamps = [f"2026-01-01 00:{i // 120:02d}:{(i // 2) % 60:02d}" for i in range(cache.rows_per_user * 2)]
+        auth_sqlite.save_predictions([(2, 0, 100, 70, 20, 80, 25.0, 0.5, i % 80, 0, stamp)
+                                      for i, stamp in enumerate(stamps)])
+        cache.invalidate(2)
+        pages_match = True
+        cached_cursor = db_cursor = None
+        pages = 0
+        while True:
+            cached_page = auth_sqlite.get_user_predictions_page(2, 7, cached_cursor)
+            db_page = auth_sqlite._query_predictions_page(2, 7, db_cursor)
+            pages += 1
+            pages_match = pages_match and cached_page == db_page
+            (_, cached_cursor), (_, db_cursor) = cached_page, db_page
+            if cached_cursor is None or db_cursor is None:
+                break
+        check(results, "cached pages match the database", pages_match and cached_cursor == db_cursor,
+              f"{pages} pages of 7 compared")
+
+        bounded = HistoryCache('check-bound', max_bytes=256 * 1024)
+        for user_id in range(1, SEED_USERS + 1):
+            bounded.page(user_id, 20, None,
+                         lambda limit, cursor: auth_sqlite._query_predictions_page(user_id, limit, cursor))
+        stats = bounded.stats()
+        check(results, "memory bounded by max_bytes", stats['bytes'] <= stats['max_bytes'] and stats['evictions'] > 0,
+              f"{stats['bytes'] / 1024:.0f} KB of {stats['max_bytes'] / 1024:.0f} KB, {stats['users']} users, "
+              f"{stats['evictions']} evicted")
+
+        expiring = HistoryCache('check-ttl', ttl=0.05)
+        query = lambda limit, cursor: auth_sqlite._query_predictions_page(1, limit, cursor)
+        expiring.page(1, 20, None, query)
+        expiring.page(1, 20, None, query)
+        time.sleep(0.1)
+        expiring.page(1, 20, None, query)
+        stats = expiring.stats()
+        check(results, "entries expire after the TTL", (stats['hits'], stats['misses'], stats['expired']) == (1, 2, 1),
+              f"{stats['hits']} hit, {stats['misses']} misses, {stats['expired']} expired")
+
+        racing = HistoryCache('check-race')
+
+        def load_during_write(limit, cursor):
+            rows = auth_sqlite._query_predictions_page(1, limit, cursor)
+            racing.add(1, [])  # a save for user 1 commits while the load is in flight
+            return rows
+
+        racing.page(1, 20, None, load_during_write)
+        check(results, "load racing a write not cached", not racing.cached(1),
+              f"{racing.stats()['users']} users cached")
+
+        versioned = HistoryCache('check-version')
+        query = lambda limit, cursor: auth_sqlite._query_predictions_page(1, limit, cursor)
+        unloaded = versioned.version(1)
+        versioned.page(1, 20, None, query)
+        loaded = versioned.version(1)
+        versioned.page(1, 20, None, query)
+        read = versioned.version(1)
+        versioned.add(1, auth_sqlite._query_predictions_page(1, 1, None)[0])
+        written = versioned.version(1)
+        versioned.invalidate(1)
+        check(results, "version changes only with the rows",
+              unloaded is None and loaded == read != written and versioned.version(1) is None,
+              f"versions {unloaded}, {loaded}, {read}, {written}, {versioned.version(1)} "
+              f"(unloaded, loaded, read, written, invalidated)")
+    finally:
+        cache.max_bytes = max_bytes
+        auth_sqlite.flush_predictions(timeout=30)
+        backend.close()
+
+    if not all(results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Import-time report for the app's modules
+Imports each module in a fresh interpreter with `python -X importtime` and reports
+its cumulative import cost in milliseconds. With --app, also times the first render
+of a Streamlit entry point (the login page) and lists which heavy modules had
+already been imported when it finished.
+
+Usage:
+    python -m benchmarks.import_times [--app app_sqlite.py] [--json]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+from inference import BASE_DIR
+
+# Project modules first, then the third-party stack they pull in
+MODULES = [
+    'config', 'auth_sqlite', 'auth', 'inference', 'tree_engine',
+    'streamlit', 'pandas', 'numpy', 'joblib', 'sklearn.ensemble', 'bcrypt', 'mysql.connector',
+]
+HEAVY_MODULES = ['pandas', 'numpy', 'joblib', 'sklearn', 'bcrypt', 'mysql.connector']
+
+RENDER_CODE = """
+import json, sys, time, warnings
+warnings.filterwarnings('ignore')
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+AppTest.from_file(sys.argv[1], default_timeout=120).run()
+render_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({'render_ms': render_ms,
+                  'imported': [m for m in sys.argv[2:] if m in sys.modules]}))
+"""
+
+def import_time_ms(module):
+    """Cumulative import time of module in a fresh interpreter, or None if it cannot be imported"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+        cwd=BASE_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        return None
+    for line in reversed(result.stderr.splitlines()):
+        parts = [part.strip() for part in line.split('|')]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    return None
+
+def first_render(app):
+    """Time the first run of a Streamlit script and list heavy modules imported by then"""
+    result = subprocess.run(
+        [sys.executable, '-c', RENDER_CODE, str(BASE_DIR / app), *HEAVY_MODULES],
+        cwd=BASE_DIR, capture_output=True, text=True,
+    )
+    # The JSON line is the result, whatever happens after it
+    for line in reversed(result.stdout.splitlines()):
+        try:
+            render = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(render, dict):
+            return render
+    return {'error': result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed'}
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-module import time report")
+    parser.add_argument('modules', nargs='*', default=MODULES, help="Modules to time")
+    parser.add_argument('--app', help="Also time the first render of this Streamlit script")
+    parser.add_argument('--json', action='store_true', help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = {'import_ms': {module: import_time_ms(module) for module in args.modules}}
+    if args.app:
+        report['first_render'] = first_render(args.app)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'module':<20} | {'import time':>12}")
+    print("-" * 35)
+    for module, ms in report['import_ms'].items():
+        print(f"{module:<20} | {'not installed' if ms is None else f'{ms:9.1f} ms':>12}")
+    if args.app:
+        render = report['first_render']
+        print()
+        if 'error' in render:
+            print(f"First render of {args.app} failed: {render['error']}")
+        else:
+            print(f"First render of {args.app}: {render['render_ms']:.0f} ms")
+            print(f"Heavy modules already imported: {', '.join(render['imported']) or 'none'}")
+
+if __name__ == "__main__":
+    main()
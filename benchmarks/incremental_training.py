@@ -0,0 +1,59 @@
+"""
+Benchmark: incremental (warm-start) update vs full retraining
+Grows a synthetic dataset from diabetes.csv (rows resampled with small jitter) and,
+for each size, compares retraining the forest from scratch with appending trees
+fitted only on the newest batch.
+
+Usage:
+    python -m benchmarks.incremental_training [--sizes 768 3072 12288] [--batch-fraction 0.1]
+"""
+
+import argparse
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from inference import FEATURE_COLUMNS
+from train_model import fit_pipeline, load_data, warm_start_update
+
+def synthetic_data(X, y, n_rows, seed):
+    """n_rows rows resampled from (X, y) with 2% multiplicative jitter"""
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, len(y), n_rows)
+    values = X.to_numpy(dtype=np.float64)[idx]
+    values *= rng.normal(1.0, 0.02, values.shape)
+    return pd.DataFrame(values, columns=FEATURE_COLUMNS), y[idx]
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental update vs full retrain benchmark")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[768, 3072, 12288, 49152])
+    parser.add_argument('--batch-fraction', type=float, default=0.1,
+                        help="New batch size as a fraction of the dataset (default: 0.1)")
+    parser.add_argument('--trees', type=int, default=100, help="Trees in the full model")
+    parser.add_argument('--new-trees', type=int, default=20, help="Trees added per update")
+    args = parser.parse_args()
+
+    X, y = load_data()
+    params = {'n_estimators': args.trees}
+    print(f"{'rows':>8} | {'batch':>7} | {'full retrain':>12} | {'incremental':>11} | {'speedup':>7}")
+    print("-" * 60)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for size in args.sizes:
+            X_all, y_all = synthetic_data(X, y, size, seed=size)
+            batch = max(2, int(size * args.batch_fraction))
+            X_old, y_old = X_all.iloc[:-batch], y_all[:-batch]
+            X_new, y_new = X_all.iloc[-batch:], y_all[-batch:]
+
+            # Existing model trained on everything but the newest batch
+            scaler, model, _ = fit_pipeline(params, X_old, y_old)
+
+            _, _, full_seconds = fit_pipeline(params, X_all, y_all)
+            incremental_seconds = warm_start_update(model, scaler, X_new, y_new, args.new_trees,
+                                                    max_trees=args.trees)
+            print(f"{size:>8,} | {batch:>7,} | {full_seconds:>10.2f} s | {incremental_seconds:>9.2f} s | "
+                  f"{full_seconds / incremental_seconds:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Load generator for inference_server.py
+Sends single-row /predict requests from N concurrent clients (each reusing one
+keep-alive connection) and reports throughput and tail latency per concurrency level.
+
+Usage:
+    python inference_server.py --port 8600 &
+    python -m benchmarks.load_generator --url http://127.0.0.1:8600 --concurrency 1 8 32
+"""
+
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+from benchmarks.common import load_features
+
+def client(host, port, rows, offset, stop_at, latencies, errors):
+    """One client: send requests back to back until stop_at"""
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    i = offset
+    samples = []
+    while time.perf_counter() < stop_at:
+        body = json.dumps({'features': rows[i % len(rows)]})
+        start = time.perf_counter()
+        try:
+            conn.request('POST', '/predict', body, {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        samples.append((time.perf_counter() - start) * 1000)
+        i += 1
+    conn.close()
+    latencies.extend(samples)
+
+def run_level(host, port, rows, concurrency, duration):
+    """Run one concurrency level, return throughput and latency percentiles"""
+    latencies, errors = [], []
+    stop_at = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=client, args=(host, port, rows, n * 101, stop_at, latencies, errors))
+        for n in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    samples = np.asarray(latencies) if latencies else np.zeros(1)
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'throughput_rps': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'p99_ms': float(np.percentile(samples, 99)),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for the inference server")
+    parser.add_argument('--url', default='http://127.0.0.1:8600')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per level")
+    parser.add_argument('--json', action='store_true', help="Print results as JSON")
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    host, port = url.hostname, url.port or 80
+    rows = [list(map(float, row)) for row in load_features()]
+
+    results = [run_level(host, port, rows, level, args.duration) for level in args.concurrency]
+
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    conn.request('GET', '/health')
+    batching = json.loads(conn.getresponse().read()).get('batching')
+    conn.close()
+
+    if args.json:
+        print(json.dumps({'results': results, 'batching': batching}, indent=2))
+        return
+
+    print(f"{'clients':>7} | {'req/s':>8} | {'p50':>9} | {'p95':>9} | {'p99':>9} | {'errors':>6}")
+    print("-" * 62)
+    for r in results:
+        print(f"{r['concurrency']:>7} | {r['throughput_rps']:>8.0f} | {r['p50_ms']:>6.2f} ms | "
+              f"{r['p95_ms']:>6.2f} ms | {r['p99_ms']:>6.2f} ms | {r['errors']:>6}")
+    if batching:
+        print(f"\nServer micro-batches: {batching['batches']:,}, "
+              f"mean batch size {batching['mean_batch_size']:.1f}")
+
+if __name__ == "__main__":
+    main()
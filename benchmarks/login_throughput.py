@@ -0,0 +1,148 @@
+"""
+Benchmark and checks: login throughput with the bcrypt hashing pool
+Runs a burst of concurrent logins on the SQLite backend with the previous setup
+(bcrypt in the calling thread at the library default cost of 12), then with the
+hashing pool at cost 12 and at the calibrated cost (see passwords.py). Reports logins/sec,
+login latency, and the latency of another session's database call during the
+burst, then checks that the calibration lands near the target and that a login
+with an outdated hash rewrites it at the current cost.
+
+Usage:
+    python -m benchmarks.login_throughput [--threads 8] [--seconds 10]
+"""
+
+import argparse
+import sys
+import threading
+import time
+
+import bcrypt
+
+import auth_sqlite
+import passwords
+from benchmarks.common import summarize
+from benchmarks.suite import SEED_USERS, SqliteBackend, seed
+
+PASSWORD = 'benchmark-pw'
+
+# passwords.py settings for each configuration
+CONFIGS = {
+    'inline, cost 12 (before)': {'WORKERS': 0, 'ROUNDS': 12},
+    'pool, cost 12': {'ROUNDS': 12},
+    'pool, calibrated': {},
+}
+
+def set_all_hashes(hashed):
+    conn = auth_sqlite.get_db_connection()
+    conn.execute("UPDATE users SET password = ?", (hashed,))
+    conn.commit()
+    conn.close()
+
+def stored_hash(user_id):
+    conn = auth_sqlite.get_db_connection()
+    hashed = conn.execute("SELECT password FROM users WHERE id = ?", (user_id,)).fetchone()[0]
+    conn.close()
+    return hashed
+
+def burst(threads, seconds):
+    """Concurrent logins for a fixed time while a probe session keeps reading; returns a result dict"""
+    logins = []
+    probes = []
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def login_worker(n):
+        local = []
+        i = n
+        while not stop.is_set():
+            start = time.perf_counter()
+            ok, _, _ = auth_sqlite.login_user(f"seed{i % SEED_USERS}", PASSWORD)
+            local.append((time.perf_counter() - start) * 1000)
+            assert ok
+            i += threads
+        with lock:
+            logins.extend(local)
+
+    def probe():
+        while not stop.is_set():
+            start = time.perf_counter()
+            auth_sqlite.get_user_by_id(1)
+            probes.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.005)
+
+    workers = [threading.Thread(target=login_worker, args=(n,)) for n in range(threads)]
+    workers.append(threading.Thread(target=probe))
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {'logins_per_s': len(logins) / elapsed, 'login': summarize(logins), 'probe': summarize(probes)}
+
+def main():
+    parser = argparse.ArgumentParser(description="Login throughput with the bcrypt hashing pool")
+    parser.add_argument('--threads', type=int, default=8, help="Concurrent login sessions")
+    parser.add_argument('--seconds', type=float, default=10.0, help="Duration of each burst")
+    args = parser.parse_args()
+
+    backend = SqliteBackend()
+    results = []
+    defaults = {name: getattr(passwords, name) for name in ('WORKERS', 'ROUNDS', 'REHASH_ON_LOGIN')}
+    try:
+        backend.reset()
+        seed(backend, 1000)
+        passwords.REHASH_ON_LOGIN = False
+
+        print(f"{args.threads} concurrent login sessions for {args.seconds:.0f} s, "
+              f"{passwords.WORKERS} bcrypt worker(s)\n")
+        print(f"{'configuration':<25} | {'cost':>4} | {'logins/s':>8} | {'login p50':>10} | {'login p99':>10} | "
+              f"{'other session p99':>17}")
+        print("-" * 90)
+        for name, settings in CONFIGS.items():
+            for key, value in settings.items():
+                setattr(passwords, key, value)
+            cost = passwords.rounds()
+            set_all_hashes(bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds=cost)).decode('utf-8'))
+            r = burst(args.threads, args.seconds)
+            print(f"{name:<25} | {cost:>4} | {r['logins_per_s']:>8.1f} | {r['login']['p50_ms']:>7.0f} ms | "
+                  f"{r['login']['p99_ms']:>7.0f} ms | {r['probe']['p99_ms']:>14.2f} ms")
+            for key, value in defaults.items():
+                setattr(passwords, key, value)
+            passwords.REHASH_ON_LOGIN = False
+
+        print("\nChecks")
+        cost = passwords.rounds()
+        start = time.perf_counter()
+        passwords.hash_password(PASSWORD)
+        hash_ms = (time.perf_counter() - start) * 1000
+        ok = passwords.TARGET_MS / 2 <= hash_ms <= passwords.TARGET_MS * 2 or cost in (
+            passwords.MIN_ROUNDS, passwords.MAX_ROUNDS)
+        results.append(ok)
+        print(f"  {'✓' if ok else '✗'} calibrated cost {cost}: one hash takes {hash_ms:.0f} ms "
+              f"(target {passwords.TARGET_MS:.0f} ms)")
+
+        passwords.REHASH_ON_LOGIN = True
+        set_all_hashes(bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds=4)).decode('utf-8'))
+        auth_sqlite.login_user('seed0', PASSWORD)
+        deadline = time.monotonic() + 30
+        while passwords.hash_rounds(stored_hash(1)) != cost and time.monotonic() < deadline:
+            time.sleep(0.05)
+        rehashed = passwords.hash_rounds(stored_hash(1))
+        login_ok = auth_sqlite.login_user('seed0', PASSWORD)[0]
+        ok = rehashed == cost and login_ok
+        results.append(ok)
+        print(f"  {'✓' if ok else '✗'} login with a cost-4 hash stores a cost-{rehashed} hash, "
+              f"login afterwards {'succeeds' if login_ok else 'fails'}")
+    finally:
+        for key, value in defaults.items():
+            setattr(passwords, key, value)
+        backend.close()
+
+    if not all(results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
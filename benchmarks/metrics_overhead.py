@@ -0,0 +1,91 @@
+"""
+Benchmark: cost of the metrics instrumentation
+Times the metrics primitives on their own (histogram observation, counter increment,
+the stage() context manager and the timed() decorator) and compares an uninstrumented
+single-row prediction with Predictor.predict_row, which records scale and predict
+stages, to show the overhead relative to the work being measured
+
+Usage:
+    python -m benchmarks.metrics_overhead [--calls 200000] [--engine flat]
+"""
+
+import argparse
+import time
+
+from benchmarks.common import load_features, summarize, time_calls
+from inference import ENGINES, Predictor, load_artifacts
+from metrics import Counter, Histogram, Registry, stage, timed
+
+def per_call_ns(fn, calls):
+    """Mean cost of fn() in nanoseconds over a tight loop"""
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter_ns() - start) / calls
+
+def noop():
+    pass
+
+def main():
+    parser = argparse.ArgumentParser(description="Metrics instrumentation overhead benchmark")
+    parser.add_argument('--calls', type=int, default=200_000, help="Loop iterations per primitive")
+    parser.add_argument('--predictions', type=int, default=5000, help="Timed predictions per path")
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--engine', choices=ENGINES, default='flat')
+    args = parser.parse_args()
+
+    # Private registry so the benchmark series do not pollute the exported ones
+    registry = Registry()
+    histogram = Histogram('bench_seconds', 'Benchmark histogram', ['stage'], registry=registry)
+    counter = Counter('bench_total', 'Benchmark counter', ['stage'], registry=registry)
+    instrumented_noop = timed(histogram, counter, stage='noop')(noop)
+
+    def with_stage():
+        with stage('bench_overhead'):
+            pass
+
+    baseline = per_call_ns(noop, args.calls)
+    print(f"{'primitive':<28} | {'ns/call':>8}")
+    print("-" * 40)
+    for name, fn in (('function call (baseline)', noop),
+                     ('Counter.inc', lambda: counter.inc(stage='noop')),
+                     ('Histogram.observe', lambda: histogram.observe(0.001, stage='noop')),
+                     ('stage() context manager', with_stage),
+                     ('timed() decorated call', instrumented_noop)):
+        cost = per_call_ns(fn, args.calls)
+        print(f"{name:<28} | {cost - (baseline if fn is not noop else 0):>8.0f}")
+
+    start = time.perf_counter()
+    text = registry.render()
+    print(f"\nrender(): {(time.perf_counter() - start) * 1000:.3f} ms for {len(text):,} bytes")
+
+    # End to end: predict_row records two stage observations per uncached prediction
+    model, scaler = load_artifacts(engine=args.engine)
+    predictor = Predictor(model, scaler)
+    rows = [list(map(float, row)) for row in load_features()]
+    position = iter(range(10**9))
+
+    def bare():
+        row = rows[next(position) % len(rows)]
+        return int(model.predict(predictor.scale_row(row))[0])
+
+    def instrumented():
+        row = rows[next(position) % len(rows)]
+        return predictor.predict_row(row)
+
+    # Alternate the two paths in short rounds so machine noise hits both equally
+    print(f"\nSingle-row prediction ({args.engine} engine, no cache, {args.rounds} alternating rounds)")
+    samples = {'uninstrumented': [], 'instrumented': []}
+    per_round = max(1, args.predictions // args.rounds)
+    for _ in range(args.rounds):
+        for name, fn in (('uninstrumented', bare), ('instrumented', instrumented)):
+            samples[name].extend(time_calls(fn, per_round, warmup=5))
+    results = {name: summarize(values) for name, values in samples.items()}
+    for name, stats in results.items():
+        print(f"  {name:<15} p50 {stats['p50_ms']:.4f} ms  mean {stats['mean_ms']:.4f} ms")
+    overhead = results['instrumented']['p50_ms'] - results['uninstrumented']['p50_ms']
+    print(f"  p50 overhead: {overhead * 1000:+.1f} us per prediction "
+          f"({overhead / results['uninstrumented']['p50_ms'] * 100:+.2f}%)")
+
+if __name__ == "__main__":
+    main()
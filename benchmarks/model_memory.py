@@ -0,0 +1,95 @@
+"""
+Benchmark: model load time and resident memory per process
+Starts several Python processes that each load the model the way load_resources() does
+and keep it alive, then reports model load time (imports excluded), RSS and PSS (RSS with shared pages divided between the
+processes that map them) for every process.
+
+Usage:
+    python -m benchmarks.model_memory [--processes 4]
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+from inference import FLAT_MODEL_DIR, load_flat_model
+
+# Run inside each child: load, exercise the model, report, then wait until told to exit
+CHILD_CODE = """
+import json, sys, time
+import warnings; warnings.filterwarnings('ignore')
+import joblib, numpy as np, sklearn.ensemble
+from inference import MODEL_FILE, SCALER_FILE, load_flat_model
+start = time.perf_counter()
+if sys.argv[1] == 'sklearn':
+    model = joblib.load(MODEL_FILE)
+else:
+    model = load_flat_model(flat_dir=None if sys.argv[2] == 'none' else sys.argv[2])
+load_ms = (time.perf_counter() - start) * 1000
+scaler = joblib.load(SCALER_FILE)
+model.predict(np.zeros((256, 8)))
+print(json.dumps({'load_ms': load_ms}), flush=True)
+sys.stdin.readline()
+"""
+
+def memory_of(pid):
+    """RSS and PSS of a process in MiB (Linux /proc)"""
+    usage = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss', 'Shared_Clean', 'Private_Dirty'):
+                usage[key] = int(rest.split()[0]) / 1024
+    return usage
+
+def measure(engine, flat_dir, processes):
+    """Start processes that load the model, return per-process load time and memory"""
+    children = []
+    for _ in range(processes):
+        children.append(subprocess.Popen(
+            [sys.executable, '-c', CHILD_CODE, engine, str(flat_dir) if flat_dir else 'none'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        ))
+    results = []
+    try:
+        for child in children:
+            loaded = json.loads(child.stdout.readline())
+            results.append(loaded)
+        time.sleep(0.2)
+        for child, result in zip(children, results):
+            result.update(memory_of(child.pid))
+    finally:
+        for child in children:
+            child.stdin.close()
+            child.wait()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Model load time and memory per process")
+    parser.add_argument('--processes', type=int, default=4)
+    args = parser.parse_args()
+
+    # Make sure the memory-mapped layout exists before the children start
+    load_flat_model()
+
+    layouts = (
+        ('sklearn (joblib unpickle)', 'sklearn', None),
+        ('flat (compiled in process)', 'flat', None),
+        ('flat (memory-mapped)', 'flat', FLAT_MODEL_DIR),
+    )
+    print(f"{'layout':<28} | {'load':>9} | {'RSS':>9} | {'PSS':>9} | {'private':>9}")
+    print("-" * 76)
+    for label, engine, flat_dir in layouts:
+        results = measure(engine, flat_dir, args.processes)
+        n = len(results)
+        load_ms = sum(r['load_ms'] for r in results) / n
+        rss = sum(r['Rss'] for r in results) / n
+        pss = sum(r['Pss'] for r in results) / n
+        private = sum(r['Private_Dirty'] for r in results) / n
+        print(f"{label:<28} | {load_ms:>6.0f} ms | {rss:>5.1f} MiB | {pss:>5.1f} MiB | {private:>5.1f} MiB")
+    print(f"\nAverages over {args.processes} concurrent processes each holding a loaded model.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark: auth connection pooling (MySQL backend)
+Times login_user, get_user_predictions and get_user_by_id from several threads at
+once with a new connection per call (DB_POOL_SIZE=0, the old behaviour) and with
+the connection pool, then reports pool waits and exhaustion at a pool smaller
+than the thread count.
+
+Needs a local MySQL-compatible server configured through the DB_* environment
+variables (see config.py); a scratch database is created and dropped afterwards.
+
+Usage:
+    python -m benchmarks.mysql_pool [--threads 1 4 8] [--rows 100000]
+"""
+
+import argparse
+import sys
+import time
+
+import auth
+import passwords
+from benchmarks.common import summarize
+from benchmarks.sqlite_pool import run_concurrent
+from benchmarks.suite import SEED_USERS, MysqlBackend, seed
+from metrics import POOL_EXHAUSTED, POOL_WAITS
+
+def main():
+    parser = argparse.ArgumentParser(description="MySQL connection pool benchmark")
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--calls', type=int, default=300, help="Calls per thread")
+    parser.add_argument('--rows', type=int, default=100_000, help="Prediction rows to seed")
+    parser.add_argument('--pool-size', type=int, default=auth.POOL_SIZE or 8)
+    parser.add_argument('--mysql-database', default='diabetes_app_bench')
+    args = parser.parse_args()
+
+    import bcrypt
+
+    try:
+        backend = MysqlBackend(args.mysql_database)
+    except Exception as e:
+        print(f"✗ mysql backend unavailable: {e}", file=sys.stderr)
+        sys.exit(1)
+    try:
+        backend.reset()
+        seed(backend, args.rows)
+        passwords.REHASH_ON_LOGIN = False  # keep the cheap hashes below
+        cheap_hash = bcrypt.hashpw(b'benchmark-pw', bcrypt.gensalt(rounds=4)).decode('utf-8')
+        conn = auth.get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("UPDATE users SET password = %s", (cheap_hash,))
+        conn.commit()
+        cursor.close()
+        conn.close()
+        print(f"Seeded {SEED_USERS:,} users and {args.rows:,} predictions "
+              f"({args.rows // SEED_USERS} per user)")
+
+        operations = (
+            ('login_user', lambda i: auth.login_user(f"seed{i % SEED_USERS}", 'benchmark-pw')),
+            ('get_user_predictions', lambda i: auth.get_user_predictions(i % SEED_USERS + 1)),
+            ('get_user_by_id', lambda i: auth.get_user_by_id(i % SEED_USERS + 1)),
+        )
+        print(f"\n{'operation':<21} | {'threads':>7} | {'connection':<10} | {'p50':>9} | {'p99':>9} | {'calls/s':>8}")
+        print("-" * 80)
+        for name, fn in operations:
+            for threads in args.threads:
+                for label, size in (('per call', 0), ('pooled', args.pool_size)):
+                    auth.close_pool()
+                    auth.POOL_SIZE = size
+                    run_concurrent(fn, threads, 10)  # warm-up (and fill the pool)
+                    start = time.perf_counter()
+                    samples = run_concurrent(fn, threads, args.calls)
+                    rate = len(samples) / (time.perf_counter() - start)
+                    stats = summarize(samples)
+                    print(f"{name:<21} | {threads:>7} | {label:<10} | {stats['p50_ms']:>6.3f} ms | "
+                          f"{stats['p99_ms']:>6.3f} ms | {rate:>8.0f}")
+
+        # Contention: more threads than connections
+        threads = max(args.threads)
+        auth.close_pool()
+        auth.POOL_SIZE = max(1, threads // 4)
+        waits, exhausted = POOL_WAITS.value(backend='mysql'), POOL_EXHAUSTED.value(backend='mysql')
+        run_concurrent(lambda i: auth.get_user_by_id(i % SEED_USERS + 1), threads, args.calls)
+        print(f"\npool of {auth.POOL_SIZE} for {threads} threads: "
+              f"{POOL_WAITS.value(backend='mysql') - waits:.0f} waits, "
+              f"{POOL_EXHAUSTED.value(backend='mysql') - exhausted:.0f} exhausted, {auth.get_pool().stats()}")
+    finally:
+        backend.close()
+
+if __name__ == "__main__":
+    main()
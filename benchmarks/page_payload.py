@@ -0,0 +1,109 @@
+"""
+Benchmark: frontend payload per rerun
+Drives a Streamlit app with AppTest through a short visit (login page, the
+registration page and back, sign-in, dashboard reruns) and reports, for every
+script run, the serialized size of the ForwardMsg deltas sent to the browser
+and the script run time. Runs once with static file serving (the background
+image referenced by URL) and once without (the image inlined as base64).
+Track the numbers across commits with --output, which writes them as JSON with
+environment metadata, like the suite.
+
+The time of the first run plus its payload is the server-side part of time to
+first paint; fetching and painting the page in a browser is not measured here.
+
+Usage:
+    python -m benchmarks.page_payload [--app app_sqlite.py] [--repeat 5] [--output payload.json]
+"""
+
+import argparse
+import json
+import statistics
+import time
+import warnings
+
+from streamlit import config
+from streamlit.testing.v1 import AppTest, local_script_runner
+
+import auth_sqlite
+import page_chrome
+from benchmarks.common import environment
+from benchmarks.suite import SqliteBackend
+from inference import BASE_DIR
+
+USERNAME = 'payload'
+PASSWORD = 'payload-pw'
+
+# Serialized ForwardMsg bytes of each script run, in order
+_run_bytes = []
+_parse_tree = local_script_runner.parse_tree_from_messages
+
+def _record_messages(messages):
+    _run_bytes.append(sum(message.ByteSize() for message in messages))
+    return _parse_tree(messages)
+
+local_script_runner.parse_tree_from_messages = _record_messages
+
+def button(at, label):
+    return next(b for b in at.button if b.label == label)
+
+def visit(app):
+    """One visit; returns [(step, bytes, ms)]"""
+    steps = []
+
+    def step(name, run):
+        start = time.perf_counter()
+        at = run()
+        steps.append((name, _run_bytes[-1], (time.perf_counter() - start) * 1000))
+        assert not at.exception, at.exception
+        return at
+
+    at = step('login page (first run)', lambda: AppTest.from_file(str(BASE_DIR / app), default_timeout=120).run())
+    step('login page rerun', at.run)
+    step('open registration', lambda: button(at, 'New Patient Registration').click().run())
+    step('back to login', lambda: button(at, 'Return to Login').click().run())
+    at.text_input(key='login_username').input(USERNAME)
+    at.text_input(key='login_password').input(PASSWORD)
+    step('sign in', lambda: button(at, 'Sign In').click().run())
+    step('dashboard rerun', at.run)
+    at.number_input[0].increment()
+    step('edit assessment input', at.run)
+    step('sign out', lambda: button(at, 'Sign Out').click().run())
+    return steps
+
+def main():
+    parser = argparse.ArgumentParser(description="Frontend payload per rerun")
+    parser.add_argument('--app', default='app_sqlite.py', help="Streamlit script (SQLite backend)")
+    parser.add_argument('--repeat', type=int, default=5, help="Visits per configuration")
+    parser.add_argument('--output', help="Also write the results here as JSON")
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    backend = SqliteBackend()
+    results = []
+    try:
+        backend.reset()
+        auth_sqlite.register_user(USERNAME, f"{USERNAME}@example.com", PASSWORD, 'Payload Test')
+        for label, static in (('static file serving', True), ('inline base64', False)):
+            config.set_option('server.enableStaticServing', static)
+            page_chrome.background_css.cache_clear()
+            visit(args.app)  # warm-up: imports, model load, caches
+            visits = [visit(args.app) for _ in range(args.repeat)]
+            print(f"\n{label} ({args.app}, median of {args.repeat} visits)")
+            print(f"  {'step':<24} | {'bytes':>9} | {'run time':>10}")
+            print("  " + "-" * 50)
+            for i, (name, _, _) in enumerate(visits[0]):
+                size = statistics.median(v[i][1] for v in visits)
+                ms = statistics.median(v[i][2] for v in visits)
+                print(f"  {name:<24} | {size:>9,.0f} | {ms:>7.1f} ms")
+                results.append({'config': label, 'step': name, 'bytes': size, 'ms': ms})
+            total = statistics.median(sum(s[1] for s in v) for v in visits)
+            print(f"  {'whole visit':<24} | {total:>9,.0f} |")
+    finally:
+        backend.close()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'arguments': vars(args), 'results': results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
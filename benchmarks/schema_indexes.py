@@ -0,0 +1,115 @@
+"""
+Benchmark: history index and duplicate-check rewrite (schema migration 2)
+Seeds a large predictions table on a database rolled back to schema version 1,
+then shows query plans and timings for the History query and the registration
+duplicate check before and after applying the pending migration.
+
+The original MySQL schema already had an index on predictions.user_id (created
+implicitly for the foreign key), so the MySQL "before" state keeps one.
+
+Usage:
+    python -m benchmarks.schema_indexes --rows 2000000
+    python -m benchmarks.schema_indexes --backends sqlite mysql --rows 5000000
+"""
+
+import argparse
+import sys
+import time
+
+from benchmarks.common import summarize, time_calls
+from benchmarks.suite import BACKENDS, SEED_USERS, MysqlBackend, SqliteBackend, seed
+
+INDEX = 'idx_predictions_user_created'
+
+def statements(backend):
+    """Backend-specific SQL for the queries under test and for undoing migration 2"""
+    p = backend.placeholder
+    if backend.name == 'sqlite':
+        explain = 'EXPLAIN QUERY PLAN'
+        rollback = [f"DROP INDEX {INDEX}", "DELETE FROM schema_migrations WHERE version = 2"]
+    else:
+        explain = 'EXPLAIN'
+        rollback = ["CREATE INDEX idx_predictions_user ON predictions (user_id)",
+                    f"DROP INDEX {INDEX} ON predictions", "DELETE FROM schema_migrations WHERE version = 2"]
+    return {
+        'explain': explain,
+        'rollback': rollback,
+        'queries': {
+            'history': f"""SELECT id, pregnancies, glucose, blood_pressure, skin_thickness, insulin,
+                           bmi, diabetes_pedigree_function, age, prediction, created_at
+                           FROM predictions WHERE user_id = {p} ORDER BY created_at DESC""",
+            'duplicate (OR)': f"SELECT id FROM users WHERE username = {p} OR email = {p}",
+            'duplicate (UNION ALL)': f"SELECT id FROM users WHERE username = {p} UNION ALL "
+                                     f"SELECT id FROM users WHERE email = {p} LIMIT 1",
+        },
+        'params': {
+            'history': (SEED_USERS // 2,),
+            'duplicate (OR)': ('seed500', 'nobody@example.com'),
+            'duplicate (UNION ALL)': ('seed500', 'nobody@example.com'),
+        },
+    }
+
+def run_query(conn, sql, params):
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+def report(backend, label, repeat):
+    """Print the plan and latency of every query"""
+    sql = statements(backend)
+    conn = backend.module.get_db_connection()
+    print(f"\n[{backend.name}] {label} (schema version {backend.module.schema_version()})")
+    for name, query in sql['queries'].items():
+        params = sql['params'][name]
+        plan = run_query(conn, f"{sql['explain']} {query}", params)
+        stats = summarize(time_calls(lambda: run_query(conn, query, params), repeat, warmup=1))
+        print(f"  {name:<22} p50 {stats['p50_ms']:>9.3f} ms  p99 {stats['p99_ms']:>9.3f} ms")
+        for row in plan:
+            print(f"      {tuple(row)}")
+    conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="History index and duplicate-check benchmark")
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=['sqlite'])
+    parser.add_argument('--rows', type=int, default=2_000_000, help="Prediction rows to seed")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--mysql-database', default='diabetes_app_bench')
+    args = parser.parse_args()
+
+    for name in args.backends:
+        try:
+            backend = SqliteBackend() if name == 'sqlite' else MysqlBackend(args.mysql_database)
+        except Exception as e:
+            print(f"✗ {name} backend unavailable: {e}", file=sys.stderr)
+            continue
+        try:
+            backend.reset()
+            conn = backend.module.get_db_connection()
+            cursor = conn.cursor()
+            for statement in statements(backend)['rollback']:
+                cursor.execute(statement)
+            conn.commit()
+            cursor.close()
+            conn.close()
+
+            print(f"[{backend.name}] seeding {args.rows:,} prediction rows for {SEED_USERS:,} users...")
+            start = time.perf_counter()
+            seed(backend, args.rows)
+            print(f"  seeded in {time.perf_counter() - start:.1f} s")
+
+            report(backend, 'before migration 2', args.repeat)
+
+            conn = backend.module.get_db_connection()
+            start = time.perf_counter()
+            applied = backend.module.migrate(conn)
+            conn.close()
+            print(f"\n[{backend.name}] applied migrations {applied} in {time.perf_counter() - start:.1f} s")
+
+            report(backend, 'after migration 2', args.repeat)
+        finally:
+            backend.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: database calls per dashboard session
+Drives app_sqlite.py with AppTest through a scripted patient session (sign in,
+assessments, browsing the history pages, more assessments, history again) and
+counts the database calls it made, by operation, from metrics.DB_SECONDS.
+
+Usage:
+    python -m benchmarks.session_queries [--app app_sqlite.py] [--assessments 5]
+"""
+
+import argparse
+import warnings
+
+from streamlit.testing.v1 import AppTest
+
+import auth_sqlite
+from benchmarks.suite import SqliteBackend
+from inference import BASE_DIR
+from metrics import DB_SECONDS
+
+USERNAME = 'queries'
+PASSWORD = 'queries-pw'
+OPERATIONS = ('login_user', 'get_user_by_id', 'save_prediction', 'save_predictions',
+              'get_user_predictions', 'get_user_predictions_page')
+
+def db_calls():
+    return {operation: DB_SECONDS.count(backend='sqlite', operation=operation) for operation in OPERATIONS}
+
+def button(at, label):
+    return next(b for b in at.button if b.label == label)
+
+def show_panel(at, name):
+    """Select a dashboard panel (a no-op for apps that render every panel as tabs)"""
+    panels = [radio for radio in at.radio if radio.key == 'dashboard_panel']
+    if panels:
+        panels[0].set_value(name).run()
+
+def session(app, assessments):
+    """One scripted session; returns the number of script runs"""
+    at = AppTest.from_file(str(BASE_DIR / app), default_timeout=120).run()
+    at.text_input(key='login_username').input(USERNAME)
+    at.text_input(key='login_password').input(PASSWORD)
+    button(at, 'Sign In').click().run()
+    runs = 2
+
+    def assess(n):
+        nonlocal runs
+        for i in range(n):
+            at.number_input[1].set_value(90 + i * 10)
+            button(at, 'Check My Risk').click().run()
+            runs += 1
+            assert not at.exception, at.exception
+
+    assess(assessments)
+    show_panel(at, 'My Health Records')
+    for label in ('Older →', 'Older →', '← Newer', '← Newer'):
+        button(at, label).click().run()
+    at.run()
+    runs += 6
+    show_panel(at, 'New Assessment')
+    assess(assessments)
+    show_panel(at, 'My Health Records')
+    runs += 3
+    assert not at.exception, at.exception
+    return runs
+
+def main():
+    parser = argparse.ArgumentParser(description="Database calls per dashboard session")
+    parser.add_argument('--app', default='app_sqlite.py', help="Streamlit script (SQLite backend)")
+    parser.add_argument('--assessments', type=int, default=5, help="Assessments in each of the two form visits")
+    parser.add_argument('--history', type=int, default=50, help="Past assessments seeded for the patient")
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    backend = SqliteBackend()
+    try:
+        backend.reset()
+        auth_sqlite.register_user(USERNAME, f"{USERNAME}@example.com", PASSWORD, 'Query Count')
+        user_id = auth_sqlite.login_user(USERNAME, PASSWORD)[1]['id']
+        for age in range(args.history):
+            auth_sqlite.save_prediction(user_id, 1, 100, 70, 20, 80, 25.0, 0.5, age, 0)
+
+        before = db_calls()
+        runs = session(args.app, args.assessments)
+        auth_sqlite.flush_predictions()
+        calls = {operation: count - before[operation] for operation, count in db_calls().items()}
+
+        print(f"{args.app}: {runs} script runs, {2 * args.assessments} assessments, 4 history page changes")
+        for operation, count in calls.items():
+            if count:
+                print(f"  {operation:<28} {count:>4}")
+        print(f"  {'total database calls':<28} {sum(calls.values()):>4}")
+    finally:
+        backend.close()
+
+if __name__ == "__main__":
+    main()
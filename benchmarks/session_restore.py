@@ -0,0 +1,84 @@
+"""
+Benchmark and checks: session restore from a signed token vs a fresh login
+Measures the CPU time (all threads, so bcrypt in the hashing pool counts) a
+returning visit costs on the SQLite backend: login_user with its bcrypt check,
+versus verify_token with its revocation lookup plus the user lookup (uncached,
+and from the app's cache). Then checks that tampered, expired, revoked and
+foreign-secret tokens are rejected, and that a revocation is still honoured
+after the process forgets it (another server process, or a restart).
+
+Usage:
+    python -m benchmarks.session_restore [--repeat 20]
+"""
+
+import argparse
+import sys
+import time
+
+import auth_sqlite
+import sessions
+from benchmarks.common import check
+from benchmarks.suite import SqliteBackend
+
+def cpu_ms(fn, repeat):
+    """Mean process CPU time of fn() in ms"""
+    start = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - start) * 1000 / repeat
+
+def main():
+    parser = argparse.ArgumentParser(description="Session token restore vs login benchmark")
+    parser.add_argument('--repeat', type=int, default=20, help="Logins to time (token checks run 100x as many)")
+    args = parser.parse_args()
+
+    backend = SqliteBackend()
+    results = []
+    try:
+        backend.reset()
+        auth_sqlite.register_user('returning', 'returning@example.com', 'benchmark-pw', 'Returning Patient')
+        _, user, _ = auth_sqlite.login_user('returning', 'benchmark-pw')
+        token = sessions.issue_token(user['id'])
+
+        login = cpu_ms(lambda: auth_sqlite.login_user('returning', 'benchmark-pw'), args.repeat)
+        revoked = auth_sqlite.session_revoked
+        uncached = cpu_ms(lambda: auth_sqlite.get_user_by_id(sessions.verify_token(token, revoked)), args.repeat * 100)
+        cached = cpu_ms(lambda: sessions.verify_token(token, revoked), args.repeat * 100)
+
+        print("CPU time per returning visit")
+        print(f"  {'login_user (bcrypt)':<34} {login:>9.3f} ms")
+        print(f"  {'token + user lookup':<34} {uncached:>9.3f} ms")
+        print(f"  {'token + cached user':<34} {cached:>9.3f} ms")
+        print(f"  saved per visit: {login - cached:.1f} ms CPU ({login / max(cached, 1e-6):,.0f}x less)")
+
+        print("\nChecks")
+        check(results, "valid token restores its user", sessions.verify_token(token) == user['id'])
+        user_id, expires, token_id, signature = token.split('.')
+        check(results, "tampered user id rejected",
+              sessions.verify_token(f"{int(user_id) + 1}.{expires}.{token_id}.{signature}") is None)
+        check(results, "extended expiry rejected",
+              sessions.verify_token(f"{user_id}.{int(expires) + 3600}.{token_id}.{signature}") is None)
+        check(results, "expired token rejected", sessions.verify_token(sessions.issue_token(user['id'], ttl=-1)) is None)
+        check(results, "malformed token rejected", sessions.verify_token('not-a-token') is None)
+        revoked = sessions.issue_token(user['id'])
+        sessions.revoke_token(revoked)
+        check(results, "revoked token rejected, others still valid",
+              sessions.verify_token(revoked) is None and sessions.verify_token(token) == user['id'])
+        signed_out = sessions.issue_token(user['id'])
+        sessions.revoke_token(signed_out, auth_sqlite.revoke_session)
+        sessions._revoked.clear()  # as in another process, or after a restart
+        check(results, "revocation recorded in the database survives a restart",
+              sessions.verify_token(signed_out, auth_sqlite.session_revoked) is None
+              and sessions.verify_token(token, auth_sqlite.session_revoked) == user['id'])
+        secret = sessions._secret
+        sessions._secret = b'another-server'
+        check(results, "token signed with another secret rejected", sessions.verify_token(token) is None)
+        sessions._secret = secret
+    finally:
+        backend.close()
+
+    if not all(results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark: single-row assessment latency
+Compares the old form handler path (one-row DataFrame -> scaler.transform -> predict)
+with inference.Predictor.predict_row, with several threads issuing requests at
+once to mimic concurrent Streamlit sessions
+
+Usage:
+    python -m benchmarks.single_row [--threads 1 4 8] [--engine flat]
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import load_features, summarize
+from inference import ENGINES, FEATURE_COLUMNS, Predictor, load_artifacts
+
+def dataframe_path(model, scaler, row):
+    """The original main_app() prediction code"""
+    input_data = pd.DataFrame([dict(zip(FEATURE_COLUMNS, row))])
+    return int(model.predict(scaler.transform(input_data))[0])
+
+def run_concurrent(fn, rows, threads, per_thread):
+    """Run fn(row) from several threads, return all per-call latencies in ms"""
+    def worker(offset):
+        samples = []
+        for i in range(per_thread):
+            row = rows[(offset + i) % len(rows)]
+            start = time.perf_counter()
+            fn(row)
+            samples.append((time.perf_counter() - start) * 1000)
+        return samples
+
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(worker, range(0, threads * 97, 97)))
+    return np.concatenate(results)
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-row assessment latency benchmark")
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--calls', type=int, default=200, help="Calls per thread")
+    parser.add_argument('--engine', choices=ENGINES, default='flat')
+    args = parser.parse_args()
+
+    model, scaler = load_artifacts(engine=args.engine)
+    predictor = Predictor(model, scaler)
+    rows = [list(map(float, row)) for row in load_features()]
+
+    # Both paths must agree before timing them
+    mismatches = sum(dataframe_path(model, scaler, row) != predictor.predict_row(row) for row in rows)
+    print(f"Engine: {args.engine}, mismatching predictions: {mismatches} / {len(rows)}")
+
+    print(f"\n{'threads':>7} | {'path':<10} | {'p50':>9} | {'p99':>9}")
+    print("-" * 44)
+    for threads in args.threads:
+        for name, fn in (('dataframe', lambda row: dataframe_path(model, scaler, row)),
+                         ('fast', predictor.predict_row)):
+            stats = summarize(run_concurrent(fn, rows, threads, args.calls))
+            print(f"{threads:>7} | {name:<10} | {stats['p50_ms']:>6.3f} ms | {stats['p99_ms']:>6.3f} ms")
+
+if __name__ == "__main__":
+    main()
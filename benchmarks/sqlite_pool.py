@@ -0,0 +1,85 @@
+"""
+Benchmark: auth_sqlite connection pooling
+Times login_user, get_user_predictions and get_user_by_id from several threads at
+once (mimicking concurrent Streamlit sessions) with a new connection per call
+(SQLITE_POOL_SIZE=0, the old behaviour) and with the connection pool.
+
+Seeded users get a cost-4 bcrypt hash so login timings show the database work
+rather than the deliberately slow password hash.
+
+Usage:
+    python -m benchmarks.sqlite_pool [--threads 1 4 8] [--rows 100000]
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import auth_sqlite
+import passwords
+from benchmarks.common import summarize
+from benchmarks.suite import SEED_USERS, SqliteBackend, seed
+
+def run_concurrent(fn, threads, per_thread):
+    """Run fn(i) from several threads, return all per-call latencies in ms"""
+    def worker(offset):
+        samples = []
+        for i in range(per_thread):
+            start = time.perf_counter()
+            fn(offset + i)
+            samples.append((time.perf_counter() - start) * 1000)
+        return samples
+
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(worker, range(0, threads * 97, 97)))
+    return np.concatenate(results)
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite connection pool benchmark")
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--calls', type=int, default=300, help="Calls per thread")
+    parser.add_argument('--rows', type=int, default=100_000, help="Prediction rows to seed")
+    parser.add_argument('--pool-size', type=int, default=auth_sqlite.POOL_SIZE or 8)
+    args = parser.parse_args()
+
+    import bcrypt
+
+    backend = SqliteBackend()
+    try:
+        backend.reset()
+        seed(backend, args.rows)
+        passwords.REHASH_ON_LOGIN = False  # keep the cheap hashes below
+        cheap_hash = bcrypt.hashpw(b'benchmark-pw', bcrypt.gensalt(rounds=4)).decode('utf-8')
+        conn = auth_sqlite.get_db_connection()
+        conn.execute("UPDATE users SET password = ?", (cheap_hash,))
+        conn.commit()
+        conn.close()
+        print(f"Seeded {SEED_USERS:,} users and {args.rows:,} predictions "
+              f"({args.rows // SEED_USERS} per user)")
+
+        operations = (
+            ('login_user', lambda i: auth_sqlite.login_user(f"seed{i % SEED_USERS}", 'benchmark-pw')),
+            ('get_user_predictions', lambda i: auth_sqlite.get_user_predictions(i % SEED_USERS + 1)),
+            ('get_user_by_id', lambda i: auth_sqlite.get_user_by_id(i % SEED_USERS + 1)),
+        )
+        print(f"\n{'operation':<21} | {'threads':>7} | {'connection':<10} | {'p50':>9} | {'p99':>9} | {'calls/s':>8}")
+        print("-" * 80)
+        for name, fn in operations:
+            for threads in args.threads:
+                for label, size in (('per call', 0), ('pooled', args.pool_size)):
+                    auth_sqlite.close_pool()
+                    auth_sqlite.POOL_SIZE = size
+                    run_concurrent(fn, threads, 10)  # warm-up (and fill the pool)
+                    start = time.perf_counter()
+                    samples = run_concurrent(fn, threads, args.calls)
+                    rate = len(samples) / (time.perf_counter() - start)
+                    stats = summarize(samples)
+                    print(f"{name:<21} | {threads:>7} | {label:<10} | {stats['p50_ms']:>6.3f} ms | "
+                          f"{stats['p99_ms']:>6.3f} ms | {rate:>8.0f}")
+    finally:
+        backend.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Stress test: concurrent prediction saves on the SQLite backend
+Writer threads call save_prediction while reader threads keep loading History
+(get_user_predictions), first with the previous settings (rollback journal,
+synchronous=FULL, default cache, no mmap, no lock retries) and then with the
+tuned defaults (WAL, synchronous=NORMAL, larger cache, mmap, retries).
+
+Each run checks that every save reported as successful is in the table and
+that no save failed, and reports write throughput and reader latency.
+
+Usage:
+    python -m benchmarks.sqlite_stress [--writers 8] [--saves 200] [--readers 4]
+"""
+
+import argparse
+import sys
+import threading
+import time
+
+import auth_sqlite
+from benchmarks.common import summarize
+from benchmarks.suite import SEED_USERS, SqliteBackend, seed
+
+# Module settings for each configuration (anything not listed keeps its default)
+CONFIGS = {
+    'rollback journal': {
+        'JOURNAL_MODE': 'DELETE', 'SYNCHRONOUS': 'FULL', 'CACHE_SIZE_KB': 2000,
+        'MMAP_SIZE': 0, 'LOCK_RETRY_ATTEMPTS': 1,
+    },
+    'wal + tuned': {},
+}
+
+def run(backend, settings, args):
+    """One stress run against a freshly seeded database, returns a result dict"""
+    defaults = {name: getattr(auth_sqlite, name) for name in settings}
+    for name, value in settings.items():
+        setattr(auth_sqlite, name, value)
+    try:
+        backend.reset()
+        seed(backend, args.rows)
+
+        outcomes = []
+        read_samples = []
+        writers_done = threading.Event()
+        lock = threading.Lock()
+
+        def writer(n):
+            results = [auth_sqlite.save_prediction(n % SEED_USERS + 1, 1, 120, 70, 20, 80, 32.0, 0.47, 40, i % 2)
+                       for i in range(args.saves)]
+            with lock:
+                outcomes.extend(results)
+
+        def reader(n):
+            samples = []
+            while not writers_done.is_set():
+                start = time.perf_counter()
+                auth_sqlite.get_user_predictions((n * 37) % SEED_USERS + 1)
+                samples.append((time.perf_counter() - start) * 1000)
+            with lock:
+                read_samples.extend(samples)
+
+        readers = [threading.Thread(target=reader, args=(n,)) for n in range(args.readers)]
+        writers = [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+        for thread in readers:
+            thread.start()
+        start = time.perf_counter()
+        for thread in writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        writers_done.set()
+        for thread in readers:
+            thread.join()
+
+        conn = auth_sqlite.get_db_connection()
+        stored = conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0] - args.rows
+        journal = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        conn.close()
+
+        succeeded = sum(bool(ok) for ok in outcomes)
+        return {
+            'journal_mode': journal,
+            'attempted': len(outcomes),
+            'succeeded': succeeded,
+            'stored': stored,
+            'writes_per_s': succeeded / elapsed,
+            'reads': len(read_samples),
+            **({f"read_{k}": v for k, v in summarize(read_samples).items()} if read_samples else {}),
+        }
+    finally:
+        for name, value in defaults.items():
+            setattr(auth_sqlite, name, value)
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite concurrent write stress test")
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--saves', type=int, default=200, help="save_prediction calls per writer")
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--rows', type=int, default=100_000, help="Prediction rows to seed")
+    args = parser.parse_args()
+
+    backend = SqliteBackend()
+    lost_any = False
+    try:
+        print(f"{args.writers} writers x {args.saves} saves, {args.readers} readers, {args.rows:,} seeded rows\n")
+        print(f"{'configuration':<17} | {'journal':<7} | {'saved':>11} | {'failed':>6} | {'lost':>4} | "
+              f"{'writes/s':>8} | {'read p50':>9} | {'read p99':>9}")
+        print("-" * 96)
+        for name, settings in CONFIGS.items():
+            r = run(backend, settings, args)
+            failed = r['attempted'] - r['succeeded']
+            lost = r['succeeded'] - r['stored']
+            lost_any |= lost != 0 or failed != 0
+            print(f"{name:<17} | {r['journal_mode']:<7} | {r['stored']:>5}/{r['attempted']:<5} | {failed:>6} | "
+                  f"{lost:>4} | {r['writes_per_s']:>8.0f} | {r.get('read_p50_ms', 0):>6.2f} ms | "
+                  f"{r.get('read_p99_ms', 0):>6.2f} ms")
+    finally:
+        backend.close()
+
+    if lost_any:
+        print("\n✗ Some predictions were not saved", file=sys.stderr)
+    else:
+        print("\n✓ Every prediction was saved")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+End-to-end benchmark suite for the portal's hot paths
+Times model loading, scaler.transform and model.predict at batch sizes 1..100k, and
+register_user / login_user (including bcrypt), save_prediction, get_user_predictions and
+get_user_predictions_page against databases seeded with increasing numbers of
+prediction rows. The database
+benchmarks run on auth_sqlite with a scratch file, and on auth with a local
+MySQL-compatible server (MySQL or MariaDB) configured through the DB_* environment
+variables (see config.py). A scratch database is created there and dropped afterwards.
+
+Results are printed, or written with --output, as JSON with environment metadata
+(git commit, Python, platform, package versions) so runs can be compared across commits.
+
+Usage:
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --only db --backends sqlite --db-sizes 1000 100000 10000000
+"""
+
+import argparse
+import json
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import environment, load_features, summarize, time_calls
+from inference import ENGINES, FEATURE_COLUMNS, load_artifacts
+
+SECTIONS = ('model', 'db')
+BACKENDS = ('sqlite', 'mysql')
+
+# Seeded users; prediction rows are spread across them round-robin
+SEED_USERS = 1000
+SEED_CHUNK = 100_000
+
+class Results:
+    """Collects benchmark entries as they are produced"""
+
+    def __init__(self, verbose=True):
+        self.entries = []
+        self.verbose = verbose
+
+    def add(self, name, samples, **params):
+        entry = {'name': name, 'params': params, 'n': len(samples), **summarize(samples)}
+        self.entries.append(entry)
+        if self.verbose:
+            details = ', '.join(f"{k}={v}" for k, v in params.items())
+            print(f"  {name:<28} {details:<40} p50 {entry['p50_ms']:>9.3f} ms  p99 {entry['p99_ms']:>9.3f} ms",
+                  file=sys.stderr)
+
+    def skip(self, name, reason, **params):
+        self.entries.append({'name': name, 'params': params, 'skipped': reason})
+        if self.verbose:
+            print(f"  {name:<28} skipped: {reason}", file=sys.stderr)
+
+def repeat_for(size, base):
+    """Fewer repetitions for bigger batches"""
+    return max(3, min(base, int(base * 1000 / max(size, 1))))
+
+# ==================== MODEL ====================
+
+def bench_model(results, batch_sizes, repeat):
+    """load_resources(), scaler.transform and model.predict"""
+    print("Model", file=sys.stderr)
+    models = {}
+    for engine in ENGINES:
+        try:
+            models[engine] = load_artifacts(engine=engine)
+        except (FileNotFoundError, RuntimeError) as e:
+            # 'folded' needs the artifact from compile_model.py
+            print(f"  skipping the {engine} engine: {e}", file=sys.stderr)
+            continue
+        results.add('load_resources', time_calls(lambda: load_artifacts(engine=engine), 5, warmup=1),
+                    engine=engine)
+    scaler = models['sklearn'][1]
+    X_raw = load_features()
+
+    for size in batch_sizes:
+        raw = X_raw[np.arange(size) % len(X_raw)]
+        frame = pd.DataFrame(raw, columns=FEATURE_COLUMNS)
+        n = repeat_for(size, repeat)
+        results.add('scaler.transform', time_calls(lambda: scaler.transform(frame), n), batch=size)
+
+        scaled = scaler.transform(frame)
+        for engine, (model, _) in models.items():
+            X = raw if getattr(model, 'raw_input', False) else scaled
+            results.add('model.predict', time_calls(lambda: model.predict(X), n), batch=size, engine=engine)
+
+# ==================== DATABASE ====================
+
+class SqliteBackend:
+    """auth_sqlite pointed at a scratch database file"""
+
+    name = 'sqlite'
+    placeholder = '?'
+
+    def __init__(self):
+        import auth_sqlite
+        self.module = auth_sqlite
+        self._original_file = auth_sqlite.DB_FILE
+        self._dir = Path(tempfile.mkdtemp(prefix='bench-sqlite-'))
+
+    def reset(self):
+        # Pooled connections would keep the deleted file open
+        self.module.close_pool()
+        self.module.history_cache.clear()
+        self.module.DB_FILE = self._dir / 'bench.db'
+        for path in self._dir.iterdir():
+            path.unlink()
+        self.module.init_database()
+
+    def close(self):
+        self.module.close_pool()
+        self.module.history_cache.clear()
+        self.module.DB_FILE = self._original_file
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+class MysqlBackend:
+    """auth pointed at a scratch database on a local MySQL-compatible server"""
+
+    name = 'mysql'
+    placeholder = '%s'
+
+    def __init__(self, database):
+        import auth
+        from config import get_db_config
+        self.module = auth
+        self.database = database
+        config = {**auth.DB_CONFIG, **get_db_config(), 'database': database}
+
+        # Fail fast (and get skipped) when no server is reachable, before auth is
+        # pointed at it, so later backends in the run keep the original config
+        server = {k: v for k, v in config.items() if k != 'database'}
+        auth._mysql().connect(**server).close()
+        self._original_config = dict(auth.DB_CONFIG)
+        auth.DB_CONFIG.update(config)
+
+    def _server_execute(self, statement):
+        server = {k: v for k, v in self.module.DB_CONFIG.items() if k != 'database'}
+        conn = self.module._mysql().connect(**server)
+        conn.cursor().execute(statement)
+        conn.close()
+
+    def reset(self):
+        self.module.close_pool()
+        self.module.history_cache.clear()
+        self._server_execute(f"DROP DATABASE IF EXISTS {self.database}")
+        self.module.init_database()
+
+    def close(self):
+        self.module.close_pool()
+        self.module.history_cache.clear()
+        self._server_execute(f"DROP DATABASE IF EXISTS {self.database}")
+        self.module.DB_CONFIG.clear()
+        self.module.DB_CONFIG.update(self._original_config)
+
+def seed(backend, n_predictions):
+    """Insert SEED_USERS users and n_predictions prediction rows directly"""
+    p = backend.placeholder
+    conn = backend.module.get_db_connection()
+    cursor = conn.cursor()
+    cursor.executemany(
+        f"INSERT INTO users (username, email, password, full_name) VALUES ({p}, {p}, {p}, {p})",
+        [(f"seed{i}", f"seed{i}@example.com", 'not-a-hash', f"Seed User {i}") for i in range(SEED_USERS)],
+    )
+    rng = np.random.default_rng(0)
+    start_ts = 1_700_000_000
+    for offset in range(0, n_predictions, SEED_CHUNK):
+        count = min(SEED_CHUNK, n_predictions - offset)
+        ids = np.arange(offset, offset + count)
+        rows = [
+            (int(i % SEED_USERS) + 1, int(rng.integers(0, 10)), 120.0, 70.0, 20.0, 80.0, 32.0, 0.47,
+             int(rng.integers(21, 80)), int(i % 2),
+             time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(start_ts + int(i))))
+            for i in ids
+        ]
+        cursor.executemany(
+            f"""INSERT INTO predictions
+            (user_id, pregnancies, glucose, blood_pressure, skin_thickness, insulin, bmi,
+             diabetes_pedigree_function, age, prediction, created_at)
+            VALUES ({', '.join([p] * 11)})""",
+            rows,
+        )
+        conn.commit()
+    cursor.close()
+    conn.close()
+    # Inserted around save_prediction, so not in the history cache
+    backend.module.history_cache.clear()
+
+def bench_db(results, backend, db_sizes, repeat):
+    """Auth and history functions against databases of increasing size"""
+    auth = backend.module
+    for size in db_sizes:
+        print(f"{backend.name}: seeding {size:,} prediction rows", file=sys.stderr)
+        backend.reset()
+        start = time.perf_counter()
+        seed(backend, size)
+        results.entries.append({'name': 'seed', 'params': {'backend': backend.name, 'rows': size},
+                                'seconds': time.perf_counter() - start})
+
+        counter = iter(range(10**9))
+        results.add('hash_password', time_calls(lambda: auth.hash_password('benchmark-pw'), 5, warmup=1),
+                    backend=backend.name, rows=size)
+        results.add('register_user', time_calls(
+            lambda: auth.register_user(f"bench{next(counter)}", f"bench{next(counter)}@example.com",
+                                       'benchmark-pw', 'Bench User'), 5, warmup=1),
+            backend=backend.name, rows=size)
+        results.add('login_user', time_calls(lambda: auth.login_user('bench0', 'benchmark-pw'), 5, warmup=1),
+                    backend=backend.name, rows=size)
+        results.add('save_prediction', time_calls(
+            lambda: auth.save_prediction(1, 2, 120, 70, 20, 80, 32.0, 0.47, 45, 0), repeat),
+            backend=backend.name, rows=size)
+        results.add('get_user_predictions', time_calls(lambda: auth.get_user_predictions(1), repeat),
+                    backend=backend.name, rows=size, user_rows=size // SEED_USERS)
+
+        # History tab pages: the newest page, and one from the middle of the user's history,
+        # as a database query and through the history cache (pages past its rows still query)
+        history = auth.get_user_predictions(1)
+        middle = history[len(history) // 2]
+        for page, cursor in (('first', None), ('middle', (middle[10], middle[0]))):
+            results.add('get_user_predictions_page', time_calls(
+                lambda: auth._query_predictions_page(1, 20, cursor), repeat),
+                backend=backend.name, rows=size, user_rows=size // SEED_USERS, page=page, cache='off')
+            results.add('get_user_predictions_page', time_calls(
+                lambda: auth.get_user_predictions_page(1, 20, cursor), repeat),
+                backend=backend.name, rows=size, user_rows=size // SEED_USERS, page=page, cache='on')
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark suite")
+    parser.add_argument('--only', nargs='+', choices=SECTIONS, default=list(SECTIONS))
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10, 100, 1000, 10000, 100000])
+    parser.add_argument('--db-sizes', type=int, nargs='+', default=[1000, 100000],
+                        help="Prediction rows to seed, e.g. 1000 100000 10000000")
+    parser.add_argument('--repeat', type=int, default=50, help="Timed calls per measurement")
+    parser.add_argument('--mysql-database', default='diabetes_app_bench',
+                        help="Scratch database created (and dropped) on the MySQL server")
+    parser.add_argument('--output', help="Write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    warnings.filterwarnings('ignore')
+    results = Results()
+    started = time.perf_counter()
+
+    if 'model' in args.only:
+        bench_model(results, args.batch_sizes, args.repeat)
+
+    if 'db' in args.only:
+        for name in args.backends:
+            try:
+                backend = SqliteBackend() if name == 'sqlite' else MysqlBackend(args.mysql_database)
+            except Exception as e:
+                results.skip('db', f"{name} backend unavailable: {e}", backend=name)
+                continue
+            try:
+                bench_db(results, backend, args.db_sizes, args.repeat)
+            finally:
+                backend.close()
+
+    report = {
+        'environment': environment(),
+        'arguments': vars(args),
+        'wall_seconds': time.perf_counter() - started,
+        'results': results.entries,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+        print(f"✓ Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark: flattened tree engine vs scikit-learn predict
+Checks that predictions are identical, then reports single-row and batch latency
+
+Usage:
+    python -m benchmarks.tree_engine [--batch-sizes 1 100 10000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import load_features, summarize, time_calls
+from inference import load_artifacts
+from tree_engine import FlatForest
+
+def main():
+    parser = argparse.ArgumentParser(description="Flattened tree engine benchmark")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10, 100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=50, help="Timed calls per batch size")
+    args = parser.parse_args()
+
+    model, scaler = load_artifacts(engine='sklearn')
+    start = time.perf_counter()
+    flat = FlatForest.from_sklearn(model)
+    compile_ms = (time.perf_counter() - start) * 1000
+    print(f"Compiled {flat.n_trees} trees / {flat.n_nodes:,} nodes in {compile_ms:.1f} ms")
+
+    # Equivalence check on the training data plus perturbed copies
+    rng = np.random.default_rng(0)
+    X = scaler.transform(load_features())
+    X_check = np.vstack([X, X + rng.normal(0, 0.25, X.shape), rng.normal(0, 2, (5000, X.shape[1]))])
+    proba_equal = np.array_equal(model.predict_proba(X_check), flat.predict_proba(X_check))
+    labels_equal = np.array_equal(model.predict(X_check), flat.predict(X_check))
+    print(f"Identical probabilities: {proba_equal}, identical labels: {labels_equal} "
+          f"({len(X_check):,} rows)")
+    if not (proba_equal and labels_equal):
+        raise SystemExit("✗ Flattened engine does not match scikit-learn")
+
+    print(f"\n{'batch':>8} | {'sklearn p50':>12} | {'flat p50':>10} | {'speedup':>8}")
+    print("-" * 48)
+    for size in args.batch_sizes:
+        batch = X_check[np.arange(size) % len(X_check)]
+        repeat = max(3, args.repeat if size <= 1000 else args.repeat // 10)
+        sk = summarize(time_calls(lambda: model.predict(batch), repeat))
+        fl = summarize(time_calls(lambda: flat.predict(batch), repeat))
+        print(f"{size:>8} | {sk['p50_ms']:>9.3f} ms | {fl['p50_ms']:>7.3f} ms | "
+              f"{sk['p50_ms'] / fl['p50_ms']:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
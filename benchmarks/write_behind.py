@@ -0,0 +1,187 @@
+"""
+Benchmark and checks: write-behind prediction persistence
+Compares the form handler's save latency with synchronous save_prediction and
+with queue_prediction under concurrent sessions, then checks the guarantees
+documented in write_behind.py against a scratch SQLite database:
+
+- every accepted row is written (concurrent submitters, then close())
+- rows queued by a process that exits normally are written by its exit handler
+- a full queue falls back to synchronous writes instead of dropping rows
+- failing batches are retried, and dropped (and counted) only after max_retries
+- rows from one submitter keep their submission order
+- flush for one user waits only for that user's rows
+
+Usage:
+    python -m benchmarks.write_behind [--threads 8] [--saves 300]
+"""
+
+import argparse
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+import numpy as np
+
+import auth_sqlite
+from benchmarks.common import check, summarize
+from benchmarks.suite import SqliteBackend, seed
+from inference import BASE_DIR
+from write_behind import WriteBehindQueue
+
+ROW = (1, 2, 120, 70, 20, 80, 32.0, 0.47, 45, 0)
+
+def count_rows():
+    conn = auth_sqlite.get_db_connection()
+    count = conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+    conn.close()
+    return count
+
+def concurrent_latency(fn, threads, saves):
+    """Per-call latencies (ms) of fn(i) issued from several threads at once"""
+    samples = []
+    lock = threading.Lock()
+
+    def worker(offset):
+        local = []
+        for i in range(saves):
+            start = time.perf_counter()
+            fn(offset + i)
+            local.append((time.perf_counter() - start) * 1000)
+        with lock:
+            samples.extend(local)
+
+    workers = [threading.Thread(target=worker, args=(n * saves,)) for n in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return np.asarray(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description="Write-behind persistence benchmark and checks")
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--saves', type=int, default=300, help="Saves per thread")
+    parser.add_argument('--rows', type=int, default=100_000, help="Prediction rows to seed")
+    args = parser.parse_args()
+
+    backend = SqliteBackend()
+    results = []
+    try:
+        backend.reset()
+        seed(backend, args.rows)
+
+        # Latency seen by the form handler
+        print(f"Save latency, {args.threads} concurrent sessions x {args.saves} saves")
+        for label, fn in (('save_prediction (sync)', lambda i: auth_sqlite.save_prediction(*ROW)),
+                          ('queue_prediction', lambda i: auth_sqlite.queue_prediction(*ROW))):
+            start = time.perf_counter()
+            samples = concurrent_latency(fn, args.threads, args.saves)
+            auth_sqlite.flush_predictions(timeout=60)
+            elapsed = time.perf_counter() - start
+            stats = summarize(samples)
+            print(f"  {label:<24} p50 {stats['p50_ms']:>7.3f} ms  p99 {stats['p99_ms']:>7.3f} ms  "
+                  f"{len(samples) / elapsed:>6.0f} saves/s (until flushed)")
+        print(f"  writer: {auth_sqlite.prediction_writer.stats()}")
+
+        print("\nGuarantees")
+        # Every accepted row is written
+        before = count_rows()
+        queue = WriteBehindQueue(auth_sqlite.save_predictions, name='check')
+        stamp = '2026-01-01 00:00:00'
+        concurrent_latency(lambda i: queue.submit((*ROW, stamp)), args.threads, args.saves)
+        queue.close()
+        written = count_rows() - before
+        check(results, "accepted rows written after close()", written == args.threads * args.saves,
+              f"{written}/{args.threads * args.saves}")
+
+        # Exit handler drains the queue
+        before = count_rows()
+        child = textwrap.dedent(f"""
+            import auth_sqlite
+            auth_sqlite.DB_FILE = {str(auth_sqlite.DB_FILE)!r}
+            for i in range(1000):
+                auth_sqlite.queue_prediction(*{ROW!r})
+        """)
+        subprocess.run([sys.executable, '-c', child], cwd=BASE_DIR, check=True, capture_output=True)
+        written = count_rows() - before
+        check(results, "rows queued by an exiting process written", written == 1000, f"{written}/1000")
+
+        # Backpressure instead of loss
+        before = count_rows()
+        queue = WriteBehindQueue(auth_sqlite.save_predictions, name='check-full', maxsize=8, batch_size=4)
+        accepted = sum(queue.submit((*ROW, stamp)) for _ in range(2000))
+        queue.close()
+        written = count_rows() - before
+        check(results, "full queue falls back to synchronous writes",
+              written == accepted == 2000 and queue.counts['sync'] > 0,
+              f"{written}/2000 written, {queue.counts['sync']} synchronously")
+
+        # Retries, then counted drops
+        attempts = []
+
+        def flaky(rows):
+            attempts.append(len(rows))
+            if len(attempts) <= 2:
+                raise RuntimeError("simulated outage")
+            auth_sqlite.save_predictions(rows)
+
+        queue = WriteBehindQueue(flaky, name='check-retry', retry_delay=0.01)
+        queue.submit((*ROW, stamp))
+        queue.flush(10)
+        check(results, "failed batch retried", queue.counts['written'] == 1 and len(attempts) == 3,
+              f"written after {len(attempts)} attempts")
+
+        def broken(rows):
+            raise RuntimeError("simulated permanent failure")
+
+        queue = WriteBehindQueue(broken, name='check-drop', max_retries=3, retry_delay=0.01)
+        for _ in range(5):
+            queue.submit((*ROW, stamp))
+        queue.close()
+        check(results, "permanently failing rows dropped and counted", queue.counts['dropped'] == 5,
+              f"{queue.counts['dropped']} dropped")
+
+        # Submission order
+        conn = auth_sqlite.get_db_connection()
+        last_id = conn.execute("SELECT MAX(id) FROM predictions").fetchone()[0]
+        conn.close()
+        queue = WriteBehindQueue(auth_sqlite.save_predictions, name='check-order', batch_size=7)
+        for age in range(100):
+            queue.submit((1, 0, 100, 70, 20, 80, 25.0, 0.5, age, 0, stamp))
+        queue.close()
+        conn = auth_sqlite.get_db_connection()
+        ages = [row[0] for row in conn.execute("SELECT age FROM predictions WHERE id > ? ORDER BY id",
+                                               (last_id,))]
+        conn.close()
+        check(results, "submission order kept", ages == list(range(100)), f"{len(ages)} rows in order")
+
+        # Per-user flush: user 2's batch is held up, user 3 has nothing queued
+        release = threading.Event()
+
+        def held_for_user_2(rows):
+            if any(row[0] == 2 for row in rows):
+                release.wait(10)
+            auth_sqlite.save_predictions(rows)
+
+        queue = WriteBehindQueue(held_for_user_2, name='check-key', key=lambda row: row[0])
+        queue.submit((2, *ROW[1:], stamp))
+        start = time.perf_counter()
+        other_flushed = queue.flush(5, key=3)
+        other_ms = (time.perf_counter() - start) * 1000
+        held = not queue.flush(0.05, key=2) and queue.pending(2) == 1
+        release.set()
+        flushed = queue.flush(10, key=2) and queue.pending(2) == 0
+        queue.close()
+        check(results, "flush for one user skips other users' rows", other_flushed and held and flushed,
+              f"user without queued rows flushed in {other_ms:.2f} ms")
+    finally:
+        auth_sqlite.prediction_writer.flush(timeout=30)
+        backend.close()
+
+    if not all(results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Model Compilation Tool
+Folds scaler.joblib into the split thresholds of stacked_ensemble_rf_model.pkl and
+writes an equivalent flattened model that consumes raw, unscaled metrics. The
+apps load it with MODEL_ENGINE=folded (inference.load_folded_model), and only
+while the model and scaler files are the ones it was compiled from.
+
+Before writing, the compiled model is checked against the original
+scaler.transform -> model.predict_proba pipeline on every row of diabetes.csv and
+on rows placed exactly on, and one float step past, every split threshold.
+The probabilities must match bit for bit.
+
+Usage:
+    python compile_model.py [--output raw_model]
+    MODEL_ENGINE=folded streamlit run app.py
+"""
+
+import argparse
+import sys
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from inference import BASE_DIR, FEATURE_COLUMNS, FOLDED_MODEL_DIR, file_signature, published_artifacts
+from tree_engine import FlatForest
+
+def boundary_rows(folded, base_rows):
+    """Rows sitting exactly on each raw threshold and one float64 step above it"""
+    internal = np.flatnonzero(~np.asarray(folded.is_leaf))
+    rows = np.repeat(base_rows[np.arange(len(internal)) % len(base_rows)], 2, axis=0)
+    features = np.repeat(folded.feature[internal], 2)
+    thresholds = folded.threshold[internal]
+    values = np.column_stack([thresholds, np.nextafter(thresholds, np.inf)]).ravel()
+    rows[np.arange(len(rows)), features] = values
+    return rows
+
+def verify(model, scaler, folded, raw):
+    """Number of rows whose probabilities differ between the pipelines"""
+    expected = model.predict_proba(scaler.transform(pd.DataFrame(raw, columns=FEATURE_COLUMNS)))
+    return int((folded.predict_proba(raw) != expected).any(axis=1).sum())
+
+def main():
+    parser = argparse.ArgumentParser(description="Fold the scaler into the model's tree thresholds")
+    parser.add_argument('--model', help="Model artifact path (default: the published model)")
+    parser.add_argument('--scaler', help="Scaler artifact path (default: the published scaler)")
+    parser.add_argument('--data', default=str(BASE_DIR / 'diabetes.csv'), help="Verification data")
+    parser.add_argument('--output', default=str(FOLDED_MODEL_DIR), help="Output directory (FOLDED_MODEL_DIR)")
+    args = parser.parse_args()
+    published_model, published_scaler = published_artifacts()
+    args.model = args.model or str(published_model)
+    args.scaler = args.scaler or str(published_scaler)
+
+    import joblib
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        model = joblib.load(args.model)
+        scaler = joblib.load(args.scaler)
+
+    try:
+        folded = FlatForest.from_sklearn(model).fold_scaler(scaler)
+    except TypeError as e:
+        print(f"✗ Cannot compile this model: {e}")
+        print("  Keep using the scaled path (MODEL_ENGINE=flat or sklearn).")
+        return 1
+    print(f"✓ Folded scaler into {folded.n_trees} trees / {folded.n_nodes:,} nodes")
+
+    data = pd.read_csv(args.data)[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+    checks = (
+        ('diabetes.csv rows', data),
+        ('split-boundary rows', boundary_rows(folded, data)),
+    )
+    failed = False
+    for label, rows in checks:
+        mismatches = verify(model, scaler, folded, rows)
+        status = "✓" if mismatches == 0 else "✗"
+        print(f"{status} {label}: {mismatches} of {len(rows):,} differ")
+        failed = failed or mismatches > 0
+    if failed:
+        print("✗ Compiled model is not equivalent, nothing written")
+        return 1
+
+    folded.save(args.output, source_signature=[file_signature(args.model), file_signature(args.scaler)])
+    print(f"✓ Wrote raw-input model to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
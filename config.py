@@ -6,17 +6,34 @@ Helps manage database credentials securely using environment variables
 import os
 from pathlib import Path
 
+# Written by setup_db.py; real environment variables take precedence over it
+ENV_FILE = Path(__file__).parent / '.env'
+
+def load_env_file(path=ENV_FILE):
+    """Add KEY=VALUE lines from a .env file to os.environ (without overriding set variables)"""
+    try:
+        lines = Path(path).read_text().splitlines()
+    except OSError:
+        return
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#') or '=' not in line:
+            continue
+        key, value = line.split('=', 1)
+        os.environ.setdefault(key.strip(), value.strip().strip('"').strip("'"))
+
 def get_db_config():
     """
     Get database configuration from environment variables or defaults.
     Use this function to keep sensitive credentials out of code.
     
-    Environment Variables:
+    Environment Variables (also read from .env):
     - DB_HOST: MySQL host (default: localhost)
     - DB_USER: MySQL username (default: root)
     - DB_PASSWORD: MySQL password (default: empty)
     - DB_NAME: Database name (default: diabetes_app)
     """
+    load_env_file()
     
     config = {
         'host': os.getenv('DB_HOST', 'localhost'),
@@ -26,17 +43,40 @@ def get_db_config():
     }
     return config
 
+def get_pool_config():
+    """
+    Connection pool settings for auth.py.
+
+    Environment Variables (also read from .env):
+    - DB_POOL_SIZE: connections kept open per process, 0 to connect per call (default: 8)
+    - DB_POOL_TIMEOUT: seconds to wait for a free connection (default: 10)
+    - DB_POOL_HEALTH_CHECK: ping connections idle longer than this many seconds (default: 30)
+    - DB_RECONNECT_ATTEMPTS: tries to get a working connection before giving up (default: 3)
+    """
+    load_env_file()
+
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '8')),
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', '10')),
+        'health_check': float(os.getenv('DB_POOL_HEALTH_CHECK', '30')),
+        'reconnect_attempts': int(os.getenv('DB_RECONNECT_ATTEMPTS', '3')),
+    }
+
 def create_env_file():
     """Create a template .env file for users to fill in"""
     env_template = """# Database Configuration
 # Copy this file to .env and fill in your MySQL credentials
-# Then uncomment the DB_CONFIG section in auth.py to use environment variables
+# (or run setup_db.py); auth.py reads them through config.get_db_config()
 
 DB_HOST=localhost
 DB_USER=root
 DB_PASSWORD=
 DB_NAME=diabetes_app
 
+# Connection pool
+DB_POOL_SIZE=8
+DB_POOL_TIMEOUT=10
+
 # For production, use:
 # DB_HOST=your_remote_host
 # DB_USER=your_username
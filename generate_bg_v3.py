@@ -2,7 +2,7 @@ from PIL import Image, ImageDraw, ImageFont, ImageFilter
 import random
 import math
 
-def create_diabetes_theme_background(filename="diabetes_bg_v3.png"):
+def create_diabetes_theme_background(filename="static/diabetes_bg_v3.png"):
     # Create image (Full HD)
     width, height = 1920, 1080
     
@@ -0,0 +1,254 @@
+"""
+History Cache
+In-process cache of each user's most recent predictions, so the History panel
+is served from memory instead of a query per render.
+
+Used by auth.py and auth_sqlite.py (one cache per backend): pages of
+get_user_predictions_page are cut from the cached rows, and save_prediction /
+save_predictions add the rows they wrote (write-through), so a new assessment
+is on the next History render without a re-query.
+
+- Each entry holds up to rows_per_user of the user's newest rows, in the
+  history row layout, newest first by (created_at, id). Pages reaching past
+  them go to the database.
+- Entries are evicted least recently used once their estimated size exceeds
+  max_bytes; a max_bytes of 0 disables the cache.
+- Entries expire ttl seconds after they were loaded. Writes through this
+  process update the cache immediately; the TTL bounds how long rows written by
+  another process (a second server, a script) can be missing.
+- A load that races a write for the same user is not stored, so a stale
+  snapshot never replaces rows the write added.
+- version(user_id) changes whenever the user's entry is stored or replaced, so
+  callers can keep anything derived from the rows (the History DataFrame) until
+  it does.
+"""
+
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+from metrics import CallbackGauge
+
+HISTORY_CACHE_MB = float(os.getenv('HISTORY_CACHE_MB', '32'))
+HISTORY_CACHE_ROWS = int(os.getenv('HISTORY_CACHE_ROWS', '100'))   # newest rows kept per user
+HISTORY_CACHE_TTL = float(os.getenv('HISTORY_CACHE_TTL', '300'))    # seconds
+
+# Every cache in the process, for the metrics below
+_caches = []
+
+CallbackGauge(
+    'portal_history_cache_total', 'History cache lookups, evictions and expiries', type_name='counter',
+    labelnames=['cache', 'result'],
+    callback=lambda: {(c.name, result): c.stats()[key] for c in _caches
+                      for result, key in (('hit', 'hits'), ('miss', 'misses'),
+                                          ('eviction', 'evictions'), ('expired', 'expired'))})
+CallbackGauge(
+    'portal_history_cache_hit_ratio', 'Share of history page lookups served from the cache', labelnames=['cache'],
+    callback=lambda: {(c.name,): c.stats()['hit_ratio'] for c in _caches})
+CallbackGauge(
+    'portal_history_cache_entries', 'Users with cached history', labelnames=['cache'],
+    callback=lambda: {(c.name,): c.stats()['users'] for c in _caches})
+CallbackGauge(
+    'portal_history_cache_bytes', 'Estimated memory held by cached history rows', labelnames=['cache'],
+    callback=lambda: {(c.name,): c.stats()['bytes'] for c in _caches})
+
+def _row_key(row):
+    """Sort key of a history row: (created_at, id)"""
+    return (row[10], row[0])
+
+def _size(rows):
+    """Estimated bytes of a list of row tuples (sys.getsizeof of the list, rows and values)"""
+    return sys.getsizeof(rows) + sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row) for row in rows)
+
+class _Entry:
+    __slots__ = ('rows', 'complete', 'loaded_at', 'size', 'version')
+
+    def __init__(self, rows, complete, loaded_at):
+        self.rows = rows              # newest first
+        self.complete = complete      # True when rows are all of the user's predictions
+        self.loaded_at = loaded_at
+        self.size = _size(rows)
+        self.version = None           # set by HistoryCache._store
+
+class _Load:
+    """A history load in flight; stale once a write for its user commits"""
+    __slots__ = ('stale',)
+
+    def __init__(self):
+        self.stale = False
+
+class HistoryCache:
+    """
+    Thread-safe, size-bounded LRU of recent history rows per user id.
+    page() serves a keyset page from memory or loads through the caller's query;
+    add() is the write-through hook for rows just committed.
+    """
+
+    def __init__(self, name, max_bytes=int(HISTORY_CACHE_MB * 1024 * 1024),
+                 rows_per_user=HISTORY_CACHE_ROWS, ttl=HISTORY_CACHE_TTL):
+        self.name = name
+        self.max_bytes = max_bytes
+        self.rows_per_user = rows_per_user
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+        self._bytes = 0
+        self._entries = OrderedDict()
+        self._loads = {}              # user id -> [_Load] in flight
+        self._versions = itertools.count(1)
+        self._lock = threading.Lock()
+        _caches.append(self)
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0 and self.rows_per_user > 0
+
+    def _fresh(self, user_id):
+        """The live entry for user_id, dropping it if it expired; call with the lock held"""
+        entry = self._entries.get(user_id)
+        if entry is not None and time.monotonic() - entry.loaded_at > self.ttl:
+            self._drop(user_id)
+            self.expired += 1
+            return None
+        return entry
+
+    def _drop(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _store(self, user_id, entry):
+        """Insert or replace an entry, then evict down to max_bytes; call with the lock held"""
+        self._drop(user_id)
+        entry.version = next(self._versions)
+        self._entries[user_id] = entry
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes and self._entries:
+            _, old = self._entries.popitem(last=False)
+            self._bytes -= old.size
+            self.evictions += 1
+
+    @staticmethod
+    def _slice(entry, page_size, cursor):
+        """(rows, next_cursor) from an entry, or None if the page reaches past its rows"""
+        start = 0
+        if cursor is not None:
+            while start < len(entry.rows) and _row_key(entry.rows[start]) >= cursor:
+                start += 1
+        rows = entry.rows[start:start + page_size + 1]
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            return rows, _row_key(rows[-1])
+        if entry.complete:
+            return rows, None
+        return None
+
+    def page(self, user_id, page_size, cursor, query):
+        """
+        One page of a user's history like get_user_predictions_page. query(limit,
+        cursor) runs the database query for (rows, next_cursor) and raises on
+        failure; it loads the user's newest rows on a miss and serves pages past
+        the cached ones.
+        """
+        if not self.enabled:
+            return query(page_size, cursor)
+        with self._lock:
+            entry = self._fresh(user_id)
+            result = self._slice(entry, page_size, cursor) if entry is not None else None
+            if result is not None:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return result
+            self.misses += 1
+            if entry is not None:
+                # Older than the cached rows: not worth caching
+                load = None
+            else:
+                load = _Load()
+                self._loads.setdefault(user_id, []).append(load)
+
+        if load is None:
+            return query(page_size, cursor)
+        entry = None
+        try:
+            rows, next_cursor = query(self.rows_per_user, None)
+            entry = _Entry(rows, next_cursor is None, time.monotonic())
+        finally:
+            with self._lock:
+                loads = self._loads[user_id]
+                loads.remove(load)
+                if not loads:
+                    del self._loads[user_id]
+                # Not stored if a write for this user committed meanwhile
+                if entry is not None and not load.stale:
+                    self._store(user_id, entry)
+        result = self._slice(entry, page_size, cursor)
+        return result if result is not None else query(page_size, cursor)
+
+    def cached(self, user_id):
+        """Whether user_id has an entry or a load in flight (write-through only needs those users)"""
+        with self._lock:
+            return user_id in self._entries or user_id in self._loads
+
+    def version(self, user_id):
+        """
+        Version of user_id's cached rows, unique across users and new each time
+        they change; None when the user has no entry (nothing to key on)
+        """
+        with self._lock:
+            entry = self._fresh(user_id)
+            return entry.version if entry is not None else None
+
+    def add(self, user_id, rows):
+        """Write-through: merge rows just committed for user_id into its entry"""
+        with self._lock:
+            for load in self._loads.get(user_id, ()):
+                load.stale = True
+            entry = self._fresh(user_id)
+            if entry is None or not rows:
+                return
+            if not entry.complete:
+                # Rows older than the cached ones would leave a gap before them
+                rows = [row for row in rows if _row_key(row) > _row_key(entry.rows[-1])]
+            merged = {row[0]: row for row in entry.rows}
+            merged.update((row[0], row) for row in rows)
+            ordered = sorted(merged.values(), key=_row_key, reverse=True)
+            complete = entry.complete and len(ordered) <= self.rows_per_user
+            updated = _Entry(ordered[:self.rows_per_user], complete, entry.loaded_at)
+            self._store(user_id, updated)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            for load in self._loads.get(user_id, ()):
+                load.stale = True
+            self._drop(user_id)
+
+    def clear(self):
+        with self._lock:
+            for loads in self._loads.values():
+                for load in loads:
+                    load.stale = True
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'users': len(self._entries),
+                'rows': sum(len(entry.rows) for entry in self._entries.values()),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expired': self.expired,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
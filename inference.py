@@ -0,0 +1,446 @@
+"""
+Model Inference Helpers
+Shared loading and prediction code for the diabetes risk model
+Used by the Streamlit apps and the command-line tools
+
+joblib, NumPy and scikit-learn are imported on first use rather than at module
+import, so importing this module stays cheap for pages that never predict.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from metrics import STAGE_ERRORS, STAGE_SECONDS, CallbackGauge
+
+logger = logging.getLogger('diabetes_portal.inference')
+
+# Model artifacts
+BASE_DIR = Path(__file__).parent
+MODEL_FILE = BASE_DIR / 'stacked_ensemble_rf_model.pkl'
+SCALER_FILE = BASE_DIR / 'scaler.joblib'
+
+# Pointer to the published models/<version>/ directory, replaced in one rename by
+# train_model.py --publish; MODEL_FILE and SCALER_FILE are served until it exists
+PUBLISHED_POINTER = Path(os.getenv('PUBLISHED_MODEL_POINTER', BASE_DIR / 'published_model'))
+
+# Memory-mappable copy of the model's tree arrays, rebuilt when the model file changes
+FLAT_MODEL_DIR = Path(os.getenv('FLAT_MODEL_DIR', BASE_DIR / 'flat_model'))
+
+# Model with the scaler folded in, written and verified by compile_model.py
+FOLDED_MODEL_DIR = Path(os.getenv('FOLDED_MODEL_DIR', BASE_DIR / 'raw_model'))
+
+# Feature order used when the scaler and model were trained (diabetes.csv layout)
+FEATURE_COLUMNS = [
+    'Pregnancies', 'Glucose', 'BloodPressure', 'SkinThickness',
+    'Insulin', 'BMI', 'DiabetesPedigreeFunction', 'Age'
+]
+
+# Inference engine used by the apps:
+# - 'flat': flattened NumPy tree arrays (tree_engine.py), identical predictions, lower latency
+# - 'folded': 'flat' with the scaler folded into the split thresholds, takes raw metrics;
+#   loads the artifact compile_model.py verified, which must be rebuilt when the model or scaler changes
+# - 'sklearn': the unpickled scikit-learn estimator as-is
+MODEL_ENGINE = os.getenv('MODEL_ENGINE', 'flat')
+ENGINES = ('flat', 'folded', 'sklearn')
+
+# Maximum number of cached predictions per process (0 disables the cache)
+PREDICTION_CACHE_SIZE = int(os.getenv('PREDICTION_CACHE_SIZE', '1024'))
+
+# Backoff between failed model loads, in seconds (doubles per failure up to the max)
+LOAD_RETRY_MIN = float(os.getenv('MODEL_LOAD_RETRY_MIN', '1'))
+LOAD_RETRY_MAX = float(os.getenv('MODEL_LOAD_RETRY_MAX', '60'))
+# Longest wait at interpreter exit for a load still in progress
+LOAD_SHUTDOWN_TIMEOUT = float(os.getenv('MODEL_LOAD_SHUTDOWN_TIMEOUT', '60'))
+
+def published_artifacts(pointer=PUBLISHED_POINTER):
+    """
+    (model_file, scaler_file) to serve: both from the version directory the
+    pointer names, read once so they always come from the same publish, or
+    MODEL_FILE and SCALER_FILE when nothing is published
+    """
+    try:
+        version_dir = Path(pointer.read_text(encoding='utf-8').strip())
+    except FileNotFoundError:
+        return MODEL_FILE, SCALER_FILE
+    return version_dir / MODEL_FILE.name, version_dir / SCALER_FILE.name
+
+def load_artifacts(model_file=None, scaler_file=None, engine='sklearn',
+                   flat_dir=FLAT_MODEL_DIR, folded_dir=FOLDED_MODEL_DIR):
+    """Load the trained model and scaler from disk (by default the published pair)"""
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown model engine '{engine}', expected one of {', '.join(ENGINES)}")
+    if model_file is None or scaler_file is None:
+        published_model, published_scaler = published_artifacts()
+        model_file = published_model if model_file is None else model_file
+        scaler_file = published_scaler if scaler_file is None else scaler_file
+
+    import joblib
+
+    if engine == 'folded':
+        model = load_folded_model(model_file, scaler_file, folded_dir)
+    elif engine == 'flat':
+        model = load_flat_model(model_file, flat_dir)
+    else:
+        model = joblib.load(model_file)
+    scaler = joblib.load(scaler_file)
+    return model, scaler
+
+def load_flat_model(model_file=MODEL_FILE, flat_dir=FLAT_MODEL_DIR):
+    """
+    Memory-map the flattened model from flat_dir. If it is missing or was built
+    from a different model file, compile it from the pickle and write it first.
+    Falls back to the unpickled estimator for models the flat engine cannot handle.
+    """
+    import joblib
+    from tree_engine import FlatForest, compile_model, read_meta
+
+    signature = file_signature(model_file)
+    if signature is None:
+        raise FileNotFoundError(f"Model artifact not found: {model_file}")
+    meta = read_meta(flat_dir) if flat_dir else None
+    if meta and meta.get('source_signature') == list(signature):
+        try:
+            return FlatForest.load(flat_dir, mmap=True)
+        except (OSError, ValueError):
+            pass
+
+    model = compile_model(joblib.load(model_file))
+    if flat_dir and isinstance(model, FlatForest):
+        try:
+            model.save(flat_dir, source_signature=list(signature))
+            return FlatForest.load(flat_dir, mmap=True)
+        except OSError:
+            # Read-only deployment: keep the in-memory copy
+            pass
+    return model
+
+def load_folded_model(model_file=MODEL_FILE, scaler_file=SCALER_FILE, folded_dir=FOLDED_MODEL_DIR):
+    """
+    Memory-map the scaler-folded model compile_model.py wrote to folded_dir.
+    Raises FileNotFoundError if it is missing and RuntimeError if it was built
+    from other model or scaler files: it is never folded again at load time,
+    since only compile_model.py verifies the result.
+    """
+    from tree_engine import FlatForest, read_meta
+
+    signature = [file_signature(model_file), file_signature(scaler_file)]
+    for path, file_sig in zip((model_file, scaler_file), signature):
+        if file_sig is None:
+            raise FileNotFoundError(f"Model artifact not found: {path}")
+    meta = read_meta(folded_dir)
+    if meta is None or not meta.get('raw_input'):
+        raise FileNotFoundError(f"No compiled model in {folded_dir}: run python compile_model.py")
+    if meta.get('source_signature') != [list(sig) for sig in signature]:
+        raise RuntimeError(f"Compiled model in {folded_dir} was built from other artifacts: "
+                           "run python compile_model.py again")
+    return FlatForest.load(folded_dir, mmap=True)
+
+def file_signature(path):
+    """(mtime, size) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+def artifact_signature(model_file=None, scaler_file=None):
+    """
+    Signatures of the model and scaler files (by default the published pair);
+    changes whenever an artifact is replaced or another version is published
+    """
+    if model_file is None or scaler_file is None:
+        model_file, scaler_file = published_artifacts()
+    return (file_signature(model_file), file_signature(scaler_file))
+
+class PredictionCache:
+    """
+    Thread-safe LRU cache of predictions keyed on the eight input metrics.
+    Entries belong to one artifact signature and are dropped when it changes.
+    """
+
+    def __init__(self, maxsize=PREDICTION_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.signature = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(values):
+        """Normalize metrics so 25 and 25.0 share an entry"""
+        return tuple(float(v) for v in values)
+
+    def get(self, key):
+        """Cached prediction for key, or None"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store a prediction, evicting the least recently used entry when full"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def validate(self, signature):
+        """Clear the cache if it was filled for a different model artifact"""
+        with self._lock:
+            if signature != self.signature:
+                self._entries.clear()
+                self.signature = signature
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters for monitoring"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+# Shared by every Predictor in the process
+prediction_cache = PredictionCache()
+
+CallbackGauge(
+    'portal_prediction_cache_total', 'Prediction cache lookups and evictions', type_name='counter',
+    labelnames=['result'],
+    callback=lambda: {(result,): prediction_cache.stats()[key]
+                      for result, key in (('hit', 'hits'), ('miss', 'misses'), ('eviction', 'evictions'))})
+CallbackGauge(
+    'portal_prediction_cache_entries', 'Predictions currently cached',
+    callback=lambda: prediction_cache.stats()['size'])
+
+class Predictor:
+    """
+    Single-row prediction without pandas.
+    Takes the eight metrics in FEATURE_COLUMNS order, applies the scaler with
+    NumPy directly and reuses a per-thread input buffer across calls.
+    """
+
+    def __init__(self, model, scaler, cache=None, signature=None):
+        self.model = model
+        self.scaler = scaler
+        self.cache = cache
+        self._local = threading.local()
+        if cache is not None:
+            cache.validate(signature)
+
+        # StandardScaler.transform is (x - mean_) / scale_; do it in place on the buffer
+        self._mean = getattr(scaler, 'mean_', None) if getattr(scaler, 'with_mean', False) else None
+        self._scale = getattr(scaler, 'scale_', None) if getattr(scaler, 'with_std', False) else None
+        self._fast_scaling = type(scaler).__name__ == 'StandardScaler'
+        # Folded models (tree_engine.FlatForest.fold_scaler) take raw metrics
+        self._raw_input = getattr(model, 'raw_input', False)
+
+    def _buffer(self):
+        """Preallocated (1, n_features) float64 row for the calling thread"""
+        buf = getattr(self._local, 'row', None)
+        if buf is None:
+            import numpy as np
+            buf = self._local.row = np.empty((1, len(FEATURE_COLUMNS)), dtype=np.float64)
+        return buf
+
+    def scale_row(self, values):
+        """Scale one row of raw metrics, returns the (reused) scaled buffer"""
+        import numpy as np
+
+        buf = self._buffer()
+        buf[0, :] = values
+        if self._raw_input:
+            return buf
+        if not self._fast_scaling:
+            return self.scaler.transform(buf)
+        if self._mean is not None:
+            np.subtract(buf, self._mean, out=buf)
+        if self._scale is not None:
+            np.divide(buf, self._scale, out=buf)
+        return buf
+
+    def predict_rows(self, rows):
+        """Predicted classes for a batch of raw metric rows, one model call for the whole batch"""
+        import numpy as np
+
+        X = np.array(rows, dtype=np.float64).reshape(-1, len(FEATURE_COLUMNS))
+        if self._raw_input:
+            pass  # scaler already folded into the model
+        elif not self._fast_scaling:
+            X = self.scaler.transform(X)
+        else:
+            if self._mean is not None:
+                np.subtract(X, self._mean, out=X)
+            if self._scale is not None:
+                np.divide(X, self._scale, out=X)
+        return [int(pred) for pred in self.model.predict(X)]
+
+    def warm_up(self):
+        """Run one prediction through the model (bypassing the cache) to page in code and data"""
+        return int(self.model.predict(self.scale_row([0] * len(FEATURE_COLUMNS)))[0])
+
+    def _predict_uncached(self, values):
+        """Scale and predict one row, recording both stages in metrics.STAGE_SECONDS"""
+        start = time.perf_counter()
+        X = self.scale_row(values)
+        scaled = time.perf_counter()
+        pred = int(self.model.predict(X)[0])
+        STAGE_SECONDS.observe(scaled - start, stage='scale')
+        STAGE_SECONDS.observe(time.perf_counter() - scaled, stage='predict')
+        return pred
+
+    def predict_row(self, values):
+        """Predicted class (0 = low risk, 1 = high risk) for one row of raw metrics"""
+        if self.cache is None:
+            return self._predict_uncached(values)
+
+        key = self.cache.make_key(values)
+        pred = self.cache.get(key)
+        if pred is None:
+            pred = self._predict_uncached(values)
+            self.cache.put(key, pred)
+        return pred
+
+class ModelService:
+    """
+    Process-wide owner of the loaded Predictor.
+    start() loads and warms up the model in a background thread so it is ready
+    before the first assessment. A failed load is retried with exponential
+    backoff instead of on every request, and an artifact change triggers a reload.
+    At interpreter exit, a load still in progress is waited for (close()): a
+    daemon thread still importing during finalization aborts the interpreter.
+    """
+
+    def __init__(self, engine=MODEL_ENGINE, cache=None,
+                 retry_min=LOAD_RETRY_MIN, retry_max=LOAD_RETRY_MAX):
+        self.engine = engine
+        self.cache = cache
+        self.retry_min = retry_min
+        self.retry_max = retry_max
+        self.state = 'idle'             # idle, loading, ready or failed
+        self.error = None
+        self.failures = 0
+        self.timings = {}
+        self._predictor = None
+        self._signature = None
+        self._next_retry = 0.0
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Begin loading in the background; no-op while loading, loaded or backing off"""
+        with self._lock:
+            if self.state in ('loading', 'ready') or time.monotonic() < self._next_retry:
+                return
+            self.state = 'loading'
+            self._done = threading.Event()
+            if self._thread is None:
+                atexit.register(self.close)
+            self._thread = threading.Thread(target=self._load, name='model-warmup', daemon=True)
+            self._thread.start()
+
+    def close(self, timeout=LOAD_SHUTDOWN_TIMEOUT):
+        """Wait for a load in progress; returns False if it is still running after timeout"""
+        thread = self._thread
+        if thread is None:
+            return True
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.error("Model load still running after %.0fs at shutdown", timeout)
+            return False
+        return True
+
+    def _load(self):
+        # Resolved once, so the signature and both artifacts are from the same publish
+        model_file, scaler_file = published_artifacts()
+        signature = artifact_signature(model_file, scaler_file)
+        try:
+            start = time.perf_counter()
+            model, scaler = load_artifacts(model_file, scaler_file, engine=self.engine)
+            loaded = time.perf_counter()
+            predictor = Predictor(model, scaler, cache=self.cache, signature=signature)
+            predictor.warm_up()
+            warmed = time.perf_counter()
+        except Exception as e:
+            STAGE_ERRORS.inc(stage='model_load')
+            with self._lock:
+                self.failures += 1
+                delay = min(self.retry_max, self.retry_min * 2 ** (self.failures - 1))
+                self._next_retry = time.monotonic() + delay
+                self.error = str(e)
+                self.state = 'failed'
+            logger.error("Model load failed (attempt %d), retrying in %.1fs: %s",
+                         self.failures, delay, e)
+        else:
+            with self._lock:
+                self._predictor = predictor
+                self._signature = signature
+                self.timings = {
+                    'load_ms': (loaded - start) * 1000,
+                    'warmup_ms': (warmed - loaded) * 1000,
+                }
+                self.failures = 0
+                self.error = None
+                self.state = 'ready'
+            STAGE_SECONDS.observe(loaded - start, stage='model_load')
+            STAGE_SECONDS.observe(warmed - loaded, stage='model_warmup')
+            logger.info("Model ready (%s engine): load %.0f ms, warm-up %.0f ms",
+                        self.engine, self.timings['load_ms'], self.timings['warmup_ms'])
+        finally:
+            self._done.set()
+
+    def get(self, timeout=60.0):
+        """The warmed-up Predictor, waiting for an in-flight load; None while unavailable"""
+        if self.state == 'ready' and artifact_signature() != self._signature:
+            with self._lock:
+                if self.state == 'ready':
+                    logger.info("Model artifact changed on disk, reloading")
+                    self.state = 'idle'
+        self.start()
+        self._done.wait(timeout)
+        return self._predictor if self.state == 'ready' else None
+
+    def retry_in(self):
+        """Seconds until the next load attempt after a failure"""
+        return max(0.0, self._next_retry - time.monotonic())
+
+    def status(self):
+        """Readiness summary for the UI and logs"""
+        return {
+            'state': self.state,
+            'engine': self.engine,
+            'error': self.error,
+            'failures': self.failures,
+            'retry_in_s': self.retry_in(),
+            **self.timings,
+        }
+
+# Shared by both Streamlit apps
+model_service = ModelService(cache=prediction_cache)
+
+CallbackGauge(
+    'portal_model_ready', '1 once the risk model is loaded and warmed up',
+    callback=lambda: int(model_service.state == 'ready'))
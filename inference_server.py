@@ -0,0 +1,258 @@
+"""
+Local HTTP Inference Service
+Serves the diabetes risk model to other internal systems over JSON, using only the
+standard library. The model and scaler are the ones the Streamlit apps use
+(inference.model_service), loaded and warmed up at startup; each batch is scored
+with the service's current predictor, so a model reloaded from disk is served
+without a restart.
+
+Concurrent single-row requests are coalesced into micro-batches: the batcher
+takes every request already queued, optionally waits up to --max-wait-ms for
+more (stopping at --max-batch rows) and scores them with one model call. With
+the default 0 ms window, requests that arrive while a batch is being scored
+form the next batch, so a lone client sees no added latency.
+
+Endpoints:
+    GET  /health          model readiness and batching statistics
+    GET  /metrics         stage latencies and counters in Prometheus text format
+    POST /predict         {"features": [8 numbers] or {"Glucose": ..., ...}}
+    POST /predict/batch   {"rows": [[8 numbers], ...]}
+
+Usage:
+    python inference_server.py --port 8600 --max-batch 64 --max-wait-ms 2
+"""
+
+import argparse
+import json
+import logging
+import math
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import metrics
+from inference import FEATURE_COLUMNS, model_service
+
+logger = logging.getLogger('diabetes_portal.server')
+
+# Largest request body accepted, in bytes
+MAX_BODY = 10 * 1024 * 1024
+
+class ModelUnavailable(RuntimeError):
+    """The model is not loaded (still loading, or the last load failed)"""
+
+def current_predictor():
+    """model_service's Predictor, reloaded when the artifacts change on disk"""
+    predictor = model_service.get()
+    if predictor is None:
+        raise ModelUnavailable(f"Model unavailable: {model_service.error or model_service.state}")
+    return predictor
+
+class MicroBatcher:
+    """Collects single-row requests from many threads and scores them together"""
+
+    def __init__(self, get_predictor=current_predictor, max_batch=64, max_wait_ms=0.0):
+        self.get_predictor = get_predictor
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, row):
+        """Queue one row, returns a Future resolving to its prediction"""
+        future = Future()
+        self._queue.put((row, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                # Take whatever is already queued, then wait out the window for more
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    pass
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._score(batch)
+            self.batches += 1
+            self.rows += len(batch)
+
+    def _score(self, batch):
+        """Resolve the futures of a batch; if it fails, rows are scored one at a time so only bad rows fail"""
+        try:
+            predictor = self.get_predictor()
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        try:
+            predictions = predictor.predict_rows([row for row, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            for row, future in batch:
+                try:
+                    future.set_result(predictor.predict_rows([row])[0])
+                except Exception as row_error:
+                    future.set_exception(row_error)
+            return
+        for (_, future), pred in zip(batch, predictions):
+            future.set_result(pred)
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'rows': self.rows,
+            'mean_batch_size': self.rows / self.batches if self.batches else 0.0,
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000,
+        }
+
+def parse_row(features):
+    """Eight metrics as a list (training column order) or a dict keyed by column name"""
+    if isinstance(features, dict):
+        missing = [col for col in FEATURE_COLUMNS if col not in features]
+        if missing:
+            raise ValueError(f"Missing features: {', '.join(missing)}")
+        features = [features[col] for col in FEATURE_COLUMNS]
+    if not isinstance(features, list) or len(features) != len(FEATURE_COLUMNS):
+        raise ValueError(f"Expected {len(FEATURE_COLUMNS)} features in order: {', '.join(FEATURE_COLUMNS)}")
+    try:
+        row = [float(value) for value in features]
+    except (TypeError, ValueError):
+        raise ValueError("Features must be numbers")
+    # json.loads accepts NaN and Infinity, and 1e400 overflows to inf
+    if not all(math.isfinite(value) for value in row):
+        raise ValueError("Features must be finite numbers")
+    return row
+
+class InferenceHandler(BaseHTTPRequestHandler):
+    """JSON endpoints; the batcher is attached to the server instance"""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive for clients that reuse connections
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            raise ValueError("Invalid Content-Length")
+        if length < 0:
+            raise ValueError("Invalid Content-Length")
+        if length > MAX_BODY:
+            raise ValueError("Request body too large")
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        if not isinstance(payload, dict):
+            raise ValueError("Request body must be a JSON object")
+        return payload
+
+    def do_GET(self):
+        if self.path == '/health':
+            status = model_service.status()
+            status['batching'] = self.server.batcher.stats()
+            self._send_json(200 if status['state'] == 'ready' else 503, status)
+        elif self.path == '/metrics':
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        try:
+            payload = self._read_json()
+            if self.path == '/predict':
+                row = parse_row(payload.get('features'))
+                self._send_json(200, {'prediction': self.server.batcher.submit(row).result()})
+            elif self.path == '/predict/batch':
+                rows = payload.get('rows')
+                if not isinstance(rows, list) or not rows:
+                    raise ValueError("'rows' must be a non-empty list")
+                parsed = [parse_row(row) for row in rows]
+                predictions = self.server.batcher.get_predictor().predict_rows(parsed)
+                self._send_json(200, {'predictions': predictions})
+            else:
+                self._send_json(404, {'error': 'Not found'})
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+        except ModelUnavailable as e:
+            self._send_json(503, {'error': str(e)})
+        except Exception as e:
+            logger.exception("Prediction failed")
+            self._send_json(500, {'error': f"Prediction failed: {e}"})
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+class InferenceServer(ThreadingHTTPServer):
+    """Threaded HTTP server with a listen backlog sized for many concurrent clients"""
+
+    daemon_threads = True
+    request_queue_size = 128
+
+def create_server(host='127.0.0.1', port=8600, max_batch=64, max_wait_ms=0.0):
+    """Load the model and return a ready (not yet serving) HTTP server"""
+    model_service.start()
+    if model_service.get() is None:
+        raise RuntimeError(f"Model failed to load: {model_service.error}")
+
+    server = InferenceServer((host, port), InferenceHandler)
+    server.batcher = MicroBatcher(current_predictor, max_batch, max_wait_ms)
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Diabetes risk model HTTP inference service")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--max-batch', type=int, default=64, help="Largest micro-batch (default: 64)")
+    parser.add_argument('--max-wait-ms', type=float, default=0.0,
+                        help="Extra time to wait for more requests before scoring a batch (default: 0)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        server = create_server(args.host, args.port, args.max_batch, args.max_wait_ms)
+    except Exception as e:
+        print(f"✗ Could not start inference server: {e}", file=sys.stderr)
+        return 1
+
+    print(f"✓ Serving on http://{args.host}:{args.port} "
+          f"(micro-batches of up to {args.max_batch} rows, {args.max_wait_ms} ms window)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
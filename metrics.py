@@ -0,0 +1,292 @@
+"""
+Performance Metrics
+Low-overhead counters and latency histograms exported in Prometheus text format
+
+Standard library only. A histogram observation is a bisect over the bucket bounds
+plus a short locked update, one to two microseconds, which is negligible next to
+the stages being measured (see benchmarks/metrics_overhead.py).
+
+Export is configured with environment variables:
+- METRICS_PORT: serve /metrics over HTTP on this port (bound to METRICS_HOST, default 127.0.0.1)
+- METRICS_FILE: rewrite this file every METRICS_INTERVAL seconds (default 15), e.g. for
+  the node_exporter textfile collector
+"""
+
+import bisect
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Latency buckets in seconds, from sub-millisecond predictions to multi-second bcrypt bursts
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Registry:
+    """Holds every metric and renders them in Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+class _Metric:
+    type_name = 'untyped'
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels):
+        # Hot path: label values are used as given (rendering converts them to text)
+        if len(self.labelnames) == 1:
+            return (labels.get(self.labelnames[0], ''),)
+        return tuple([labels.get(name, '') for name in self.labelnames])
+
+    def _labels(self, key):
+        return dict(zip(self.labelnames, key))
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    type_name = 'counter'
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY):
+        super().__init__(name, help, labelnames, registry)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [('', self._labels(key), value) for key, value in items]
+
+class Histogram(_Metric):
+    """Distribution of observed values (seconds) in cumulative buckets"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        super().__init__(name, help, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label key -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        series = self._series.get(self._key(labels))
+        return sum(series[:-1]) if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        samples = []
+        for key, series in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                samples.append(('_bucket', {**labels, 'le': _format_value(float(bound))}, cumulative))
+            samples.append(('_count', labels, cumulative))
+            samples.append(('_sum', labels, series[-1]))
+        return samples
+
+class CallbackGauge(_Metric):
+    """Value(s) read from a callback at export time, e.g. cache sizes"""
+
+    def __init__(self, name, help, callback, labelnames=(), type_name='gauge', registry=REGISTRY):
+        super().__init__(name, help, labelnames, registry)
+        self.callback = callback
+        self.type_name = type_name
+
+    def samples(self):
+        try:
+            values = self.callback()
+        except Exception:
+            return []
+        if not isinstance(values, dict):
+            return [('', {}, values)]
+        return [('', self._labels(key if isinstance(key, tuple) else (key,)), value)
+                for key, value in values.items()]
+
+def timed(histogram, errors=None, **labels):
+    """Decorator: observe call latency; count exceptions in errors (re-raised)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                if errors is not None:
+                    errors.inc(**labels)
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - start, **labels)
+        return wrapper
+    return decorator
+
+def render():
+    """All metrics in Prometheus text exposition format"""
+    return REGISTRY.render()
+
+# ==================== PORTAL METRICS ====================
+
+STAGE_SECONDS = Histogram(
+    'portal_stage_seconds', 'Latency of assessment page stages in seconds', ['stage'])
+STAGE_ERRORS = Counter(
+    'portal_stage_errors_total', 'Errors raised by assessment page stages', ['stage'])
+DB_SECONDS = Histogram(
+    'portal_db_seconds', 'Latency of auth and history database calls in seconds', ['backend', 'operation'])
+DB_ERRORS = Counter(
+    'portal_db_errors_total', 'Failed auth and history database calls', ['backend', 'operation'])
+POOL_WAITS = Counter(
+    'portal_db_pool_waits_total', 'Connection requests that had to wait for a free connection', ['backend'])
+POOL_EXHAUSTED = Counter(
+    'portal_db_pool_exhausted_total', 'Connection requests that timed out on a full pool', ['backend'])
+POOL_RECONNECTS = Counter(
+    'portal_db_pool_reconnects_total', 'Failed connection checkouts retried with a fresh connection', ['backend'])
+
+# Connection pools register a callable returning {'idle': n, 'in_use': n} under their backend name
+POOL_STATS = {}
+CallbackGauge(
+    'portal_db_pool_connections', 'Pooled database connections by state', labelnames=['backend', 'state'],
+    callback=lambda: {(backend, state): value
+                      for backend, stats in list(POOL_STATS.items()) for state, value in stats().items()})
+
+@contextmanager
+def stage(name):
+    """Time a page stage in STAGE_SECONDS; exceptions are counted in STAGE_ERRORS and re-raised"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=name)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=name)
+
+# ==================== EXPORT ====================
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_http_server(port, host='127.0.0.1'):
+    """Serve /metrics from a daemon thread; returns the server"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+def write_textfile(path):
+    """Atomically write the current metrics to path"""
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(render())
+    os.replace(tmp_path, path)
+
+def start_file_writer(path, interval=15.0):
+    """Rewrite path every interval seconds from a daemon thread"""
+    def loop():
+        while True:
+            try:
+                write_textfile(path)
+            except OSError:
+                pass
+            time.sleep(interval)
+    threading.Thread(target=loop, name='metrics-file', daemon=True).start()
+
+_exporter_started = False
+_exporter_lock = threading.Lock()
+
+def start_exporter():
+    """Start the exporters configured by METRICS_PORT / METRICS_FILE, once per process"""
+    global _exporter_started
+    with _exporter_lock:
+        if _exporter_started:
+            return
+        _exporter_started = True
+
+    port = os.getenv('METRICS_PORT')
+    if port:
+        try:
+            start_http_server(int(port), os.getenv('METRICS_HOST', '127.0.0.1'))
+        except OSError:
+            # Another process on this host already serves the port
+            pass
+    path = os.getenv('METRICS_FILE')
+    if path:
+        start_file_writer(path, float(os.getenv('METRICS_INTERVAL', '15')))
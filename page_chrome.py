@@ -0,0 +1,224 @@
+"""
+Page Chrome
+Global CSS, header and footer HTML shared by app.py and app_sqlite.py. They
+depend only on the colour constants below, so they are formatted and minified
+once per process, when this module is imported, instead of on every rerun;
+only the dashboard header's welcome name is filled in per render.
+"""
+
+import base64
+import html
+import re
+from functools import lru_cache
+from pathlib import Path
+
+import streamlit as st
+
+# Colors - Professional Hospital Palette
+PRIMARY_COLOR = "#0077b6"  # Medical Blue
+SECONDARY_COLOR = "#023e8a" # Deep Blue
+ACCENT_COLOR = "#00b4d8"    # Light Blue
+BACKGROUND_COLOR = "#ffffff" # Clean White
+TEXT_COLOR = "#333333"       # Dark Gray
+LIGHT_GRAY = "#f8f9fa"       # Very Light Gray for backgrounds
+
+STATIC_DIR = Path(__file__).parent / 'static'
+
+def minify_css(css):
+    """Drop comments and the whitespace CSS does not need"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,])\s*', r'\1', css)
+    css = re.sub(r':\s+', ':', css)
+    return css.replace(';}', '}').strip()
+
+def minify_html(markup):
+    """Collapse the indentation between and inside tags"""
+    return re.sub(r'\s+', ' ', re.sub(r'>\s+<', '><', markup)).strip()
+
+# Custom CSS
+GLOBAL_CSS = "<style>" + minify_css(f"""
+    @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;500;600;700&family=Inter:wght@300;400;500;600&display=swap');
+
+    /* Global Typography */
+    html, body, [class*="css"] {{
+        font-family: 'Inter', sans-serif;
+        color: {TEXT_COLOR};
+    }}
+    
+    h1, h2, h3, h4, h5, h6 {{
+        font-family: 'Poppins', sans-serif;
+        color: {SECONDARY_COLOR};
+        font-weight: 600;
+        margin-bottom: 0.5rem;
+    }}
+
+    /* =========================================
+       1. PROFESSIONAL MEDICAL BACKGROUND (IMAGE)
+       ========================================= */
+       /* Handled via Python injection below to use local file */
+
+    /* =========================================
+       2. LAYOUT & SCROLLING FIXES
+       ========================================= */
+    /* Aggressive padding removal to prevent scrolling */
+    .block-container {{
+        padding-top: 1rem !important;
+        padding-bottom: 0rem !important;
+        max-width: 100%;
+    }}
+    
+    /* Header Navigation Simulation */
+    .header-nav {{
+        display: flex;
+        justify-content: space-between;
+        align-items: center;
+        padding: 0.8rem 2rem;
+        background-color: white;
+        border-bottom: 1px solid #e0e0e0;
+        margin-bottom: 0.5rem; /* Reduced margin */
+        box-shadow: 0 2px 5px rgba(0,0,0,0.05);
+    }}
+    .logo-text {{
+        font-family: 'Poppins', sans-serif;
+        font-weight: 700;
+        font-size: 1.4rem;
+        color: {PRIMARY_COLOR};
+    }}
+    .nav-link {{
+        color: {TEXT_COLOR};
+        text-decoration: none;
+        margin-left: 20px;
+        font-weight: 500;
+        font-size: 0.9rem;
+    }}
+
+    /* Login Card - Centered with Shadow */
+    .login-container-wrapper {{
+        display: flex;
+        justify-content: center;
+        align-items: center;
+        height: 100vh; /* Full viewport height */
+    }}
+    
+    /* Input Fields styling */
+    .stTextInput input {{
+        border: 1px solid #ced4da;
+        border-radius: 4px;
+        padding: 0.75rem;
+        font-size: 0.95rem;
+        background-color: white;
+    }}
+    .stTextInput input:focus {{
+        border-color: {PRIMARY_COLOR};
+        box-shadow: 0 0 0 2px rgba(0, 119, 182, 0.2);
+    }}
+    
+    /* Buttons */
+    .stButton button {{
+        background-color: {PRIMARY_COLOR};
+        color: white;
+        font-weight: 500;
+        border-radius: 4px;
+        padding: 0.5rem 1rem;
+        border: none;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        transition: all 0.2s ease;
+    }}
+    .stButton button:hover {{
+        background-color: {SECONDARY_COLOR};
+        box-shadow: 0 4px 6px rgba(0,0,0,0.15);
+    }}
+    
+    /* Custom Footer - Fixed at bottom */
+    .footer {{
+        position: fixed;
+        bottom: 0;
+        left: 0;
+        width: 100%;
+        padding: 1rem;
+        text-align: center;
+        color: rgba(255,255,255,0.8); /* Light text for contrast */
+        font-size: 0.8rem;
+        background: transparent; /* Or subtle gradient if needed */
+        z-index: 100;
+    }}
+    
+    /* Sidebar */
+    [data-testid="stSidebar"] {{
+        background-color: white;
+        border-right: 1px solid #eee;
+    }}
+    
+    /* Removing default Streamlit elements */
+    #MainMenu {{visibility: hidden;}}
+    footer {{visibility: hidden;}}
+    header {{visibility: hidden;}}
+    
+    /* Login Card Specifics for Contrast */
+    [data-testid="stForm"] {{
+        background-color: white !important;
+        border: 2px solid {PRIMARY_COLOR};
+        border-radius: 10px;
+        padding: 20px;
+        box-shadow: 0 4px 15px rgba(0,0,0,0.1);
+    }}
+    
+""") + "</style>"
+
+_HEADER = """
+    <div class="header-nav">
+        <div class="logo-text">Diabetes Care Portal</div>
+        %s
+    </div>
+"""
+
+LOGIN_HEADER_HTML = minify_html(_HEADER % '<div><span class="nav-link" style="color:#666">Patient Access</span></div>')
+REGISTER_HEADER_HTML = minify_html(_HEADER % '<div><span class="nav-link">Patient Registration</span></div>')
+_DASHBOARD_HEADER = minify_html(
+    _HEADER % ('<div style="display: flex; align-items: center;">'
+               '<span style="margin-right: 15px; font-weight: 500;">Welcome, {name}</span></div>'))
+
+def dashboard_header_html(full_name):
+    """Dashboard header with the (escaped) patient name"""
+    return _DASHBOARD_HEADER.format(name=html.escape(full_name or ''))
+
+LOGIN_FOOTER_HTML = minify_html("""
+    <div class="footer">
+        <p>&copy; 2024 Diabetes Care Portal. Empowering Health.</p>
+    </div>
+""")
+DASHBOARD_FOOTER_HTML = minify_html("""
+    <div class="footer">
+        <p>&copy; 2024 Diabetes Care Portal. All rights reserved.</p>
+    </div>
+""")
+
+@lru_cache(maxsize=None)
+def background_css(image_name):
+    """
+    Background CSS, built once per process. With static serving enabled
+    (.streamlit/config.toml) the image is referenced by URL, so the browser
+    fetches and caches it once instead of receiving it inlined on every rerun;
+    otherwise it is inlined as base64.
+    """
+    path = STATIC_DIR / image_name
+    if not path.exists():
+        return None
+    if st.get_option('server.enableStaticServing'):
+        url = f"app/static/{image_name}"
+    else:
+        url = f"data:image/png;base64,{base64.b64encode(path.read_bytes()).decode()}"
+    return "<style>" + minify_css(f"""
+        .stApp {{
+            background-image: url({url});
+            background-size: cover;
+            background-position: center;
+            background-repeat: no-repeat;
+            background-attachment: fixed;
+        }}
+        /* Ensure main container is transparent */
+        .main .block-container {{
+            background: transparent;
+        }}
+    """) + "</style>"
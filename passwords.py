@@ -0,0 +1,136 @@
+"""
+Password Hashing
+bcrypt hashing and verification for auth.py and auth_sqlite.py
+
+bcrypt releases the GIL, so hashes run in a small thread pool (BCRYPT_WORKERS
+threads, 0 to hash in the calling thread): a burst of logins keeps at most that
+many cores busy and leaves the rest to the other sessions.
+
+The cost factor is calibrated once per process so that a hash takes about
+BCRYPT_TARGET_MS on this hardware, never below BCRYPT_MIN_ROUNDS (12, the
+cost hashes were created with before calibration); set BCRYPT_ROUNDS to fix it
+instead. Stored hashes with a lower cost are replaced after the user's next
+successful login (needs_rehash, rehash_in_background). Hashes are never
+rewritten to a lower cost, so a slower host, or processes that calibrated
+differently, cannot weaken them or rewrite the same hash back and forth.
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import CallbackGauge, Counter
+
+logger = logging.getLogger('diabetes_portal.passwords')
+
+WORKERS = int(os.getenv('BCRYPT_WORKERS', str(max(1, (os.cpu_count() or 2) // 2))))
+TARGET_MS = float(os.getenv('BCRYPT_TARGET_MS', '250'))
+MIN_ROUNDS = int(os.getenv('BCRYPT_MIN_ROUNDS', '12'))
+MAX_ROUNDS = 16
+ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '0')) or None      # fixed cost, skips calibration
+REHASH_ON_LOGIN = os.getenv('BCRYPT_REHASH', '1') != '0'
+
+REHASHES = Counter('portal_password_rehashes_total', 'Stored password hashes replaced at the current cost',
+                   ['result'])
+
+_calibrated = None
+_calibration_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+
+def calibrate(target_ms=TARGET_MS, min_rounds=MIN_ROUNDS, max_rounds=MAX_ROUNDS, probe_rounds=8):
+    """
+    Cost factor whose hash time is closest to target_ms here. Times a cheap
+    probe and extrapolates: each extra round doubles the work.
+    """
+    import bcrypt
+    salt = bcrypt.gensalt(rounds=probe_rounds)
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        bcrypt.hashpw(b'calibration', salt)
+        best = min(best, (time.perf_counter() - start) * 1000)
+    rounds = probe_rounds + round(math.log2(target_ms / best))
+    return max(min_rounds, min(max_rounds, rounds))
+
+def rounds():
+    """The cost factor for new hashes: BCRYPT_ROUNDS, or calibrated on first use"""
+    global _calibrated
+    if ROUNDS:
+        return ROUNDS
+    if _calibrated is None:
+        with _calibration_lock:
+            if _calibrated is None:
+                _calibrated = calibrate()
+                logger.info("bcrypt cost calibrated to %d rounds (target %.0f ms)", _calibrated, TARGET_MS)
+    return _calibrated
+
+def _get_executor():
+    """The process-wide hashing pool (replaced if WORKERS changes)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None or _executor[0] != WORKERS:
+            if _executor is not None:
+                _executor[1].shutdown(wait=False)
+            _executor = (WORKERS, ThreadPoolExecutor(WORKERS, thread_name_prefix='bcrypt'))
+        return _executor[1]
+
+def _run(fn, *args):
+    """fn(*args) in the hashing pool, waiting for the result"""
+    if WORKERS <= 0:
+        return fn(*args)
+    return _get_executor().submit(fn, *args).result()
+
+def calibrate_in_background():
+    """Calibrate the cost at startup so the first registration does not pay for it"""
+    if not ROUNDS and _calibrated is None:
+        threading.Thread(target=rounds, name='bcrypt-calibration', daemon=True).start()
+
+def _hash(password):
+    import bcrypt
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds())).decode('utf-8')
+
+def _check(password, hashed_password):
+    import bcrypt
+    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+def hash_password(password):
+    """Hash a password at the current cost"""
+    return _run(_hash, password)
+
+def verify_password(password, hashed_password):
+    """Verify a password against its hash"""
+    return _run(_check, password, hashed_password)
+
+def hash_rounds(hashed_password):
+    """Cost factor of a stored hash ('$2b$12$...' -> 12)"""
+    return int(hashed_password.split('$')[2])
+
+def needs_rehash(hashed_password):
+    """True if a stored hash is weaker than the current cost and should be replaced"""
+    return REHASH_ON_LOGIN and hash_rounds(hashed_password) < rounds()
+
+def rehash_in_background(password, store):
+    """
+    Hash password at the current cost without making the caller wait, then
+    call store(new_hash). Failures are logged and counted; the old hash stays
+    valid and the rehash is tried again on the next login.
+    """
+    def task():
+        try:
+            store(_hash(password))
+            REHASHES.inc(result='stored')
+        except Exception as e:
+            REHASHES.inc(result='failed')
+            logger.warning("Password rehash failed: %s", e)
+
+    if WORKERS <= 0:
+        threading.Thread(target=task, name='bcrypt-rehash', daemon=True).start()
+    else:
+        _get_executor().submit(task)
+
+CallbackGauge('portal_bcrypt_rounds', 'bcrypt cost factor used for new password hashes',
+              callback=lambda: ROUNDS or _calibrated or 0)
@@ -0,0 +1,142 @@
+"""
+Session Tokens
+Signed, expiring tokens that let a returning browser (page refresh, reconnect,
+new tab with the same URL) restore its login without a password check.
+
+A token is "<user id>.<expiry>.<token id>.<signature>", the signature being an
+HMAC-SHA256 over the first three fields with a server secret: checking it is a
+constant-time comparison, not a bcrypt hash. The apps keep it in the page URL
+as the ?session= query parameter.
+
+The secret comes from SESSION_SECRET, or is generated once into .session_secret
+next to this file; changing it invalidates every token. Tokens revoked on Sign
+Out are recorded in the database until they expire (revoke_token with the auth
+backend's revoke_session, checked by verify_token with session_revoked), so a
+revocation holds for every server process and across restarts.
+
+The token is a bearer credential in the URL: it ends up in browser history and
+in the logs of any proxy that records URLs. Serve the apps over HTTPS, keep
+SESSION_TTL_HOURS short, and rely on Sign Out (not closing the tab) to end a
+session on a shared computer.
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from pathlib import Path
+
+import streamlit as st
+
+from metrics import Counter
+
+TTL_SECONDS = int(float(os.getenv('SESSION_TTL_HOURS', '12')) * 3600)
+SECRET_FILE = Path(__file__).parent / '.session_secret'
+QUERY_PARAM = 'session'
+
+RESTORES = Counter('portal_session_restores_total', 'Session token checks by result', ['result'])
+
+_secret = None
+_revoked = {}           # token id -> expiry, revoked by this process (saves a database check)
+_lock = threading.Lock()
+
+def _get_secret():
+    """SESSION_SECRET, or the generated secret in SECRET_FILE"""
+    global _secret
+    if _secret is None:
+        if os.getenv('SESSION_SECRET'):
+            _secret = os.environ['SESSION_SECRET'].encode('utf-8')
+        else:
+            try:
+                fd = os.open(SECRET_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+                with os.fdopen(fd, 'w') as f:
+                    f.write(secrets.token_hex(32))
+            except FileExistsError:
+                pass
+            _secret = SECRET_FILE.read_text().strip().encode('utf-8')
+    return _secret
+
+def _sign(payload):
+    digest = hmac.new(_get_secret(), payload.encode('utf-8'), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode('ascii')
+
+def issue_token(user_id, ttl=TTL_SECONDS):
+    """A new token for user_id, valid for ttl seconds"""
+    payload = f"{int(user_id)}.{int(time.time()) + ttl}.{secrets.token_urlsafe(9)}"
+    return f"{payload}.{_sign(payload)}"
+
+def verify_token(token, is_revoked=None):
+    """
+    The user id a token was issued for, or None if it is invalid, expired or
+    revoked. is_revoked(token_id) checks the revocations shared by all processes
+    (auth.session_revoked / auth_sqlite.session_revoked).
+    """
+    if not token:
+        return None
+    try:
+        user_id, expires, token_id, signature = token.split('.')
+        user_id, expires = int(user_id), int(expires)
+    except ValueError:
+        RESTORES.inc(result='invalid')
+        return None
+    # As bytes: compare_digest raises TypeError on a str with non-ASCII characters
+    expected = _sign(f"{user_id}.{expires}.{token_id}").encode('ascii')
+    if not hmac.compare_digest(signature.encode('utf-8'), expected):
+        RESTORES.inc(result='invalid')
+        return None
+    if expires < time.time():
+        RESTORES.inc(result='expired')
+        return None
+    if token_id in _revoked or (is_revoked is not None and is_revoked(token_id)):
+        RESTORES.inc(result='revoked')
+        return None
+    RESTORES.inc(result='restored')
+    return user_id
+
+def revoke_token(token, store=None):
+    """
+    Reject a token from now on (Sign Out). store(token_id, expires) records the
+    revocation for other processes and restarts (auth.revoke_session /
+    auth_sqlite.revoke_session).
+    """
+    if not token:
+        return
+    try:
+        _, expires, token_id, _ = token.split('.')
+        expires = int(expires)
+    except ValueError:
+        return
+    now = time.time()
+    with _lock:
+        for revoked_id, revoked_expiry in list(_revoked.items()):
+            if revoked_expiry < now:
+                del _revoked[revoked_id]
+        _revoked[token_id] = expires
+    if store is not None:
+        store(token_id, expires)
+
+def read_token():
+    """The token in the page URL, or None"""
+    if hasattr(st, 'query_params'):
+        return st.query_params.get(QUERY_PARAM)
+    # Streamlit < 1.30
+    values = st.experimental_get_query_params().get(QUERY_PARAM)
+    return values[0] if values else None
+
+def store_token(token):
+    """Put a token in the page URL, or remove it when token is None"""
+    if hasattr(st, 'query_params'):
+        if token:
+            st.query_params[QUERY_PARAM] = token
+        else:
+            st.query_params.pop(QUERY_PARAM, None)
+        return
+    params = st.experimental_get_query_params()
+    if token:
+        params[QUERY_PARAM] = [token]
+    else:
+        params.pop(QUERY_PARAM, None)
+    st.experimental_set_query_params(**params)
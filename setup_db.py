@@ -6,6 +6,8 @@ This script helps you configure MySQL connection and test the database
 import mysql.connector
 import sys
 
+from config import ENV_FILE
+
 def setup_mysql_config():
     """Interactive setup for MySQL configuration"""
     print("=" * 60)
@@ -93,36 +95,22 @@ def setup_mysql_config():
         
         # Save configuration
         print("=" * 60)
-        print("Saving configuration to auth.py...")
+        print("Saving configuration to .env...")
         print("=" * 60 + "\n")
         
-        config_content = f"""import mysql.connector
-import bcrypt
-import streamlit as st
-from datetime import datetime
-
-# Database configuration
-DB_CONFIG = {{
-    'host': '{host}',
-    'user': '{user}',
-    'password': '{password}',
-    'database': 'diabetes_app'
-}}
-"""
+        settings = {
+            'DB_HOST': host,
+            'DB_USER': user,
+            'DB_PASSWORD': password,
+            'DB_NAME': 'diabetes_app',
+        }
         
-        # Read the rest of auth.py and append it
+        # auth.py reads these through config.get_db_config(); other lines in an existing .env are kept
         try:
-            with open('auth.py', 'r') as f:
-                content = f.read()
-                # Find where DB_CONFIG ends
-                db_config_end = content.find('\ndef get_db_connection')
-                if db_config_end > 0:
-                    rest_of_file = content[db_config_end:]
-                else:
-                    rest_of_file = ""
-            
-            with open('auth.py', 'w') as f:
-                f.write(config_content + rest_of_file)
+            lines = ENV_FILE.read_text().splitlines() if ENV_FILE.exists() else []
+            kept = [line for line in lines if line.split('=', 1)[0].strip() not in settings]
+            with open(ENV_FILE, 'w') as f:
+                f.write('\n'.join(kept + [f"{key}={value}" for key, value in settings.items()]) + '\n')
             
             print("✓ Configuration saved successfully!")
             print("\nYour database is now ready to use!")
@@ -136,10 +124,9 @@ DB_CONFIG = {{
             
         except Exception as e:
             print(f"✗ Error saving configuration: {e}")
-            print("\nYou can manually update the DB_CONFIG in auth.py:")
-            print(f"  'host': '{host}',")
-            print(f"  'user': '{user}',")
-            print(f"  'password': '{password}',")
+            print(f"\nYou can manually create {ENV_FILE} with:")
+            for key, value in settings.items():
+                print(f"  {key}={value}")
             return False
             
         return True
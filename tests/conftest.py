@@ -0,0 +1,25 @@
+"""
+Shared fixtures for the correctness tests (the same guarantees the benchmark
+scripts check, run with pytest from the repository root)
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+@pytest.fixture
+def sqlite_db():
+    """auth_sqlite pointed at an empty scratch database, restored afterwards"""
+    import auth_sqlite
+    from benchmarks.suite import SqliteBackend
+
+    backend = SqliteBackend()
+    backend.reset()
+    try:
+        yield auth_sqlite
+    finally:
+        auth_sqlite.flush_predictions(timeout=30)
+        backend.close()
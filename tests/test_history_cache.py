@@ -0,0 +1,100 @@
+"""
+Behaviour documented in history_cache.py (see also benchmarks/history_cache.py)
+"""
+
+import time
+
+from history_cache import HistoryCache
+from metrics import DB_SECONDS
+
+def page_queries():
+    return DB_SECONDS.count(backend='sqlite', operation='get_user_predictions_page')
+
+def save(db, user_id, age, prediction=0):
+    db.save_prediction(user_id, 1, 100, 70, 20, 80, 25.0, 0.5, age, prediction)
+
+def query_for(db, user_id):
+    return lambda limit, cursor: db._query_predictions_page(user_id, limit, cursor)
+
+def test_saved_assessment_shown_without_requery(sqlite_db):
+    for age in range(5):
+        save(sqlite_db, 1, age)
+    sqlite_db.get_user_predictions_page(1, 20)
+    save(sqlite_db, 1, 33, 1)
+    before = page_queries()
+    rows, _ = sqlite_db.get_user_predictions_page(1, 20)
+    assert page_queries() == before
+    assert rows[0] == sqlite_db._query_predictions_page(1, 1, None)[0][0]
+
+def test_queued_assessment_shown_after_flush_without_requery(sqlite_db):
+    save(sqlite_db, 1, 20)
+    sqlite_db.get_user_predictions_page(1, 20)
+    sqlite_db.queue_prediction(1, 4, 122, 70, 20, 80, 25.0, 0.5, 34, 0)
+    assert sqlite_db.flush_predictions(user_id=1)
+    before = page_queries()
+    rows, _ = sqlite_db.get_user_predictions_page(1, 20)
+    assert page_queries() == before
+    assert rows[0] == sqlite_db._query_predictions_page(1, 1, None)[0][0]
+
+def test_cached_pages_match_the_database(sqlite_db):
+    cache = sqlite_db.history_cache
+    # More rows than the cache keeps, some sharing a timestamp
+    stamps = [f"2026-01-01 00:{i // 120:02d}:{(i // 2) % 60:02d}" for i in range(cache.rows_per_user * 2)]
+    sqlite_db.save_predictions([(2, 0, 100, 70, 20, 80, 25.0, 0.5, i % 80, 0, stamp)
+                                for i, stamp in enumerate(stamps)])
+    cached_cursor = db_cursor = None
+    while True:
+        cached_page = sqlite_db.get_user_predictions_page(2, 7, cached_cursor)
+        db_page = sqlite_db._query_predictions_page(2, 7, db_cursor)
+        assert cached_page == db_page
+        (_, cached_cursor), (_, db_cursor) = cached_page, db_page
+        if cached_cursor is None:
+            break
+    assert cache.cached(2)
+
+def test_memory_bounded_by_max_bytes(sqlite_db):
+    for user_id in range(1, 41):
+        sqlite_db.save_predictions([(user_id, 1, 100, 70, 20, 80, 25.0, 0.5, age, 0, '2026-01-01 00:00:00')
+                                    for age in range(50)])
+    bounded = HistoryCache('test-bound', max_bytes=64 * 1024)
+    for user_id in range(1, 41):
+        bounded.page(user_id, 20, None, query_for(sqlite_db, user_id))
+    stats = bounded.stats()
+    assert stats['bytes'] <= stats['max_bytes']
+    assert stats['evictions'] > 0
+
+def test_entries_expire_after_the_ttl(sqlite_db):
+    save(sqlite_db, 1, 20)
+    expiring = HistoryCache('test-ttl', ttl=0.05)
+    expiring.page(1, 20, None, query_for(sqlite_db, 1))
+    expiring.page(1, 20, None, query_for(sqlite_db, 1))
+    time.sleep(0.1)
+    expiring.page(1, 20, None, query_for(sqlite_db, 1))
+    stats = expiring.stats()
+    assert (stats['hits'], stats['misses'], stats['expired']) == (1, 2, 1)
+
+def test_load_racing_a_write_not_cached(sqlite_db):
+    save(sqlite_db, 1, 20)
+    racing = HistoryCache('test-race')
+
+    def load_during_write(limit, cursor):
+        rows = sqlite_db._query_predictions_page(1, limit, cursor)
+        racing.add(1, [])  # a save for user 1 commits while the load is in flight
+        return rows
+
+    racing.page(1, 20, None, load_during_write)
+    assert not racing.cached(1)
+
+def test_version_changes_only_with_the_rows(sqlite_db):
+    save(sqlite_db, 1, 20)
+    versioned = HistoryCache('test-version')
+    assert versioned.version(1) is None
+    versioned.page(1, 20, None, query_for(sqlite_db, 1))
+    loaded = versioned.version(1)
+    versioned.page(1, 20, None, query_for(sqlite_db, 1))
+    assert versioned.version(1) == loaded
+    save(sqlite_db, 1, 21)
+    versioned.add(1, sqlite_db._query_predictions_page(1, 1, None)[0])
+    assert versioned.version(1) not in (None, loaded)
+    versioned.invalidate(1)
+    assert versioned.version(1) is None
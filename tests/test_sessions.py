@@ -0,0 +1,49 @@
+"""
+Session token checks (see also benchmarks/session_restore.py)
+"""
+
+import pytest
+
+import sessions
+
+@pytest.fixture
+def user_id(sqlite_db):
+    sqlite_db.register_user('returning', 'returning@example.com', 'test-pw', 'Returning Patient')
+    return sqlite_db.login_user('returning', 'test-pw')[1]['id']
+
+def test_valid_token_restores_its_user(user_id):
+    assert sessions.verify_token(sessions.issue_token(user_id)) == user_id
+
+def test_tampered_tokens_rejected(user_id):
+    token_user, expires, token_id, signature = sessions.issue_token(user_id).split('.')
+    assert sessions.verify_token(f"{int(token_user) + 1}.{expires}.{token_id}.{signature}") is None
+    assert sessions.verify_token(f"{token_user}.{int(expires) + 3600}.{token_id}.{signature}") is None
+
+def test_expired_and_malformed_tokens_rejected(user_id):
+    assert sessions.verify_token(sessions.issue_token(user_id, ttl=-1)) is None
+    assert sessions.verify_token('not-a-token') is None
+
+def test_revoked_token_rejected_others_still_valid(user_id):
+    token = sessions.issue_token(user_id)
+    revoked = sessions.issue_token(user_id)
+    sessions.revoke_token(revoked)
+    assert sessions.verify_token(revoked) is None
+    assert sessions.verify_token(token) == user_id
+
+def test_revocation_in_the_database_survives_a_restart(sqlite_db, user_id, monkeypatch):
+    token = sessions.issue_token(user_id)
+    signed_out = sessions.issue_token(user_id)
+    sessions.revoke_token(signed_out, sqlite_db.revoke_session)
+    monkeypatch.setattr(sessions, '_revoked', {})  # as in another process, or after a restart
+    assert sessions.verify_token(signed_out, sqlite_db.session_revoked) is None
+    assert sessions.verify_token(token, sqlite_db.session_revoked) == user_id
+
+def test_token_signed_with_another_secret_rejected(user_id, monkeypatch):
+    token = sessions.issue_token(user_id)
+    monkeypatch.setattr(sessions, '_secret', b'another-server')
+    assert sessions.verify_token(token) is None
+
+def test_non_ascii_signature_rejected(user_id):
+    token_user, expires, token_id, _ = sessions.issue_token(user_id).split('.')
+    assert sessions.verify_token(f"{token_user}.{expires}.{token_id}.é") is None
+    assert sessions.verify_token('1.99999999999.abc.é') is None
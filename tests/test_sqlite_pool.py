@@ -0,0 +1,31 @@
+"""
+auth_sqlite connection pool
+"""
+
+from auth_sqlite import ConnectionPool
+
+def test_closing_twice_releases_once(tmp_path):
+    pool = ConnectionPool(tmp_path / 'pool.db', size=2)
+    conn = pool.acquire()
+    with conn:
+        conn.execute("SELECT 1")
+    conn.close()
+    conn.close()
+    assert pool.stats()['idle'] == 1
+    assert pool.stats()['in_use'] == 0
+    first, second = pool.acquire(), pool.acquire()
+    assert first is not second
+    first.close()
+    second.close()
+    pool.close()
+
+def test_released_connection_reused_open(tmp_path):
+    pool = ConnectionPool(tmp_path / 'pool.db', size=1)
+    conn = pool.acquire()
+    conn.close()
+    conn.close()
+    again = pool.acquire()
+    assert again is conn
+    assert again.execute("SELECT 1").fetchone()[0] == 1
+    again.close()
+    pool.close()
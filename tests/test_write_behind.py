@@ -0,0 +1,94 @@
+"""
+Guarantees documented in write_behind.py (see also benchmarks/write_behind.py)
+"""
+
+import threading
+
+from write_behind import WriteBehindQueue
+
+ROW = (1, 2, 120, 70, 20, 80, 32.0, 0.47, 45, 0, '2026-01-01 00:00:00')
+
+class Store:
+    """write_many target collecting rows in memory"""
+
+    def __init__(self):
+        self.rows = []
+        self._lock = threading.Lock()
+
+    def __call__(self, rows):
+        with self._lock:
+            self.rows.extend(rows)
+
+def test_accepted_rows_written_after_close():
+    store = Store()
+    queue = WriteBehindQueue(store, name='test-close')
+    threads = [threading.Thread(target=lambda: [queue.submit(ROW) for _ in range(200)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert queue.close()
+    assert len(store.rows) == 800
+
+def test_full_queue_writes_synchronously():
+    store = Store()
+    queue = WriteBehindQueue(store, name='test-full', maxsize=8, batch_size=4)
+    assert all(queue.submit(ROW) for _ in range(2000))
+    queue.close()
+    assert len(store.rows) == 2000
+    assert queue.counts['sync'] > 0
+
+def test_failed_batch_retried():
+    store = Store()
+    attempts = []
+
+    def flaky(rows):
+        attempts.append(len(rows))
+        if len(attempts) <= 2:
+            raise RuntimeError("simulated outage")
+        store(rows)
+
+    queue = WriteBehindQueue(flaky, name='test-retry', retry_delay=0.01)
+    queue.submit(ROW)
+    assert queue.flush(10)
+    assert queue.counts['written'] == 1
+    assert len(attempts) == 3
+
+def test_permanently_failing_rows_dropped_and_counted():
+    def broken(rows):
+        raise RuntimeError("simulated permanent failure")
+
+    queue = WriteBehindQueue(broken, name='test-drop', max_retries=3, retry_delay=0.01)
+    for _ in range(5):
+        queue.submit(ROW)
+    queue.close()
+    assert queue.counts['dropped'] == 5
+
+def test_submission_order_kept():
+    store = Store()
+    queue = WriteBehindQueue(store, name='test-order', batch_size=7)
+    for age in range(100):
+        queue.submit((1, 0, 100, 70, 20, 80, 25.0, 0.5, age, 0, ROW[-1]))
+    queue.close()
+    assert [row[8] for row in store.rows] == list(range(100))
+
+def test_flush_for_one_key_skips_other_keys():
+    store = Store()
+    release = threading.Event()
+
+    def held_for_user_2(rows):
+        if any(row[0] == 2 for row in rows):
+            release.wait(10)
+        store(rows)
+
+    queue = WriteBehindQueue(held_for_user_2, name='test-key', key=lambda row: row[0])
+    queue.submit((2, *ROW[1:]))
+    try:
+        assert queue.flush(1, key=3)
+        assert not queue.flush(0.05, key=2)
+        assert queue.pending(2) == 1
+    finally:
+        release.set()
+    assert queue.flush(10, key=2)
+    assert queue.pending(2) == 0
+    queue.close()
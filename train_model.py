@@ -0,0 +1,366 @@
+"""
+Model Training Pipeline
+Trains the scaler and model (scaler.joblib, stacked_ensemble_rf_model.pkl) from diabetes.csv
+
+Steps:
+1. Hold out a stratified test split, then cross-validate every hyperparameter
+   configuration on the rest, with all (configuration, fold) fits running in
+   parallel across cores
+2. Refit the best configuration on the full training split and score it on the
+   hold-out set
+3. Write versioned artifacts (model, scaler, report.json) under models/<version>/
+   and, with --publish, serve them: the published_model pointer file
+   (inference.PUBLISHED_POINTER) is switched to the version directory in one
+   rename, so the apps never load a model and scaler from different versions
+
+With --incremental NEW.csv the search is skipped: new trees fitted on the new
+rows are appended to the current model (warm start), the oldest trees are
+optionally retired (--max-trees), and the result is versioned and published the
+same way. The update is scored on --eval-data, or else on --test-size of the new
+rows held out from the fit (never on diabetes.csv, which the model was trained on).
+
+Fold splits, per-fold results and refitted models are cached on disk
+(joblib.Memory), so a re-run only fits configurations or data that changed.
+The report records wall-clock fit time and single-row inference latency for
+every configuration.
+
+Usage:
+    python train_model.py [--grid quick|default] [--folds 5] [--n-jobs -1] [--publish]
+    python train_model.py --incremental new_batch.csv --new-trees 20 [--max-trees 200] [--eval-data held_out.csv] [--publish]
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+from pathlib import Path
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+from joblib import Memory, Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+from sklearn.model_selection import StratifiedKFold, train_test_split
+from sklearn.preprocessing import StandardScaler
+
+from inference import BASE_DIR, FEATURE_COLUMNS, MODEL_FILE, PUBLISHED_POINTER, SCALER_FILE, published_artifacts
+
+DATA_FILE = BASE_DIR / 'diabetes.csv'
+TARGET_COLUMN = 'Outcome'
+MODELS_DIR = BASE_DIR / 'models'
+CACHE_DIR = BASE_DIR / '.train_cache'
+RANDOM_STATE = 42
+
+# Hyperparameter grids for the random forest
+GRIDS = {
+    'quick': {
+        'n_estimators': [100],
+        'max_depth': [None, 10],
+        'min_samples_leaf': [1],
+        'max_features': ['sqrt'],
+    },
+    'default': {
+        'n_estimators': [100, 300],
+        'max_depth': [None, 10],
+        'min_samples_leaf': [1, 3],
+        'max_features': ['sqrt', 0.5],
+    },
+}
+
+def load_data(data_file=DATA_FILE):
+    """Features and labels from diabetes.csv"""
+    data = pd.read_csv(data_file)
+    return data[FEATURE_COLUMNS], data[TARGET_COLUMN].to_numpy()
+
+def expand_grid(grid):
+    """All combinations of a parameter grid as a list of dicts"""
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+def make_folds(y, n_folds, random_state):
+    """Stratified fold indices (cached, so every run scores the same splits)"""
+    splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=random_state)
+    return [(train, test) for train, test in splitter.split(np.zeros(len(y)), y)]
+
+def fit_pipeline(params, X, y, random_state=RANDOM_STATE):
+    """Fit the scaler and forest on X, y; returns (scaler, model, fit_seconds)"""
+    start = time.perf_counter()
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(random_state=random_state, n_jobs=1, **params)
+    model.fit(scaler.transform(X), y)
+    return scaler, model, time.perf_counter() - start
+
+def single_row_latency_ms(scaler, model, row, repeat=30):
+    """Median time of scaler.transform + model.predict on one row"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.predict(scaler.transform(row))
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+def evaluate_fold(params, X, y, train_idx, test_idx):
+    """Fit one configuration on one fold; returns scores and timings"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        X_train, X_test = X.iloc[train_idx], X.iloc[test_idx]
+        scaler, model, fit_seconds = fit_pipeline(params, X_train, y[train_idx])
+        proba = model.predict_proba(scaler.transform(X_test))[:, 1]
+        return {
+            'accuracy': accuracy_score(y[test_idx], (proba > 0.5).astype(int)),
+            'roc_auc': roc_auc_score(y[test_idx], proba),
+            'fit_seconds': fit_seconds,
+            'predict_1row_ms': single_row_latency_ms(scaler, model, X_test.iloc[:1]),
+        }
+
+def search(configs, X, y, folds, memory, n_jobs):
+    """Cross-validate every configuration; (configuration, fold) fits run in parallel"""
+    cached_fold = memory.cache(evaluate_fold)
+    tasks = [(config, fold) for config in configs for fold in folds]
+    fold_results = Parallel(n_jobs=n_jobs)(
+        delayed(cached_fold)(config, X, y, train, test) for config, (train, test) in tasks
+    )
+
+    results = []
+    n_folds = len(folds)
+    for i, config in enumerate(configs):
+        scores = fold_results[i * n_folds:(i + 1) * n_folds]
+        results.append({
+            'params': config,
+            'cv_accuracy': float(np.mean([s['accuracy'] for s in scores])),
+            'cv_accuracy_std': float(np.std([s['accuracy'] for s in scores])),
+            'cv_roc_auc': float(np.mean([s['roc_auc'] for s in scores])),
+            'fit_seconds_total': float(sum(s['fit_seconds'] for s in scores)),
+            'fit_seconds_mean': float(np.mean([s['fit_seconds'] for s in scores])),
+            'predict_1row_ms': float(np.median([s['predict_1row_ms'] for s in scores])),
+        })
+    return results
+
+def data_fingerprint(X, y):
+    """Short hash of the training data, recorded in the report"""
+    digest = hashlib.sha256(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    digest.update(np.asarray(y).tobytes())
+    return digest.hexdigest()[:16]
+
+def publish(version_dir):
+    """
+    Serve the model and scaler in version_dir: its path is written to a temporary
+    file renamed over PUBLISHED_POINTER, so readers switch both at once
+    """
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{PUBLISHED_POINTER.name}-", dir=PUBLISHED_POINTER.parent)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(str(Path(version_dir).resolve()))
+    os.replace(tmp_path, PUBLISHED_POINTER)
+
+def warm_start_update(model, scaler, X_new, y_new, new_trees, max_trees=None):
+    """
+    Append new_trees trees fitted on the new batch to a fitted forest (warm start).
+    With max_trees, the oldest trees are retired so at most max_trees remain.
+    The existing scaler is reused so old and new trees see identically scaled inputs.
+    Returns the fit time in seconds.
+    """
+    missing = set(model.classes_) - set(np.unique(y_new))
+    if missing:
+        raise ValueError(f"New data must contain every class the model predicts; missing {sorted(missing)}")
+
+    start = time.perf_counter()
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + new_trees, n_jobs=1)
+    model.fit(scaler.transform(X_new), y_new)
+    if max_trees is not None and len(model.estimators_) > max_trees:
+        model.estimators_ = model.estimators_[len(model.estimators_) - max_trees:]
+    model.set_params(warm_start=False, n_estimators=len(model.estimators_))
+    return time.perf_counter() - start
+
+def holdout_metrics(model, scaler, X, y):
+    """Accuracy, F1 and ROC AUC on held-out rows"""
+    proba = model.predict_proba(scaler.transform(X))[:, 1]
+    predicted = (proba > 0.5).astype(int)
+    return {
+        'accuracy': float(accuracy_score(y, predicted)),
+        'f1': float(f1_score(y, predicted)),
+        'roc_auc': float(roc_auc_score(y, proba)),
+    }
+
+def environment():
+    """Library versions and hardware recorded with every model version"""
+    return {
+        'python': platform.python_version(),
+        'sklearn': sklearn.__version__,
+        'numpy': np.__version__,
+        'cpu_count': os.cpu_count(),
+    }
+
+def write_version(model, scaler, report, output_dir):
+    """Save artifacts and report.json under output_dir/<version>/, returns the directory"""
+    # Microseconds keep runs in the same second apart; an existing directory is never reused
+    version = datetime.now().strftime('v%Y%m%d-%H%M%S-%f')
+    version_dir = Path(output_dir) / version
+    version_dir.mkdir(parents=True)
+    # Same names as the files in the project root; published_artifacts() looks for these
+    joblib.dump(model, version_dir / MODEL_FILE.name)
+    joblib.dump(scaler, version_dir / SCALER_FILE.name)
+
+    report = {'version': version, 'created_at': datetime.now().isoformat(timespec='seconds'), **report}
+    (version_dir / 'report.json').write_text(json.dumps(report, indent=2, default=str))
+    return version_dir
+
+def run_search(args):
+    """Full retrain: cross-validated search, refit of the best configuration"""
+    run_start = time.perf_counter()
+    memory = Memory(None if args.no_cache else args.cache_dir, verbose=0)
+
+    X, y = load_data(args.data)
+    train_idx, test_idx = train_test_split(
+        np.arange(len(y)), test_size=args.test_size, stratify=y, random_state=RANDOM_STATE
+    )
+    X_train, y_train = X.iloc[train_idx].reset_index(drop=True), y[train_idx]
+    X_test, y_test = X.iloc[test_idx].reset_index(drop=True), y[test_idx]
+    folds = memory.cache(make_folds)(y_train, args.folds, RANDOM_STATE)
+
+    configs = expand_grid(GRIDS[args.grid])
+    print(f"Cross-validating {len(configs)} configurations x {args.folds} folds "
+          f"on {len(y_train)} rows (n_jobs={args.n_jobs})...")
+    search_start = time.perf_counter()
+    results = search(configs, X_train, y_train, folds, memory, args.n_jobs)
+    search_seconds = time.perf_counter() - search_start
+
+    print(f"\n{'cv acc':>7} | {'auc':>5} | {'fit (all folds)':>15} | {'1-row':>8} | params")
+    print("-" * 92)
+    for r in sorted(results, key=lambda r: -r['cv_accuracy']):
+        print(f"{r['cv_accuracy']:>7.3f} | {r['cv_roc_auc']:>5.3f} | {r['fit_seconds_total']:>13.2f} s | "
+              f"{r['predict_1row_ms']:>5.2f} ms | {r['params']}")
+
+    best = max(results, key=lambda r: (r['cv_accuracy'], r['cv_roc_auc']))
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        scaler, model, refit_seconds = memory.cache(fit_pipeline)(best['params'], X_train, y_train)
+        holdout = holdout_metrics(model, scaler, X_test, y_test)
+
+    version_dir = write_version(model, scaler, {
+        'mode': 'search',
+        'data': {'file': str(args.data), 'rows': int(len(y)), 'fingerprint': data_fingerprint(X, y)},
+        'environment': environment(),
+        'search': {
+            'grid': args.grid,
+            'folds': args.folds,
+            'n_jobs': args.n_jobs,
+            'wall_seconds': search_seconds,
+            'configurations': results,
+        },
+        'best': {
+            'params': best['params'],
+            'refit_seconds': refit_seconds,
+            'holdout': holdout,
+        },
+        'total_wall_seconds': time.perf_counter() - run_start,
+    }, args.output_dir)
+
+    print(f"\n✓ Best: {best['params']}")
+    print(f"  Hold-out accuracy {holdout['accuracy']:.3f}, F1 {holdout['f1']:.3f}, ROC AUC {holdout['roc_auc']:.3f}")
+    print(f"  Search {search_seconds:.1f}s, total {time.perf_counter() - run_start:.1f}s")
+    return version_dir
+
+def run_incremental(args):
+    """Warm-start update of the current model with a new labeled batch"""
+    run_start = time.perf_counter()
+    published_model, published_scaler = published_artifacts()
+    args.model = args.model or str(published_model)
+    args.scaler = args.scaler or str(published_scaler)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        model = joblib.load(args.model)
+        scaler = joblib.load(args.scaler)
+
+    X_new, y_new = load_data(args.incremental)
+    if args.eval_data:
+        X_eval, y_eval = load_data(args.eval_data)
+        evaluation = {'file': str(args.eval_data)}
+        eval_label = Path(args.eval_data).name
+    else:
+        # The model was trained on diabetes.csv, so score the update on new rows it does not fit
+        fit_idx, eval_idx = train_test_split(
+            np.arange(len(y_new)), test_size=args.test_size, stratify=y_new, random_state=RANDOM_STATE
+        )
+        X_eval, y_eval = X_new.iloc[eval_idx].reset_index(drop=True), y_new[eval_idx]
+        X_new, y_new = X_new.iloc[fit_idx].reset_index(drop=True), y_new[fit_idx]
+        evaluation = {'file': str(args.incremental), 'held_out_fraction': args.test_size}
+        eval_label = f"{len(y_eval)} held-out rows of {Path(args.incremental).name}"
+    trees_before = len(model.estimators_)
+    print(f"Adding {args.new_trees} trees fitted on {len(y_new)} new rows "
+          f"to {trees_before} existing trees...")
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        fit_seconds = warm_start_update(model, scaler, X_new, y_new, args.new_trees, args.max_trees)
+        holdout = holdout_metrics(model, scaler, X_eval, y_eval)
+
+    version_dir = write_version(model, scaler, {
+        'mode': 'incremental',
+        'base_model': str(args.model),
+        'data': {'file': str(args.incremental), 'rows': int(len(y_new)),
+                 'fingerprint': data_fingerprint(X_new, y_new)},
+        'environment': environment(),
+        'incremental': {
+            'trees_before': trees_before,
+            'trees_added': args.new_trees,
+            'trees_after': len(model.estimators_),
+            'max_trees': args.max_trees,
+            'fit_seconds': fit_seconds,
+        },
+        'evaluation': {**evaluation, 'rows': int(len(y_eval)), **holdout},
+        'total_wall_seconds': time.perf_counter() - run_start,
+    }, args.output_dir)
+
+    print(f"\n✓ Model now has {len(model.estimators_)} trees (update took {fit_seconds:.2f}s)")
+    print(f"  On {eval_label}: accuracy {holdout['accuracy']:.3f}, ROC AUC {holdout['roc_auc']:.3f}")
+    return version_dir
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the diabetes risk model")
+    parser.add_argument('--grid', choices=sorted(GRIDS), default='default', help="Hyperparameter grid")
+    parser.add_argument('--folds', type=int, default=5, help="Cross-validation folds (default: 5)")
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Parallel fits (default: all cores)")
+    parser.add_argument('--test-size', type=float, default=0.2,
+                        help="Hold-out fraction, of the new rows in --incremental mode (default: 0.2)")
+    parser.add_argument('--data', default=str(DATA_FILE), help="Training data CSV")
+    parser.add_argument('--output-dir', default=str(MODELS_DIR), help="Where versioned artifacts go")
+    parser.add_argument('--cache-dir', default=str(CACHE_DIR), help="Fit cache location")
+    parser.add_argument('--no-cache', action='store_true', help="Refit everything")
+    parser.add_argument('--publish', action='store_true',
+                        help="Serve the new version: point PUBLISHED_POINTER at its directory")
+
+    incremental = parser.add_argument_group('incremental updates')
+    incremental.add_argument('--incremental', metavar='CSV',
+                             help="Warm-start the current model with new labeled rows instead of retraining")
+    incremental.add_argument('--new-trees', type=int, default=20, help="Trees to add (default: 20)")
+    incremental.add_argument('--max-trees', type=int, help="Retire the oldest trees beyond this many")
+    incremental.add_argument('--model', help="Model to update (default: the published model)")
+    incremental.add_argument('--scaler', help="Scaler of the model to update (default: the published scaler)")
+    incremental.add_argument('--eval-data', metavar='CSV',
+                             help="Labeled rows the model has not seen, to score the update on "
+                                  "(default: hold out --test-size of the new rows)")
+    args = parser.parse_args()
+
+    try:
+        version_dir = run_incremental(args) if args.incremental else run_search(args)
+    except (OSError, ValueError) as e:
+        print(f"✗ Training failed: {e}")
+        return 1
+    print(f"✓ Artifacts written to {version_dir}")
+
+    if args.publish:
+        publish(version_dir)
+        print(f"✓ Published {version_dir.name} ({PUBLISHED_POINTER.name} points to it)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,325 @@
+"""
+Flattened Tree Inference Engine
+Converts the trees of a fitted scikit-learn forest into contiguous NumPy node
+arrays and evaluates every tree at once with vectorized array operations
+
+Predictions are bit-identical to the original estimator: inputs are cast to
+float32 exactly like scikit-learn does before walking the trees, per-tree leaf
+probabilities are normalized the same way, and tree outputs are accumulated in
+the same order before averaging.
+
+fold_scaler() pre-applies a StandardScaler to the split thresholds, giving an
+equivalent forest that consumes raw, unscaled metrics directly.
+
+A FlatForest can be saved as a directory of uncompressed .npy files and opened
+with memory mapping, so several processes on one host share the same physical
+pages for the node arrays instead of each holding an unpickled copy.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Rows evaluated per block, keeps the (rows x trees) index matrix small
+BLOCK_SIZE = 4096
+
+# Up to this many rows, walk every tree for max_depth steps without compaction
+SMALL_BATCH = 64
+
+# Node arrays written by FlatForest.save, one .npy file each
+ARRAY_NAMES = ('feature', 'threshold', 'left', 'is_leaf', 'leaf_proba', 'roots', 'classes')
+FORMAT_VERSION = 1
+
+class FlatForest:
+    """All trees of a forest classifier stored as flat node arrays"""
+
+    def __init__(self, feature, threshold, left, leaf_proba, roots, max_depth,
+                 classes, n_features, is_leaf=None, raw_input=False):
+        self.feature = feature          # split feature per node (0 for leaves)
+        self.threshold = threshold      # split threshold per node (+inf for leaves)
+        self.left = left                # global index of the left child; the right child is left + 1
+        self.leaf_proba = leaf_proba    # normalized class probabilities per node
+        self.roots = roots              # global index of each tree's root node
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.n_features_in_ = int(n_features)
+        self.is_leaf = self.left == np.arange(len(left)) if is_leaf is None else is_leaf
+        # Folded forests compare raw float64 metrics; otherwise scaled values cast to float32
+        self.raw_input = bool(raw_input)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """Build a FlatForest from a fitted RandomForestClassifier / ExtraTreesClassifier"""
+        estimators = getattr(model, 'estimators_', None)
+        if not estimators or not all(hasattr(est, 'tree_') for est in estimators):
+            raise TypeError(f"Unsupported model type: {type(model).__name__}")
+        if getattr(model, 'n_outputs_', 1) != 1:
+            raise TypeError("Multi-output forests are not supported")
+
+        features, thresholds, lefts, probas, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for est in estimators:
+            tree = est.tree_
+            order = _sibling_order(tree.children_left, tree.children_right)
+            new_id = np.empty_like(order)
+            new_id[order] = np.arange(len(order))
+
+            children_left = tree.children_left[order]
+            is_leaf = children_left == -1
+            node_ids = np.arange(offset, offset + len(order), dtype=np.intp)
+
+            # Leaves point at themselves and never compare greater than +inf,
+            # so extra traversal steps past a leaf are no-ops
+            features.append(np.where(is_leaf, 0, tree.feature[order]).astype(np.intp))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold[order]).astype(np.float64))
+            lefts.append(np.where(is_leaf, node_ids, new_id[children_left] + offset).astype(np.intp))
+
+            # Same normalization as DecisionTreeClassifier.predict_proba
+            proba = np.array(tree.value[order, 0, :], dtype=np.float64)
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            probas.append(proba / normalizer)
+
+            roots.append(offset)
+            max_depth = max(max_depth, tree.max_depth)
+            offset += len(order)
+
+        return cls(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            leaf_proba=np.ascontiguousarray(np.concatenate(probas)),
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=max_depth,
+            classes=np.asarray(model.classes_),
+            n_features=model.n_features_in_,
+        )
+
+    def fold_scaler(self, scaler):
+        """
+        Equivalent forest taking raw metrics instead of scaler.transform output.
+        Splits test float32((x - mean) / scale) <= t. That is monotone in x, so
+        for each split there is a largest float64 x' passing the test, and
+        x <= x' gives exactly the same decision for every input. x' is found
+        by bisection over the float64 values.
+        """
+        if self.raw_input:
+            raise ValueError("Scaler is already folded into this forest")
+        if type(scaler).__name__ != 'StandardScaler':
+            raise TypeError(f"Only StandardScaler can be folded, got {type(scaler).__name__}")
+
+        n = self.n_features_in_
+        mean = np.asarray(scaler.mean_ if scaler.with_mean else np.zeros(n), dtype=np.float64)
+        scale = np.asarray(scaler.scale_ if scaler.with_std else np.ones(n), dtype=np.float64)
+
+        internal = ~np.asarray(self.is_leaf)
+        features = self.feature[internal]
+        threshold = np.array(self.threshold, dtype=np.float64)
+        threshold[internal] = _raw_thresholds(self.threshold[internal], mean[features], scale[features])
+
+        return FlatForest(
+            feature=self.feature,
+            threshold=threshold,
+            left=self.left,
+            leaf_proba=self.leaf_proba,
+            roots=self.roots,
+            max_depth=self.max_depth,
+            classes=self.classes_,
+            n_features=self.n_features_in_,
+            is_leaf=self.is_leaf,
+            raw_input=True,
+        )
+
+    def save(self, directory, source_signature=None):
+        """
+        Write the node arrays as uncompressed .npy files plus a meta.json.
+        The directory is built next to its destination and swapped in with a
+        rename, so readers never see a half-written model.
+        """
+        directory = Path(directory)
+        directory.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(prefix=f".{directory.name}-", dir=directory.parent))
+        try:
+            # Readable by every worker process, not just the one that built it
+            tmp_dir.chmod(0o755)
+            for name in ARRAY_NAMES:
+                array = self.classes_ if name == 'classes' else getattr(self, name)
+                np.save(tmp_dir / f"{name}.npy", np.ascontiguousarray(array), allow_pickle=False)
+            meta = {
+                'format_version': FORMAT_VERSION,
+                'max_depth': self.max_depth,
+                'n_features': self.n_features_in_,
+                'raw_input': self.raw_input,
+                'source_signature': source_signature,
+            }
+            (tmp_dir / 'meta.json').write_text(json.dumps(meta, indent=2))
+
+            old_dir = None
+            if directory.exists():
+                old_dir = directory.with_name(f".{directory.name}-old-{os.getpid()}")
+                os.replace(directory, old_dir)
+            os.replace(tmp_dir, directory)
+            if old_dir is not None:
+                shutil.rmtree(old_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Open a saved FlatForest; with mmap=True the arrays are read-only memory maps"""
+        directory = Path(directory)
+        meta = read_meta(directory)
+        if meta is None or meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"No compatible flat model in {directory}")
+
+        arrays = {}
+        for name in ARRAY_NAMES:
+            array = np.load(directory / f"{name}.npy", mmap_mode='r' if mmap else None,
+                            allow_pickle=False)
+            # Plain ndarray views avoid np.memmap subclass overhead on every operation
+            arrays[name] = array.view(np.ndarray)
+
+        return cls(
+            feature=arrays['feature'],
+            threshold=arrays['threshold'],
+            left=arrays['left'],
+            leaf_proba=arrays['leaf_proba'],
+            roots=arrays['roots'],
+            max_depth=meta['max_depth'],
+            classes=np.array(arrays['classes']),
+            n_features=meta['n_features'],
+            is_leaf=arrays['is_leaf'],
+            raw_input=meta.get('raw_input', False),
+        )
+
+    def _validate(self, X):
+        """Convert input to a 2D array: float32 like the fitted trees, float64 when the scaler is folded in"""
+        X = np.asarray(X, dtype=np.float64 if self.raw_input else np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(
+                f"X has {X.shape[-1]} features, but the model expects {self.n_features_in_}"
+            )
+        if not np.isfinite(X).all():
+            raise ValueError("Input contains NaN or infinity")
+        return X
+
+    def apply(self, X):
+        """Return the global leaf index reached in every tree, shape (n_samples, n_trees)"""
+        X = self._validate(X)
+        return self._apply(X)
+
+    def _apply(self, X):
+        n_samples = X.shape[0]
+        X_flat = X.ravel()
+        leaves = np.broadcast_to(self.roots, (n_samples, self.n_trees)).copy()
+
+        if n_samples <= SMALL_BATCH:
+            # Fixed number of steps: fewest array operations for interactive requests
+            row_offsets = (np.arange(n_samples, dtype=np.intp) * self.n_features_in_)[:, np.newaxis]
+            for _ in range(self.max_depth):
+                values = X_flat.take(row_offsets + self.feature.take(leaves))
+                # Go right (left + 1) when the split test "x <= threshold" fails
+                leaves = self.left.take(leaves) + (values > self.threshold.take(leaves))
+            return leaves
+
+        # Large batches: only keep walking the (row, tree) pairs not yet at a leaf
+        leaves = leaves.ravel()
+        pos = np.arange(len(leaves))
+        nodes = leaves.copy()
+        row_offsets = (pos // self.n_trees) * self.n_features_in_
+        while len(pos):
+            values = X_flat.take(row_offsets + self.feature.take(nodes))
+            nodes = self.left.take(nodes) + (values > self.threshold.take(nodes))
+            done = self.is_leaf.take(nodes)
+            if done.any():
+                leaves[pos[done]] = nodes[done]
+                active = ~done
+                pos, nodes, row_offsets = pos[active], nodes[active], row_offsets[active]
+        return leaves.reshape(n_samples, self.n_trees)
+
+    def predict_proba(self, X):
+        """Average of the per-tree class probabilities"""
+        X = self._validate(X)
+        out = np.empty((X.shape[0], len(self.classes_)), dtype=np.float64)
+        for start in range(0, X.shape[0], BLOCK_SIZE):
+            block = X[start:start + BLOCK_SIZE]
+            leaves = self._apply(block)
+            proba = np.zeros((block.shape[0], len(self.classes_)), dtype=np.float64)
+            # Accumulate tree by tree, in estimator order, to match scikit-learn bit for bit
+            for t in range(self.n_trees):
+                proba += self.leaf_proba[leaves[:, t]]
+            proba /= self.n_trees
+            out[start:start + BLOCK_SIZE] = proba
+        return out
+
+    def predict(self, X):
+        """Predicted class label for each row"""
+        proba = self.predict_proba(X)
+        return self.classes_.take(np.argmax(proba, axis=1), axis=0)
+
+def _sibling_order(children_left, children_right):
+    """Breadth-first node order in which every right child directly follows its left sibling"""
+    order = [0]
+    for node in order:
+        if children_left[node] != -1:
+            order.append(children_left[node])
+            order.append(children_right[node])
+    return np.asarray(order, dtype=np.intp)
+
+def _float_key(x):
+    """Map float64 values to int64 keys with the same ordering"""
+    bits = np.asarray(x, dtype=np.float64).view(np.int64)
+    return bits ^ ((bits >> 63) & np.int64(0x7FFFFFFFFFFFFFFF))
+
+def _key_float(key):
+    """Inverse of _float_key"""
+    key = np.asarray(key, dtype=np.int64)
+    return (key ^ ((key >> 63) & np.int64(0x7FFFFFFFFFFFFFFF))).view(np.float64)
+
+def _scaled_test(x, mean, scale, threshold):
+    """The split test exactly as scikit-learn evaluates it on StandardScaler output"""
+    with np.errstate(over='ignore', invalid='ignore'):
+        scaled = ((x - mean) / scale).astype(np.float32)
+    return scaled <= threshold
+
+def _raw_thresholds(threshold, mean, scale):
+    """Largest float64 x with float32((x - mean) / scale) <= threshold, per split"""
+    # Invariant: the test passes at lo and fails at hi
+    lo = np.full(threshold.shape, _float_key(-np.inf), dtype=np.int64)
+    hi = np.full(threshold.shape, _float_key(np.inf), dtype=np.int64)
+    for _ in range(66):
+        mid = (lo >> 1) + (hi >> 1) + (lo & hi & 1)
+        passes = _scaled_test(_key_float(mid), mean, scale, threshold)
+        lo = np.where(passes, mid, lo)
+        hi = np.where(passes, hi, mid)
+    return _key_float(lo)
+
+def read_meta(directory):
+    """meta.json of a saved flat model, or None if there is none"""
+    try:
+        return json.loads((Path(directory) / 'meta.json').read_text())
+    except (OSError, ValueError):
+        return None
+
+def compile_model(model):
+    """Return a FlatForest for supported models, otherwise the model unchanged"""
+    try:
+        return FlatForest.from_sklearn(model)
+    except TypeError:
+        return model
@@ -0,0 +1,229 @@
+"""
+Write-Behind Queue
+Accepts rows in-process and persists them from a background thread in batches,
+so the caller does not wait for the database
+
+Used by auth.py and auth_sqlite.py for saving predictions (queue_prediction).
+
+Guarantees:
+- Rows are written in submission order (except rows written synchronously
+  while the queue is full), each batch in a single transaction: all rows of a
+  batch are stored, or none.
+- A row accepted by submit() is written unless the process is killed without
+  running its exit handlers (SIGKILL, power loss, os._exit). Until then it only
+  exists in memory: at most maxsize rows plus one batch are lost in that case.
+- On normal interpreter exit (including a Streamlit server stopped with
+  Ctrl+C / SIGTERM) the queue is drained before the process ends, waiting up
+  to shutdown_timeout seconds.
+- When the queue is full, submit() writes the row synchronously in the calling
+  thread instead of dropping it (backpressure).
+- A batch that fails is retried with exponential backoff; after max_retries it
+  is dropped, logged with its rows, and counted in
+  portal_write_behind_rows_total{result="dropped"}.
+- flush() waits until everything submitted so far has been written or dropped,
+  which gives read-your-writes for the caller (the History tab uses it). With a
+  key function, flush(key=...) waits only for the rows of that key (one user),
+  and returns at once when it has none pending.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+
+from metrics import CallbackGauge
+
+logger = logging.getLogger('diabetes_portal.write_behind')
+
+# Every queue in the process, for the metrics below
+_queues = []
+
+CallbackGauge(
+    'portal_write_behind_rows_total', 'Rows handled by the write-behind queues', type_name='counter',
+    labelnames=['queue', 'result'],
+    callback=lambda: {(q.name, result): q.counts[result] for q in _queues for result in ('written', 'dropped', 'sync')})
+CallbackGauge(
+    'portal_write_behind_depth', 'Rows waiting in the write-behind queues', labelnames=['queue'],
+    callback=lambda: {(q.name,): q.pending() for q in _queues})
+
+class WriteBehindQueue:
+    """
+    Bounded queue drained by a background writer. write_many(rows) must store a
+    list of rows in one transaction and raise on failure. key(row), if given,
+    groups rows for pending(key) and flush(key=...). The writer thread is started
+    on first submit().
+    """
+
+    def __init__(self, write_many, name, maxsize=10000, batch_size=500, max_retries=5,
+                 retry_delay=0.1, shutdown_timeout=10.0, key=None):
+        self.write_many = write_many
+        self.name = name
+        self.key = key
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.shutdown_timeout = shutdown_timeout
+        self.counts = {'written': 0, 'dropped': 0, 'sync': 0, 'batches': 0}
+        self._queue = queue.Queue(maxsize)
+        self._thread = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._handled = threading.Condition(self._lock)
+        self._pending_keys = {}       # key -> rows submitted but not yet handled
+        _queues.append(self)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=f'write-behind-{self.name}', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def submit(self, row):
+        """Queue a row for writing; returns False only if a synchronous fallback write failed"""
+        if self._closed:
+            return self._write_sync(row)
+        if self._thread is None:
+            self._start()
+        self._track([row], 1)
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self._track([row], -1)
+            return self._write_sync(row)
+
+    def _track(self, rows, delta):
+        """Adjust the per-key pending counts by delta for each row"""
+        if self.key is None:
+            return
+        with self._lock:
+            for row in rows:
+                key = self.key(row)
+                count = self._pending_keys.get(key, 0) + delta
+                if count:
+                    self._pending_keys[key] = count
+                else:
+                    del self._pending_keys[key]
+            if delta < 0:
+                self._handled.notify_all()
+
+    def _write_sync(self, row):
+        try:
+            self.write_many([row])
+            self._count('sync', 1)
+            return True
+        except Exception as e:
+            logger.error("Synchronous %s write failed: %s", self.name, e)
+            return False
+
+    def _run(self):
+        while True:
+            row = self._queue.get()
+            if row is None:
+                self._queue.task_done()
+                return
+            batch = [row]
+            stop = False
+            # Take whatever else is already queued, without waiting for more
+            while len(batch) < self.batch_size:
+                try:
+                    row = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if row is None:
+                    stop = True
+                    break
+                batch.append(row)
+            self._write_batch(batch)
+            self._track(batch, -1)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, batch):
+        delay = self.retry_delay
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                self.write_many(batch)
+                self._count('written', len(batch))
+                self._count('batches', 1)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    self._count('dropped', len(batch))
+                    logger.error("Dropping %d %s rows after %d failed attempts: %s; rows: %r",
+                                 len(batch), self.name, attempt, e, batch)
+                    return
+                logger.warning("%s batch write failed (attempt %d/%d), retrying: %s",
+                               self.name, attempt, self.max_retries, e)
+                time.sleep(delay)
+                delay *= 2
+
+    def _count(self, key, n):
+        with self._lock:
+            self.counts[key] += n
+
+    def pending(self, key=None):
+        """Rows submitted but not yet written or dropped, all of them or those of key"""
+        if key is None or self.key is None:
+            return self._queue.unfinished_tasks
+        with self._lock:
+            return self._pending_keys.get(key, 0)
+
+    def flush(self, timeout=None, key=None):
+        """
+        Wait until every row submitted so far (or, given key, every row of that
+        key) is handled; returns False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if key is not None and self.key is not None:
+            with self._handled:
+                while self._pending_keys.get(key):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._handled.wait(remaining)
+            return True
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Drain the queue and stop the writer; later submits are written synchronously"""
+        if self._closed:
+            return True
+        self._closed = True
+        if self._thread is None:
+            return True
+        timeout = self.shutdown_timeout if timeout is None else timeout
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error("%s write-behind queue not drained at shutdown, %d rows pending",
+                         self.name, self.pending())
+            return False
+
+        # Rows submitted while the sentinel was being queued
+        leftovers = []
+        while True:
+            try:
+                leftovers.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        rows = [row for row in leftovers if row is not None]
+        if rows:
+            self._write_batch(rows)
+            self._track(rows, -1)
+        for _ in leftovers:
+            self._queue.task_done()
+        return True
+
+    def stats(self):
+        return {'depth': self._queue.qsize(), **self.counts}